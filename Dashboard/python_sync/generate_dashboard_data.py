@@ -8,20 +8,380 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import json
+import hashlib
 import warnings
 from datetime import datetime, timedelta
 import sys
 import os
 
+# Asegurar raíz del proyecto en sys.path para reutilizar la lista canónica del pipeline
+PROJECT_ROOT = str(Path(__file__).resolve().parent.parent.parent)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import esdata.text.step4_analisis_variables_texto as step4_texto
+from esdata.text.step4_analisis_variables_texto import CANONICAL_FEATURES
+
 warnings.filterwarnings('ignore')
 
+OPERACIONES = ['venta', 'renta']
+
+# Nombre del nivel de operación en los agregados del plan
+CLAVE_OPERACION = '__operacion'
+
+KPI_METRICAS = [
+    'total_propiedades', 'precio_promedio', 'precio_mediana',
+    'pxm2_promedio', 'pxm2_mediana', 'superficie_promedio'
+]
+
+HISTOGRAMA_VARIABLES = [('precio', 'precios'), ('superficie_m2', 'superficie'), ('precio_por_m2', 'pxm2')]
+
+CORRELACION_CANDIDATAS = ['precio', 'superficie_m2', 'precio_por_m2', 'recamaras', 'banos_totales', 'estacionamientos']
+
+SEGMENTOS = {
+    'starter_1r_1b': {
+        'nombre': 'Starter (1R + 1-1.5B)',
+        'filtros': {'recamaras': [1], 'banos_totales': [1, 1.5]}
+    },
+    'family_2r_2b': {
+        'nombre': 'Familiar (2R + 2-2.5B)', 
+        'filtros': {'recamaras': [2], 'banos_totales': [2, 2.5]}
+    },
+    'premium_3r_3b': {
+        'nombre': 'Premium (3R + 3-3.5B)',
+        'filtros': {'recamaras': [3], 'banos_totales': [3, 3.5]}
+    }
+}
+# Histogramas multiresolución: resoluciones anidadas (cada una divide a la más fina)
+HISTOGRAMA_RESOLUCIONES = [10, 25, 50, 100]
+HISTOGRAMA_ESCALA_LOG = {'precio'}
+SEGMENTO_TODOS = 'Todos'
+
+
+def histogramas_multiresolucion(valores, clave, segmentos, escala='lineal', resoluciones=HISTOGRAMA_RESOLUCIONES):
+    """Conteos por bin a varias resoluciones para cada operación × segmentos.
+
+    Los bordes son de ancho uniforme (en log10 si ``escala='log'``) sobre el rango de cada
+    operación, compartidos por todos sus segmentos, de modo que los conteos son sumables.
+    Cada valor se asigna una sola vez al bin más fino y las resoluciones gruesas se
+    obtienen sumando bins contiguos. Incluye agregados 'Todos' por cada segmento.
+    Cada resolución debe dividir a la más fina (``max(resoluciones)``).
+    """
+    fina = max(resoluciones)
+    for r in resoluciones:
+        if r <= 0 or fina % r:
+            raise ValueError(f"Resolución {r} inválida: debe ser un entero positivo que divida a la más fina ({fina})")
+    claves = pd.concat([clave] + segmentos, axis=1)
+    validos = valores.notna() & claves.notna().all(axis=1)
+    if escala == 'log':
+        validos &= valores > 0
+    v = valores[validos].to_numpy(float)
+    if escala == 'log':
+        v = np.log10(v)
+    claves = claves[validos]
+    if len(v) == 0:
+        return pd.DataFrame()
+
+    # Rango por operación y asignación al bin fino
+    op_codigos, ops = pd.factorize(claves[clave.name])
+    lo = np.full(len(ops), np.inf)
+    hi = np.full(len(ops), -np.inf)
+    np.minimum.at(lo, op_codigos, v)
+    np.maximum.at(hi, op_codigos, v)
+    ancho = np.where(hi > lo, hi - lo, 1.0)
+    idx = np.clip(((v - lo[op_codigos]) / ancho[op_codigos] * fina).astype(np.int64), 0, fina - 1)
+
+    agrupado = claves.groupby(list(claves.columns), sort=True)
+    codigos = agrupado.ngroup().to_numpy()
+    grupos = agrupado.size().index.to_frame(index=False)
+    conteos = np.bincount(codigos * fina + idx, minlength=len(grupos) * fina).reshape(len(grupos), fina)
+
+    # Agregados 'Todos' sobre cada combinación de segmentos
+    nombres = [s.name for s in segmentos]
+    tablas = []
+    for mascara in range(1 << len(nombres)):
+        llaves = grupos.copy()
+        for i, nombre in enumerate(nombres):
+            if mascara >> i & 1:
+                llaves[nombre] = SEGMENTO_TODOS
+        sumas = pd.DataFrame(conteos).groupby([llaves[c] for c in llaves.columns], sort=True).sum()
+        tablas.append(sumas)
+    tabla = pd.concat(tablas)
+    matriz = tabla.to_numpy()
+    indice = tabla.index.to_frame(index=False)
+
+    rango = pd.DataFrame({'bin_min': lo, 'bin_max': hi}, index=ops)
+    if escala == 'log':
+        rango = 10 ** rango
+    indice = indice.join(rango, on=clave.name)
+
+    filas = []
+    for r in resoluciones:
+        gruesos = matriz.reshape(len(matriz), r, fina // r).sum(axis=2)
+        bloque = indice.copy()
+        bloque['escala'] = escala
+        bloque['bins'] = r
+        bloque['total'] = gruesos.sum(axis=1)
+        bloque['conteos'] = [';'.join(map(str, fila)) for fila in gruesos]
+        filas.append(bloque)
+    return pd.concat(filas, ignore_index=True)
+
+# Teselas del mapa (quadkeys Web Mercator, mismo esquema que Bing/Leaflet)
+TILE_ZOOMS = [11, 13, 15, 17]
+MERCATOR_LAT_MAX = 85.05112878
+
+
+def tiles_xy(longitud, latitud, zoom):
+    """Coordenadas de tesela (x, y) Web Mercator para arreglos de lon/lat"""
+    n = 1 << zoom
+    lat = np.radians(np.clip(latitud, -MERCATOR_LAT_MAX, MERCATOR_LAT_MAX))
+    x = np.floor((longitud + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+def quadkeys(x, y, zoom):
+    """Quadkey de cada tesela (un dígito 0-3 por nivel de zoom)"""
+    bits = np.arange(zoom - 1, -1, -1)
+    digitos = ((x[:, None] >> bits) & 1) + 2 * ((y[:, None] >> bits) & 1)
+    caracteres = (digitos + ord('0')).astype(np.uint8)
+    return caracteres.view(f'S{zoom}').ravel().astype(str)
+
+
+def centro_tile(x, y, zoom):
+    """Lon/lat del centro de cada tesela"""
+    n = 1 << zoom
+    lon = (x + 0.5) / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + 0.5) / n))))
+    return lon, lat
+
+
+def agregar_tiles(df, clave, zooms=TILE_ZOOMS):
+    """Conteo y medianas de precio / PxM2 por operación y tesela para varios zooms.
+
+    La tesela se calcula una vez al zoom máximo; los niveles más gruesos se obtienen
+    desplazando bits (cada tesela padre contiene 2×2 hijas).
+    """
+    validos = df['longitud'].notna() & df['latitud'].notna() & (df['longitud'] != 0) & (df['latitud'] != 0)
+    df = df[validos]
+    clave = clave[validos]
+    z_max = max(zooms)
+    x_max, y_max = tiles_xy(df['longitud'].to_numpy(float), df['latitud'].to_numpy(float), z_max)
+
+    valores = {'precio': 'precio_mediano'}
+    if 'precio_por_m2' in df.columns:
+        valores['precio_por_m2'] = 'pxm2_mediano'
+
+    tablas = []
+    for zoom in sorted(zooms):
+        shift = z_max - zoom
+        tiles = pd.DataFrame({'tile_x': x_max >> shift, 'tile_y': y_max >> shift}, index=df.index)
+        agrupado = df[list(valores)].groupby([clave, tiles['tile_x'], tiles['tile_y']], sort=True)
+        tabla = agrupado.median().rename(columns=valores)
+        tabla.insert(0, 'count', agrupado.size())
+        tabla = tabla.reset_index()
+        x, y = tabla['tile_x'].to_numpy(), tabla['tile_y'].to_numpy()
+        tabla.insert(1, 'zoom', zoom)
+        tabla.insert(2, 'quadkey', quadkeys(x, y, zoom))
+        tabla['longitud_centro'], tabla['latitud_centro'] = centro_tile(x, y, zoom)
+        tablas.append(tabla)
+    return pd.concat(tablas, ignore_index=True)
+
+# Amenidades: indicadores 0/1 de 0.Final_Ame_* (lista canónica del Paso 4)
+# 'mantenimiento' colisiona con la cuota numérica tras el merge, no es indicador
+AMENIDADES_EXCLUIDAS = {'mantenimiento'}
+MIN_AMENIDAD_N = 5
+BOOTSTRAP_REPS = 500
+BOOTSTRAP_SEED = 42
+BOOTSTRAP_IC = (2.5, 97.5)
+
+
+def _estadisticos_orden(precios, indicadores):
+    """Preparar la búsqueda del k-ésimo precio con indicador activo por grupo y amenidad.
+
+    ``precios`` viene ordenado por (grupo, precio) e ``indicadores`` es la matriz booleana
+    n×k alineada. Los conteos acumulados por columna son no decrecientes; desplazando cada
+    columna en (n+1) quedan en un solo arreglo monótono donde un searchsorted localiza, para
+    cualquier lote de (inicio de grupo, amenidad, rango), la fila correspondiente.
+    """
+    n, k = indicadores.shape
+    acumulado = np.zeros((n + 1, k), dtype=np.int64)
+    np.cumsum(indicadores, axis=0, out=acumulado[1:])
+    desplazamiento = np.arange(k, dtype=np.int64) * (n + 1)
+    plano = (acumulado[1:] + desplazamiento).T.ravel()
+
+    def valor(inicio, j, rango):
+        pos = np.searchsorted(plano, acumulado[inicio, j] + rango + desplazamiento[j])
+        return precios[pos - j * n]
+
+    return acumulado, valor
+
+
+def _mediana_por_rangos(valor, inicio, j, r1, r2):
+    return (valor(inicio, j, r1) + valor(inicio, j, r2)) / 2
+
+
+def _rangos_bootstrap(m, reps, rng):
+    """Rangos de la mediana de remuestras bootstrap de tamaño m (uno por columna).
+
+    El k-ésimo estadístico de orden de m uniformes es Beta(k, m-k+1) y, dado éste, el
+    siguiente es v + (1-v)·Beta(1, m-k); una remuestra con reemplazo toma el valor
+    ordenado ceil(m·u). Así se muestrea la mediana remuestreada sin materializar reps×m índices.
+    """
+    k1 = (m + 1) // 2
+    v1 = rng.beta(k1, m - k1 + 1, size=(reps, len(m)))
+    v2 = v1 + (1 - v1) * rng.beta(1, np.maximum(m - k1, 1), size=(reps, len(m)))
+    v2 = np.where(m % 2 == 0, v2, v1)
+    rango = lambda v: np.clip(np.ceil(m * v).astype(np.int64), 1, m)
+    return rango(v1), rango(v2)
+
+
+def impacto_amenidades(precio, claves, indicadores, reps=BOOTSTRAP_REPS, min_n=MIN_AMENIDAD_N, seed=BOOTSTRAP_SEED):
+    """Medianas de precio con/sin cada amenidad y lift con IC bootstrap, por grupo.
+
+    Una sola ordenación por (grupo, precio) sirve para todas las amenidades y grupos;
+    solo se reportan pares (grupo, amenidad) con al menos ``min_n`` propiedades en cada lado.
+    """
+    claves_df = pd.concat(claves, axis=1)
+    validos = precio.notna() & claves_df.notna().all(axis=1) & indicadores.notna().all(axis=1)
+    claves_df = claves_df[validos]
+    agrupado = claves_df.groupby(list(claves_df.columns), sort=True)
+    codigos = agrupado.ngroup().to_numpy()
+    grupos = agrupado.size().index
+    
+    orden = np.lexsort((precio[validos].to_numpy(float), codigos))
+    precios = precio[validos].to_numpy(float)[orden]
+    con = indicadores[validos].to_numpy()[orden] > 0
+    codigos = codigos[orden]
+    inicio = np.searchsorted(codigos, np.arange(len(grupos)))
+    fin = np.searchsorted(codigos, np.arange(len(grupos)), side='right')
+
+    acum_con, valor_con = _estadisticos_orden(precios, con)
+    acum_sin, valor_sin = _estadisticos_orden(precios, ~con)
+    n_con = acum_con[fin] - acum_con[inicio]
+    n_sin = acum_sin[fin] - acum_sin[inicio]
+
+    gi, ji = np.nonzero((n_con >= min_n) & (n_sin >= min_n))
+    mc, ms = n_con[gi, ji], n_sin[gi, ji]
+    ini = inicio[gi]
+    precio_con = _mediana_por_rangos(valor_con, ini, ji, (mc + 1) // 2, mc // 2 + 1)
+    precio_sin = _mediana_por_rangos(valor_sin, ini, ji, (ms + 1) // 2, ms // 2 + 1)
+    lift = np.where(precio_sin > 0, (precio_con - precio_sin) / np.where(precio_sin > 0, precio_sin, 1) * 100, 0.0)
+
+    # Bootstrap estratificado (con y sin se remuestrean por separado) de todos los pares a la vez
+    rng = np.random.default_rng(seed)
+    boot_con = _mediana_por_rangos(valor_con, ini, ji, *_rangos_bootstrap(mc, reps, rng))
+    boot_sin = _mediana_por_rangos(valor_sin, ini, ji, *_rangos_bootstrap(ms, reps, rng))
+    boot_lift = np.where(boot_sin > 0, (boot_con - boot_sin) / np.where(boot_sin > 0, boot_sin, 1) * 100, 0.0)
+    ic_inf, ic_sup = (np.percentile(boot_lift, BOOTSTRAP_IC, axis=0) if len(gi)
+                      else (np.empty(0), np.empty(0)))
+
+    resultado = grupos[gi].to_frame(index=False)
+    resultado['amenidad'] = np.asarray(indicadores.columns)[ji]
+    resultado['count_con'] = mc
+    resultado['count_sin'] = ms
+    resultado['precio_con'] = precio_con
+    resultado['precio_sin'] = precio_sin
+    resultado['lift_porcentaje'] = lift
+    resultado['lift_ic_inf'] = ic_inf
+    resultado['lift_ic_sup'] = ic_sup
+    return resultado
+
+
+# Manifest de regeneración incremental (junto a metadata.json)
+MANIFEST_FILE = 'manifest.json'
+# Código del que dependen los CSVs: este script y el Paso 4 (CANONICAL_FEATURES define las amenidades)
+ARCHIVOS_CODIGO = [__file__, step4_texto.__file__]
+
+
+def hash_archivo(path, chunk_size=1 << 20):
+    """SHA-256 de un archivo leído por bloques"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloque in iter(lambda: f.read(chunk_size), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+class ManifestDashboard:
+    """Huellas de entradas y código → hashes de los CSVs generados.
+
+    Permite omitir la regeneración completa cuando ni las entradas ni el código
+    cambiaron, y no reescribir CSVs cuyo contenido resulta idéntico (sus fechas de
+    modificación no cambian, lo que evita invalidar cachés del backend).
+    """
+
+    def __init__(self, output_dir, entradas):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / MANIFEST_FILE
+        self.entradas = {Path(p).name: hash_archivo(p) for p in entradas}
+        self.codigo = hashlib.sha256(''.join(hash_archivo(p) for p in ARCHIVOS_CODIGO).encode()).hexdigest()
+        self.previo = self._leer()
+        self.salidas = {}
+        self.escritos = []
+        self.omitidos = []
+
+    def _leer(self):
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def cambios(self):
+        """Lista de motivos por los que el bundle previo no es vigente (vacía si lo es)"""
+        if not self.previo:
+            return ['sin manifest previo']
+        motivos = []
+        if self.previo.get('codigo') != self.codigo:
+            motivos.append('código del generador')
+        entradas_previas = self.previo.get('entradas', {})
+        motivos += [f'entrada {nombre}' for nombre, h in self.entradas.items() if entradas_previas.get(nombre) != h]
+        for rel, h in self.previo.get('salidas', {}).items():
+            destino = self.output_dir / rel
+            if not destino.exists() or hash_archivo(destino) != h:
+                motivos.append(f'salida {rel}')
+        return motivos
+
+    def vigente(self):
+        return not self.cambios()
+
+    def escribir_csv(self, df, destino):
+        """Escribir el CSV solo si su contenido cambió; devuelve True si se escribió"""
+        contenido = df.to_csv(index=False).encode('utf-8')
+        h = hashlib.sha256(contenido).hexdigest()
+        rel = destino.relative_to(self.output_dir).as_posix()
+        self.salidas[rel] = h
+
+        if destino.exists() and hash_archivo(destino) == h:
+            self.omitidos.append(rel)
+            return False
+        with open(destino, 'wb') as f:
+            f.write(contenido)
+        self.escritos.append(rel)
+        return True
+
+    def guardar(self):
+        manifest = {
+            'generated_at': datetime.now().isoformat(),
+            'codigo': self.codigo,
+            'entradas': self.entradas,
+            'salidas': dict(sorted(self.salidas.items()))
+        }
+        with open(self.path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+
 class DashboardDataGenerator:
-    def __init__(self, input_num_file, input_ame_file, tablas_dir, output_dir):
+    def __init__(self, input_num_file, input_ame_file, tablas_dir, output_dir, manifest=None):
         """Inicializar el generador de datos para el dashboard"""
         self.input_num_file = Path(input_num_file)
         self.input_ame_file = Path(input_ame_file)
         self.tablas_dir = Path(tablas_dir)
         self.output_dir = Path(output_dir)
+        self.manifest = manifest
         self.output_dir.mkdir(exist_ok=True)
         
         # Crear subdirectorios
@@ -236,53 +596,187 @@ class DashboardDataGenerator:
         
         return outliers
     
+    def planificar_agregados(self, df=None, operacion=None):
+        """Calcular en una sola pasada todos los agregados que consumen los CSVs por operación.
+
+        Agrupa una vez por operación (y por las subllaves compartidas colonia/municipio,
+        tipo_propiedad, segmento y mes) y devuelve un diccionario de tablas cuyo primer
+        nivel de índice es la operación. Si se indica ``operacion``, todo ``df`` se
+        trata como esa operación (uso individual de los generadores).
+        """
+        if df is None:
+            df = self.df_clean
+
+        if operacion is None:
+            clave = df['operacion'].astype(str).str.lower()
+            df = df[clave.isin(OPERACIONES)]
+            clave = clave[df.index]
+        else:
+            clave = pd.Series(operacion, index=df.index)
+        clave = clave.rename(CLAVE_OPERACION)
+
+        plan = {'conteos': clave.value_counts()}
+        tiene = lambda col: col in df.columns
+
+        # KPIs principales. Las medias usan Series.mean por grupo (suma por pares de numpy), igual
+        # que al filtrar cada operación: la media agrupada de pandas puede diferir en el último dígito
+        media = lambda serie: serie.mean()
+        kpis_agg = {
+            'total_propiedades': ('precio', 'size'),
+            'precio_promedio': ('precio', media),
+            'precio_mediana': ('precio', 'median')
+        }
+        if tiene('precio_por_m2'):
+            kpis_agg.update(pxm2_promedio=('precio_por_m2', media), pxm2_mediana=('precio_por_m2', 'median'))
+        if tiene('superficie_m2'):
+            kpis_agg['superficie_promedio'] = ('superficie_m2', media)
+        plan['kpis'] = df.groupby(clave).agg(**kpis_agg).reindex(columns=KPI_METRICAS, fill_value=0)
+
+        # Colonias: alimenta top_colonias y mapa de calor
+        if tiene('colonia'):
+            colonia_cols = ['colonia'] + (['municipio'] if tiene('municipio') else [])
+            colonias_agg = {
+                'precio_count': ('precio', 'count'),
+                'precio_mean': ('precio', 'mean'),
+                'precio_median': ('precio', 'median')
+            }
+            if tiene('precio_por_m2'):
+                colonias_agg.update(precio_por_m2_mean=('precio_por_m2', 'mean'),
+                                    precio_por_m2_median=('precio_por_m2', 'median'))
+            for col in ['longitud', 'latitud']:
+                if tiene(col):
+                    colonias_agg[f'{col}_centro'] = (col, 'mean')
+            plan['colonias'] = df.groupby([clave] + [df[c] for c in colonia_cols]).agg(**colonias_agg)
+
+        # Distribución por tipo de propiedad
+        if tiene('tipo_propiedad'):
+            plan['tipos'] = df.groupby([clave, df['tipo_propiedad']])['precio'].agg(['count', 'mean', 'median'])
+
+        # Segmentos predefinidos (una máscara por segmento, agrupada por operación)
+        segmentos = []
+        for seg_id, seg_info in SEGMENTOS.items():
+            mask = pd.Series(True, index=df.index)
+            for campo, valores in seg_info['filtros'].items():
+                if tiene(campo):
+                    mask &= df[campo].isin(valores)
+            g_precio = df.loc[mask, 'precio'].groupby(clave[mask])
+            seg = pd.DataFrame({
+                'count': g_precio.size(),
+                'precio_p25': g_precio.quantile(0.25),
+                'precio_mediana': g_precio.median(),
+                'precio_p75': g_precio.quantile(0.75)
+            })
+            if tiene('superficie_m2'):
+                seg['superficie_mediana'] = df.loc[mask, 'superficie_m2'].groupby(clave[mask]).median()
+            seg['segmento_id'] = seg_id
+            seg['segmento_nombre'] = seg_info['nombre']
+            segmentos.append(seg)
+        plan['segmentos'] = pd.concat(segmentos)
+
+        # Correlaciones: el dropna por fila no depende de la operación
+        variables = [v for v in CORRELACION_CANDIDATAS if tiene(v)]
+        plan['correlacion_vars'] = variables
+        if len(variables) >= 2:
+            df_corr = df[variables].dropna()
+            g_corr = df_corr.groupby(clave[df_corr.index])
+            plan['correlacion_n'] = g_corr.size()
+            plan['correlaciones'] = g_corr.corr(method='pearson')
+
+        # Amenidades: lift con/sin por operación y por colonia
+        amenidades = [c for c in CANONICAL_FEATURES if tiene(c) and c not in AMENIDADES_EXCLUIDAS]
+        if amenidades:
+            indicadores = df[amenidades]
+            plan['amenidades'] = {
+                'operacion': impacto_amenidades(df['precio'], [clave], indicadores)
+            }
+            if tiene('colonia'):
+                colonia_cols = ['colonia'] + (['municipio'] if tiene('municipio') else [])
+                plan['amenidades']['colonia'] = impacto_amenidades(
+                    df['precio'], [clave] + [df[c] for c in colonia_cols], indicadores)
+
+        # Histogramas: una serie por operación sin copiar el frame
+        histogramas = {}
+        for variable, nombre in HISTOGRAMA_VARIABLES:
+            if tiene(variable):
+                for op, data in df[variable].dropna().groupby(clave):
+                    histogramas[(op, nombre)] = self._calcular_histograma(data)
+        plan['histogramas'] = histogramas
+
+        # Histogramas multiresolución por operación × tipo × municipio
+        segmentos_hist = [df[c] for c in ['tipo_propiedad', 'municipio'] if tiene(c)]
+        multi = []
+        for variable, nombre in HISTOGRAMA_VARIABLES:
+            if not tiene(variable):
+                continue
+            escalas = ['lineal', 'log'] if variable in HISTOGRAMA_ESCALA_LOG else ['lineal']
+            for escala in escalas:
+                tabla = histogramas_multiresolucion(df[variable], clave, segmentos_hist, escala)
+                if len(tabla):
+                    tabla.insert(len(segmentos_hist) + 1, 'variable', nombre)
+                    multi.append(tabla)
+        if multi:
+            plan['histogramas_multi'] = pd.concat(multi, ignore_index=True)
+        
+        # Teselas del mapa por zoom
+        if tiene('longitud') and tiene('latitud'):
+            plan['tiles'] = agregar_tiles(df, clave)
+        
+        # Series temporales mensuales
+        if tiene('fecha_scrape'):
+            year_month = df['fecha_scrape'].dt.to_period('M').rename('periodo')
+            plan['series'] = df['precio'].groupby([clave, year_month]).agg(['count', 'median'])
+
+        return plan
+
     def generar_todos_los_csvs(self):
         """Generar todos los CSVs necesarios para el dashboard"""
         print("\n🚀 Generando todos los CSVs para el dashboard...")
         
         try:
-            # Generar datos para VENTA y RENTA por separado
-            operaciones = ['venta', 'renta']
+            # Un solo plan de agregados para VENTA y RENTA
+            print("\n🧮 Calculando agregados por operación en una sola pasada...")
+            plan = self.planificar_agregados(self.df)
             
-            for operacion in operaciones:
+            for operacion in OPERACIONES:
                 print(f"\n🏷️ Procesando datos para: {operacion.upper()}")
-                df_operacion = self.df[self.df['operacion'].str.lower() == operacion].copy()
+                total = int(plan['conteos'].get(operacion, 0))
                 
-                if len(df_operacion) == 0:
+                if total == 0:
                     print(f"   ⚠️ No hay datos para {operacion}")
                     continue
                 
-                print(f"   📊 {len(df_operacion):,} propiedades en {operacion}")
+                print(f"   📊 {total:,} propiedades en {operacion}")
                 
                 # 1. Básicos por operación
                 print(f"\n📊 Generando estadísticas básicas para {operacion}...")
-                self.generar_kpis_principales(df_operacion, operacion)
-                self.generar_top_colonias(df_operacion, operacion)
-                self.generar_distribucion_tipos(df_operacion, operacion)
+                self.generar_kpis_principales(operacion=operacion, plan=plan)
+                self.generar_top_colonias(operacion=operacion, plan=plan)
+                self.generar_distribucion_tipos(operacion=operacion, plan=plan)
                 
                 # 2. Histogramas por operación
                 print(f"\n📈 Generando histogramas para {operacion}...")
-                self.generar_histogramas(df_operacion, operacion)
+                self.generar_histogramas(operacion=operacion, plan=plan)
                 
                 # 3. Segmentos por operación
                 print(f"\n🎯 Generando segmentaciones para {operacion}...")
-                self.generar_segmentos(df_operacion, operacion)
+                self.generar_segmentos(operacion=operacion, plan=plan)
                 
                 # 4. Correlaciones por operación
                 print(f"\n🔗 Generando correlaciones para {operacion}...")
-                self.generar_correlaciones(df_operacion, operacion)
+                self.generar_correlaciones(operacion=operacion, plan=plan)
                 
                 # 5. Amenidades por operación
                 print(f"\n🏠 Analizando amenidades para {operacion}...")
-                self.generar_amenidades(df_operacion, operacion)
+                self.generar_amenidades(operacion=operacion, plan=plan)
                 
                 # 6. Geoespacial por operación
                 print(f"\n🗺️ Generando datos geoespaciales para {operacion}...")
-                self.generar_datos_mapa(df_operacion, operacion)
+                self.generar_datos_mapa(operacion=operacion, plan=plan)
+                self.generar_tiles_mapa(operacion=operacion, plan=plan)
                 
                 # 7. Series temporales por operación
                 print(f"\n📅 Generando series temporales para {operacion}...")
-                self.generar_series_temporales(df_operacion, operacion)
+                self.generar_series_temporales(operacion=operacion, plan=plan)
             
             # 8. Filtros globales (sin separar por operación)
             print("\n🔍 Generando opciones de filtros globales...")
@@ -291,6 +785,10 @@ class DashboardDataGenerator:
             # 9. Metadata global
             self.generar_metadata()
             
+            # 10. Manifest de regeneración incremental
+            if self.manifest is not None:
+                self.manifest.guardar()
+            
             print("\n✅ ¡Todos los CSVs generados exitosamente!")
             self.mostrar_resumen()
             
@@ -298,65 +796,35 @@ class DashboardDataGenerator:
             print(f"\n❌ Error generando CSVs: {str(e)}")
             raise
     
-    def generar_kpis_principales(self, df=None, operacion='all'):
+    def _plan_operacion(self, df, operacion, plan):
+        """Devolver el plan recibido o calcular uno para un df individual"""
+        if plan is None:
+            plan = self.planificar_agregados(df, operacion)
+        return plan
+    
+    def generar_kpis_principales(self, df=None, operacion='all', plan=None):
         """Generar KPIs principales para la vista Inicio"""
-        if df is None:
-            df = self.df_clean
+        plan = self._plan_operacion(df, operacion, plan)
         
-        kpis = {
-            'metric': [
-                'total_propiedades', 'precio_promedio', 'precio_mediana',
-                'pxm2_promedio', 'pxm2_mediana', 'superficie_promedio'
-            ],
-            'value': [
-                len(df),
-                df['precio'].mean(),
-                df['precio'].median(),
-                df['precio_por_m2'].mean() if 'precio_por_m2' in df.columns else 0,
-                df['precio_por_m2'].median() if 'precio_por_m2' in df.columns else 0,
-                df['superficie_m2'].mean() if 'superficie_m2' in df.columns else 0
-            ]
-        }
-        
-        kpis_df = pd.DataFrame(kpis)
+        kpis_df = pd.DataFrame({
+            'metric': KPI_METRICAS,
+            'value': plan['kpis'].loc[operacion, KPI_METRICAS].astype(float).values
+        })
         filename = f'kpis_principales_{operacion}.csv'
-        kpis_df.to_csv(self.output_dir / 'basicos' / filename, index=False)
+        self._escribir_csv(kpis_df, 'basicos', filename)
         print(f"  ✅ KPIs principales {operacion}: {len(kpis_df)} métricas")
     
-    def generar_top_colonias(self, df=None, operacion='all'):
+    def generar_top_colonias(self, df=None, operacion='all', plan=None):
         """Generar top colonias por precio por m²"""
-        if df is None:
-            df = self.df_clean
+        plan = self._plan_operacion(df, operacion, plan)
             
-        if 'colonia' not in df.columns:
+        if 'colonias' not in plan:
             print(f"  ⚠️ No hay datos de colonia disponibles para {operacion}")
             return
         
-        # Agrupar por colonia y municipio
-        agrupacion_cols = ['colonia']
-        if 'municipio' in df.columns:
-            agrupacion_cols.append('municipio')
-        
-        # Usar agg con funciones estándar
-        agrupaciones = []
-        
-        # Estadísticas de precio
-        precio_stats = df.groupby(agrupacion_cols)['precio'].agg(['count', 'mean', 'median']).round(2)
-        precio_stats.columns = ['precio_count', 'precio_mean', 'precio_median']
-        agrupaciones.append(precio_stats)
-        
-        # Estadísticas de precio por m² si existe
-        if 'precio_por_m2' in df.columns:
-            pxm2_stats = df.groupby(agrupacion_cols)['precio_por_m2'].agg(['mean', 'median']).round(2)
-            pxm2_stats.columns = ['precio_por_m2_mean', 'precio_por_m2_median']
-            agrupaciones.append(pxm2_stats)
-        
-        # Combinar todas las estadísticas
-        top_colonias = agrupaciones[0]
-        for stats in agrupaciones[1:]:
-            top_colonias = top_colonias.join(stats)
-        
-        top_colonias = top_colonias.reset_index()
+        columnas = [c for c in ['precio_count', 'precio_mean', 'precio_median',
+                                'precio_por_m2_mean', 'precio_por_m2_median'] if c in plan['colonias'].columns]
+        top_colonias = plan['colonias'].loc[operacion, columnas].round(2).reset_index()
         
         # Filtrar colonias con al menos 3 propiedades
         top_colonias = top_colonias[top_colonias['precio_count'] >= 3]
@@ -370,20 +838,19 @@ class DashboardDataGenerator:
         top_colonias = top_colonias.head(50)
         
         filename = f'top_colonias_{operacion}.csv'
-        top_colonias.to_csv(self.output_dir / 'basicos' / filename, index=False)
+        self._escribir_csv(top_colonias, 'basicos', filename)
         print(f"  ✅ Top colonias {operacion}: {len(top_colonias)} colonias")
     
-    def generar_distribucion_tipos(self, df=None, operacion='all'):
+    def generar_distribucion_tipos(self, df=None, operacion='all', plan=None):
         """Generar distribución por tipo de propiedad"""
-        if df is None:
-            df = self.df_clean
+        plan = self._plan_operacion(df, operacion, plan)
             
-        if 'tipo_propiedad' not in df.columns:
+        if 'tipos' not in plan:
             print(f"  ⚠️ No hay datos de tipo de propiedad para {operacion}")
             return
         
         # Estadísticas por tipo de propiedad
-        precio_stats = df.groupby('tipo_propiedad')['precio'].agg(['count', 'mean', 'median']).round(2)
+        precio_stats = plan['tipos'].loc[operacion].round(2)
         precio_stats.columns = ['precio_count', 'precio_mean', 'precio_median']
         
         distribucion = precio_stats.reset_index()
@@ -393,34 +860,40 @@ class DashboardDataGenerator:
         distribucion['percentage'] = (distribucion['precio_count'] / total * 100).round(1)
         
         filename = f'distribucion_tipos_{operacion}.csv'
-        distribucion.to_csv(self.output_dir / 'basicos' / filename, index=False)
+        self._escribir_csv(distribucion, 'basicos', filename)
         print(f"  ✅ Distribución tipos {operacion}: {len(distribucion)} tipos")
     
-    def generar_histogramas(self, df=None, operacion='all'):
+    def generar_histogramas(self, df=None, operacion='all', plan=None):
         """Generar histogramas para filtros dinámicos"""
-        if df is None:
-            df = self.df_clean
-        
-        # Histograma de precios
-        self._generar_histograma_variable(df, 'precio', 'precios', operacion)
-        
-        # Histograma de superficie
-        if 'superficie_m2' in df.columns:
-            self._generar_histograma_variable(df, 'superficie_m2', 'superficie', operacion)
+        plan = self._plan_operacion(df, operacion, plan)
         
-        # Histograma de precio por m²
-        if 'precio_por_m2' in df.columns:
-            self._generar_histograma_variable(df, 'precio_por_m2', 'pxm2', operacion)
+        for _, nombre in HISTOGRAMA_VARIABLES:
+            histograma_df = plan['histogramas'].get((operacion, nombre))
+            if histograma_df is None:
+                continue
+            
+            filename = f'histograma_{nombre}_{operacion}.csv'
+            self._escribir_csv(histograma_df, 'histogramas', filename)
+            print(f"  ✅ Histograma {nombre} {operacion}: {len(histograma_df)} bins")
+        
+        # Histogramas multiresolución (conteos separados por ';') para drill-down en el frontend
+        if 'histogramas_multi' in plan:
+            multi = plan['histogramas_multi']
+            multi_df = multi[multi[CLAVE_OPERACION] == operacion].drop(columns=[CLAVE_OPERACION])
+            if len(multi_df):
+                self._escribir_csv(multi_df, 'histogramas', f'histogramas_multiresolucion_{operacion}.csv')
+                print(f"  ✅ Histogramas multiresolución {operacion}: {len(multi_df)} series")
     
-    def _generar_histograma_variable(self, df, variable, nombre, operacion='all'):
-        """Generar histograma para una variable específica"""
-        if variable not in df.columns:
-            return
-        
-        data = df[variable].dropna()
-        if len(data) == 0:
-            return
-        
+    def _escribir_csv(self, df, subdir, filename):
+        """Escribir un CSV del bundle (a través del manifest si existe)"""
+        destino = self.output_dir / subdir / filename
+        if self.manifest is not None:
+            self.manifest.escribir_csv(df, destino)
+        else:
+            df.to_csv(destino, index=False)
+    
+    def _calcular_histograma(self, data):
+        """Calcular histograma (bins Freedman-Diaconis) para una serie sin nulos"""
         # Calcular bins usando Freedman-Diaconis
         q75, q25 = np.percentile(data, [75, 25])
         iqr = q75 - q25
@@ -433,111 +906,42 @@ class DashboardDataGenerator:
         
         bins, edges = np.histogram(data, bins=n_bins)
         
-        histograma_df = pd.DataFrame({
+        return pd.DataFrame({
             'bin_min': edges[:-1],
             'bin_max': edges[1:],
             'count': bins,
             'percentage': (bins / len(data)) * 100
         })
-        
-        filename = f'histograma_{nombre}_{operacion}.csv'
-        histograma_df.to_csv(
-            self.output_dir / 'histogramas' / filename, 
-            index=False
-        )
-        print(f"  ✅ Histograma {nombre} {operacion}: {len(histograma_df)} bins")
     
-    def generar_segmentos(self, df=None, operacion='all'):
+    def generar_segmentos(self, df=None, operacion='all', plan=None):
         """Generar análisis de segmentaciones predefinidas"""
-        if df is None:
-            df = self.df_clean
-        
-        segmentos = {
-            'starter_1r_1b': {
-                'nombre': 'Starter (1R + 1-1.5B)',
-                'filtros': {'recamaras': [1], 'banos_totales': [1, 1.5]}
-            },
-            'family_2r_2b': {
-                'nombre': 'Familiar (2R + 2-2.5B)', 
-                'filtros': {'recamaras': [2], 'banos_totales': [2, 2.5]}
-            },
-            'premium_3r_3b': {
-                'nombre': 'Premium (3R + 3-3.5B)',
-                'filtros': {'recamaras': [3], 'banos_totales': [3, 3.5]}
-            }
-        }
+        plan = self._plan_operacion(df, operacion, plan)
         
-        resultados_segmentos = []
+        segmentos = plan['segmentos']
+        segmentos_df = segmentos[segmentos.index == operacion].reset_index(drop=True)
         
-        for seg_id, seg_info in segmentos.items():
-            df_segmento = self._aplicar_filtros_segmento(df, seg_info['filtros'])
-            
-            if len(df_segmento) > 0:
-                stats = self._calcular_estadisticas_segmento(df_segmento)
-                stats['segmento_id'] = seg_id
-                stats['segmento_nombre'] = seg_info['nombre']
-                resultados_segmentos.append(stats)
-        
-        if resultados_segmentos:
-            segmentos_df = pd.DataFrame(resultados_segmentos)
+        if len(segmentos_df) > 0:
             filename = f'segmentos_predefinidos_{operacion}.csv'
-            segmentos_df.to_csv(
-                self.output_dir / 'segmentos' / filename, 
-                index=False
-            )
+            self._escribir_csv(segmentos_df, 'segmentos', filename)
             print(f"  ✅ Segmentos {operacion}: {len(segmentos_df)} segmentos")
         else:
             print(f"  ⚠️ No se generaron segmentos para {operacion}")
     
-    def _aplicar_filtros_segmento(self, df, filtros):
-        """Aplicar filtros de segmentación"""
-        df_filtrado = df.copy()
-        
-        for campo, valores in filtros.items():
-            if campo in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado[campo].isin(valores)]
-        
-        return df_filtrado
-    
-    def _calcular_estadisticas_segmento(self, df_segmento):
-        """Calcular estadísticas para un segmento"""
-        stats = {
-            'count': len(df_segmento),
-            'precio_p25': df_segmento['precio'].quantile(0.25),
-            'precio_mediana': df_segmento['precio'].median(),
-            'precio_p75': df_segmento['precio'].quantile(0.75)
-        }
-        
-        if 'superficie_m2' in df_segmento.columns:
-            stats.update({
-                'superficie_mediana': df_segmento['superficie_m2'].median()
-            })
-        
-        return stats
-    
-    def generar_correlaciones(self, df=None, operacion='all'):
+    def generar_correlaciones(self, df=None, operacion='all', plan=None):
         """Generar matriz de correlaciones"""
-        if df is None:
-            df = self.df_clean
-        
-        variables_numericas = []
-        candidatas = ['precio', 'superficie_m2', 'precio_por_m2', 'recamaras', 'banos_totales', 'estacionamientos']
+        plan = self._plan_operacion(df, operacion, plan)
         
-        for var in candidatas:
-            if var in df.columns:
-                variables_numericas.append(var)
+        variables_numericas = plan['correlacion_vars']
         
         if len(variables_numericas) < 2:
             print(f"  ⚠️ No hay suficientes variables numéricas para correlaciones en {operacion}")
             return
         
-        df_corr = df[variables_numericas].dropna()
-        
-        if len(df_corr) < 10:
+        if plan['correlacion_n'].get(operacion, 0) < 10:
             print(f"  ⚠️ No hay suficientes datos para correlaciones en {operacion}")
             return
         
-        corr_pearson = df_corr.corr(method='pearson')
+        corr_pearson = plan['correlaciones'].loc[operacion]
         
         correlaciones = []
         for i, var1 in enumerate(variables_numericas):
@@ -553,72 +957,38 @@ class DashboardDataGenerator:
         if correlaciones:
             corr_df = pd.DataFrame(correlaciones)
             filename = f'matriz_correlaciones_{operacion}.csv'
-            corr_df.to_csv(
-                self.output_dir / 'correlaciones' / filename, 
-                index=False
-            )
+            self._escribir_csv(corr_df, 'correlaciones', filename)
             print(f"  ✅ Correlaciones {operacion}: {len(corr_df)} pares")
     
-    def generar_amenidades(self, df=None, operacion='all'):
-        """Analizar impacto de amenidades en precio"""
-        if df is None:
-            df = self.df_clean
+    def generar_amenidades(self, df=None, operacion='all', plan=None):
+        """Analizar impacto de amenidades en precio (global y por colonia)"""
+        plan = self._plan_operacion(df, operacion, plan)
         
-        if 'amenidades' not in df.columns:
+        if 'amenidades' not in plan:
             return
         
-        amenidades_comunes = ['piscina', 'gym', 'terraza', 'jardin', 'seguridad']
+        archivos = {'operacion': f'amenidades_impacto_{operacion}.csv',
+                    'colonia': f'amenidades_impacto_colonias_{operacion}.csv'}
         
-        resultados = []
-        
-        for amenidad in amenidades_comunes:
-            con_amenidad = df[df['amenidades'].str.contains(amenidad, case=False, na=False)]
-            sin_amenidad = df[~df['amenidades'].str.contains(amenidad, case=False, na=False)]
+        for nivel, impacto in plan['amenidades'].items():
+            impacto_df = impacto[impacto[CLAVE_OPERACION] == operacion].drop(columns=[CLAVE_OPERACION])
+            if len(impacto_df) == 0:
+                continue
             
-            if len(con_amenidad) >= 5 and len(sin_amenidad) >= 5:
-                precio_con = con_amenidad['precio'].median()
-                precio_sin = sin_amenidad['precio'].median()
-                lift_porcentaje = ((precio_con - precio_sin) / precio_sin) * 100 if precio_sin > 0 else 0
-                
-                resultados.append({
-                    'amenidad': amenidad,
-                    'count_con': len(con_amenidad),
-                    'precio_con': precio_con,
-                    'precio_sin': precio_sin,
-                    'lift_porcentaje': lift_porcentaje
-                })
-        
-        if resultados:
-            amenidades_df = pd.DataFrame(resultados)
-            filename = f'amenidades_impacto_{operacion}.csv'
-            amenidades_df.to_csv(
-                self.output_dir / 'amenidades' / filename, 
-                index=False
-            )
-            print(f"  ✅ Amenidades {operacion}: {len(amenidades_df)} analizadas")
+            self._escribir_csv(impacto_df, 'amenidades', archivos[nivel])
+            print(f"  ✅ Amenidades {operacion} ({nivel}): {len(impacto_df)} pares analizados")
     
-    def generar_datos_mapa(self, df=None, operacion='all'):
+    def generar_datos_mapa(self, df=None, operacion='all', plan=None):
         """Generar datos para el mapa de calor"""
-        if df is None:
-            df = self.df_clean
+        plan = self._plan_operacion(df, operacion, plan)
         
-        if 'colonia' not in df.columns:
+        if 'colonias' not in plan:
             print(f"  ⚠️ No hay datos de colonia para {operacion}")
             return
         
-        # Agrupar por colonia (y municipio si existe)
-        agrupacion_cols = ['colonia']
-        if 'municipio' in df.columns:
-            agrupacion_cols.append('municipio')
-        
-        # Estadísticas para el mapa
-        mapa_stats = df.groupby(agrupacion_cols).agg({
-            'precio': ['count', 'median'],
-            'longitud': 'mean',
-            'latitud': 'mean'
-        }).round(6)
-        
-        # Aplanar columnas
+        # Estadísticas para el mapa (mismo agrupamiento que top colonias)
+        mapa_stats = plan['colonias'].loc[operacion, ['precio_count', 'precio_median',
+                                                      'longitud_centro', 'latitud_centro']].round(6)
         mapa_stats.columns = ['count', 'precio_mediano', 'longitud_centro', 'latitud_centro']
         mapa_data = mapa_stats.reset_index()
         
@@ -626,33 +996,37 @@ class DashboardDataGenerator:
         mapa_data = mapa_data[mapa_data['count'] >= 3]
         
         filename = f'mapa_calor_colonias_{operacion}.csv'
-        mapa_data.to_csv(
-            self.output_dir / 'geoespacial' / filename, 
-            index=False
-        )
+        self._escribir_csv(mapa_data, 'geoespacial', filename)
         print(f"  ✅ Datos mapa {operacion}: {len(mapa_data)} colonias")
     
-    def generar_series_temporales(self, df=None, operacion='all'):
-        """Generar series temporales si hay datos de fecha"""
-        if df is None:
-            df = self.df_clean
+    def generar_tiles_mapa(self, df=None, operacion='all', plan=None):
+        """Generar teselas pre-agregadas del mapa (un archivo por zoom)"""
+        plan = self._plan_operacion(df, operacion, plan)
         
-        if 'fecha_scrape' not in df.columns:
+        if 'tiles' not in plan:
+            print(f"  ⚠️ No hay coordenadas para teselas en {operacion}")
             return
         
-        df['year_month'] = df['fecha_scrape'].dt.to_period('M')
+        tiles = plan['tiles']
+        tiles = tiles[tiles[CLAVE_OPERACION] == operacion].drop(columns=[CLAVE_OPERACION])
         
-        series_data = df.groupby('year_month').agg({
-            'precio': ['count', 'median']
-        }).reset_index()
+        for zoom, tiles_zoom in tiles.groupby('zoom'):
+            filename = f'tiles_z{zoom}_{operacion}.csv'
+            self._escribir_csv(tiles_zoom.drop(columns=['zoom']).round(6), 'geoespacial', filename)
+            print(f"  ✅ Teselas z{zoom} {operacion}: {len(tiles_zoom)} celdas")
+    
+    def generar_series_temporales(self, df=None, operacion='all', plan=None):
+        """Generar series temporales si hay datos de fecha"""
+        plan = self._plan_operacion(df, operacion, plan)
+        
+        if 'series' not in plan:
+            return
         
+        series_data = plan['series'].loc[operacion].reset_index()
         series_data.columns = ['periodo', 'count', 'precio_mediano']
         
         filename = f'series_zmg_mensual_{operacion}.csv'
-        series_data.to_csv(
-            self.output_dir / 'series_temporales' / filename, 
-            index=False
-        )
+        self._escribir_csv(series_data, 'series_temporales', filename)
         print(f"  ✅ Series temporales {operacion}: {len(series_data)} períodos")
     
     def generar_opciones_filtros(self):
@@ -663,13 +1037,13 @@ class DashboardDataGenerator:
         if 'tipo_propiedad' in df.columns:
             tipos = df['tipo_propiedad'].value_counts().reset_index()
             tipos.columns = ['tipo', 'count']
-            tipos.to_csv(self.output_dir / 'filtros' / 'opciones_tipos.csv', index=False)
+            self._escribir_csv(tipos, 'filtros', 'opciones_tipos.csv')
         
         # Municipios
         if 'municipio' in df.columns:
             municipios = df['municipio'].value_counts().reset_index()
             municipios.columns = ['municipio', 'count']
-            municipios.to_csv(self.output_dir / 'filtros' / 'opciones_municipios.csv', index=False)
+            self._escribir_csv(municipios, 'filtros', 'opciones_municipios.csv')
         
         print("  ✅ Opciones de filtros generadas")
     
@@ -698,10 +1072,15 @@ class DashboardDataGenerator:
                 archivos = list(subdir.glob('*.csv'))
                 if archivos:
                     print(f"  📂 {subdir.name}/: {len(archivos)} archivos")
+        
+        if self.manifest is not None:
+            print(f"  ✍️ Reescritos: {len(self.manifest.escritos)} | ⏭️ Sin cambios (omitidos): {len(self.manifest.omitidos)}")
+            for rel in self.manifest.omitidos:
+                print(f"     ⏭️ {rel}")
 
 
-def main():
-    """Función principal"""
+def main(force=False):
+    """Función principal (force=True regenera aunque el manifest esté vigente)"""
     # Configuración de paths
     base_path = Path(__file__).parent.parent.parent
     input_num_file = base_path / "N5_Resultados" / "Nivel_1" / "CSV" / "0.Final_Num_Sep25.csv"
@@ -727,8 +1106,18 @@ def main():
     print(f"📁 Directorio tablas: {tablas_dir}")
     print(f"📁 Directorio de salida: {output_dir}")
     
+    # Omitir la regeneración si entradas y código no cambiaron
+    output_dir.mkdir(exist_ok=True)
+    manifest = ManifestDashboard(output_dir, [input_num_file, input_ame_file])
+    cambios = manifest.cambios()
+    if not cambios and not force:
+        print(f"\n⏭️ Bundle vigente: entradas y código sin cambios, se omiten {len(manifest.previo.get('salidas', {}))} archivos")
+        return
+    if not force:
+        print(f"🔄 Regenerando por cambios en: {', '.join(cambios)}")
+    
     # Crear el generador y ejecutar
-    generator = DashboardDataGenerator(input_num_file, input_ame_file, tablas_dir, output_dir)
+    generator = DashboardDataGenerator(input_num_file, input_ame_file, tablas_dir, output_dir, manifest=manifest)
     generator.generar_todos_los_csvs()
     
     print(f"\n🎉 ¡Proceso completado!")
@@ -736,4 +1125,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    main(force='--force' in sys.argv[1:])
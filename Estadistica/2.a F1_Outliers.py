@@ -1,9 +1,15 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
 import warnings
 warnings.filterwarnings('ignore')
 
+# Métodos de detección en el eje 3 de la matriz de outliers (filas × variables × métodos)
+OUTLIER_METHODS = ['iqr', 'iqr_extreme', 'zscore', 'zscore_moderate',
+                   'modified_zscore', 'logical', 'impossible', 'frequency']
+_METHOD_POS = {name: k for k, name in enumerate(OUTLIER_METHODS)}
+# Métodos que se combinan para el total único y el consenso
+_MAIN_METHODS = [_METHOD_POS['iqr'], _METHOD_POS['zscore'], _METHOD_POS['logical']]
+
 class OutliersDetectorInmuebles:
     """
     Detector y evaluador de outliers para dataset de inmuebles con criterios
@@ -50,125 +56,6 @@ class OutliersDetectorInmuebles:
             if col in self.df.columns:
                 self.df[col] = pd.to_numeric(self.df[col], errors='coerce')
     
-    def detect_iqr_outliers(self, series, variable_name):
-        """Detecta outliers usando método IQR"""
-        valid_data = series.dropna()
-        if len(valid_data) < 4:
-            return {'method': 'IQR', 'outliers_idx': [], 'bounds': None, 'count': 0}
-        
-        Q1 = valid_data.quantile(0.25)
-        Q3 = valid_data.quantile(0.75)
-        IQR = Q3 - Q1
-        
-        # Límites IQR estándar
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        
-        # Límites IQR extremos (3 * IQR)
-        extreme_lower = Q1 - 3 * IQR
-        extreme_upper = Q3 + 3 * IQR
-        
-        # Identificar outliers
-        outliers_mask = (series < lower_bound) | (series > upper_bound)
-        extreme_outliers_mask = (series < extreme_lower) | (series > extreme_upper)
-        
-        outliers_idx = series[outliers_mask].index.tolist()
-        extreme_outliers_idx = series[extreme_outliers_mask].index.tolist()
-        
-        return {
-            'method': 'IQR',
-            'outliers_idx': outliers_idx,
-            'extreme_outliers_idx': extreme_outliers_idx,
-            'bounds': {'lower': lower_bound, 'upper': upper_bound},
-            'extreme_bounds': {'lower': extreme_lower, 'upper': extreme_upper},
-            'count': len(outliers_idx),
-            'extreme_count': len(extreme_outliers_idx),
-            'percentage': (len(outliers_idx) / len(valid_data)) * 100,
-            'Q1': Q1, 'Q3': Q3, 'IQR': IQR
-        }
-    
-    def detect_zscore_outliers(self, series, threshold=3):
-        """Detecta outliers usando Z-Score"""
-        valid_data = series.dropna()
-        if len(valid_data) < 3:
-            return {'method': 'Z-Score', 'outliers_idx': [], 'count': 0}
-        
-        z_scores = np.abs(stats.zscore(valid_data))
-        outliers_mask = z_scores > threshold
-        moderate_outliers_mask = z_scores > 2  # Outliers moderados
-        
-        outliers_idx = valid_data[outliers_mask].index.tolist()
-        moderate_outliers_idx = valid_data[moderate_outliers_mask].index.tolist()
-        
-        return {
-            'method': 'Z-Score',
-            'outliers_idx': outliers_idx,
-            'moderate_outliers_idx': moderate_outliers_idx,
-            'count': len(outliers_idx),
-            'moderate_count': len(moderate_outliers_idx),
-            'percentage': (len(outliers_idx) / len(valid_data)) * 100,
-            'threshold': threshold,
-            'max_zscore': z_scores.max(),
-            'mean_zscore': z_scores.mean()
-        }
-    
-    def detect_logical_outliers(self, series, variable_name):
-        """Detecta outliers usando rangos lógicos específicos del dominio"""
-        if variable_name not in self.logical_ranges:
-            return {'method': 'Logical', 'outliers_idx': [], 'count': 0}
-        
-        ranges = self.logical_ranges[variable_name]
-        valid_data = series.dropna()
-        
-        # Outliers por rango lógico
-        logical_outliers_mask = (series < ranges['min']) | (series > ranges['max'])
-        outliers_idx = series[logical_outliers_mask].index.tolist()
-        
-        # Valores imposibles (ej: área negativa)
-        impossible_mask = series < 0
-        impossible_idx = series[impossible_mask].index.tolist()
-        
-        return {
-            'method': 'Logical',
-            'outliers_idx': outliers_idx,
-            'impossible_idx': impossible_idx,
-            'count': len(outliers_idx),
-            'impossible_count': len(impossible_idx),
-            'percentage': (len(outliers_idx) / len(valid_data)) * 100 if len(valid_data) > 0 else 0,
-            'ranges': ranges,
-            'min_value': series.min(),
-            'max_value': series.max()
-        }
-    
-    def detect_frequency_outliers(self, series, threshold_pct=1):
-        """Detecta valores raros por frecuencia baja"""
-        valid_data = series.dropna()
-        if len(valid_data) < 10:
-            return {'method': 'Frequency', 'outliers_idx': [], 'count': 0}
-        
-        # Calcular frecuencias
-        value_counts = valid_data.value_counts()
-        total_count = len(valid_data)
-        
-        # Valores que aparecen menos del threshold_pct%
-        rare_threshold = (threshold_pct / 100) * total_count
-        rare_values = value_counts[value_counts <= rare_threshold].index
-        
-        # Encontrar índices de valores raros
-        outliers_idx = []
-        for rare_val in rare_values:
-            outliers_idx.extend(series[series == rare_val].index.tolist())
-        
-        return {
-            'method': 'Frequency',
-            'outliers_idx': outliers_idx,
-            'count': len(outliers_idx),
-            'percentage': (len(outliers_idx) / len(valid_data)) * 100,
-            'rare_values': rare_values.tolist(),
-            'threshold_pct': threshold_pct,
-            'unique_values': len(value_counts)
-        }
-    
     def evaluate_outlier_context(self, variable_name, outlier_info, series):
         """Evalúa el contexto del outlier para determinar si es error o valor legítimo"""
         recommendations = []
@@ -257,85 +144,215 @@ class OutliersDetectorInmuebles:
         
         return recommendations
     
-    def analyze_variable(self, variable_name):
-        """Analiza una variable específica con todos los métodos"""
-        if variable_name not in self.df.columns:
-            return None
+    def _group_stats(self, values, codes):
+        """Estadísticos por grupo (grupos × variables) en una sola pasada de groupby"""
+        frame = pd.DataFrame(values)
+        grouped = frame.groupby(codes, sort=True)
+        quartiles = grouped.quantile([0.25, 0.5, 0.75])
+        median = quartiles.xs(0.5, level=1).to_numpy()
+        deviation = np.abs(values - median[codes])
+        return {
+            'count': grouped.count().to_numpy(),
+            'q1': quartiles.xs(0.25, level=1).to_numpy(),
+            'median': median,
+            'q3': quartiles.xs(0.75, level=1).to_numpy(),
+            'mean': grouped.mean().to_numpy(),
+            'std': grouped.std(ddof=0).to_numpy(),
+            'mad': pd.DataFrame(deviation).groupby(codes, sort=True).median().to_numpy()
+        }
+    
+    def compute_outlier_matrix(self, variables, group_cols=None, min_group_size=30,
+                               zscore_threshold=3, freq_threshold_pct=1):
+        """
+        Calcula las banderas de todos los métodos como una matriz booleana
+        (filas × variables × métodos, ver OUTLIER_METHODS).
+        
+        Con group_cols (ej. ['Colonia', 'tipo_propiedad', 'operacion']) los umbrales
+        estadísticos se calculan por grupo; los grupos con menos de min_group_size
+        observaciones válidas usan los umbrales globales. Los rangos lógicos son
+        siempre globales.
+        """
+        variables = [v for v in variables if v in self.df.columns]
+        values = self.df[variables].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        n_rows = len(values)
+        
+        if group_cols and n_rows > 0:
+            codes = self.df.groupby(list(group_cols), sort=False, dropna=False).ngroup().to_numpy()
+        else:
+            codes = np.zeros(n_rows, dtype=np.int64)
+        
+        global_stats = self._group_stats(values, np.zeros(n_rows, dtype=np.int64)) if n_rows > 0 else None
+        if n_rows == 0:
+            stats_used = {}
+            uses_global = np.zeros((0, len(variables)), dtype=bool)
+        elif group_cols:
+            group_stats = self._group_stats(values, codes)
+            uses_global = group_stats['count'] < min_group_size
+            stats_used = {k: np.where(uses_global, global_stats[k], group_stats[k]) for k in group_stats}
+        else:
+            uses_global = np.ones((1, len(variables)), dtype=bool)
+            stats_used = global_stats
+        
+        matrix = np.zeros((n_rows, len(variables), len(OUTLIER_METHODS)), dtype=bool)
+        zscores = np.full((n_rows, len(variables)), np.nan)
         
+        if n_rows > 0:
+            row = {k: v[codes] for k, v in stats_used.items()}
+            iqr = row['q3'] - row['q1']
+            enough_iqr = row['count'] >= 4
+            enough_z = row['count'] >= 3
+            
+            with np.errstate(invalid='ignore', divide='ignore'):
+                # 1. IQR estándar (1.5) y extremo (3)
+                matrix[:, :, _METHOD_POS['iqr']] = enough_iqr & (
+                    (values < row['q1'] - 1.5 * iqr) | (values > row['q3'] + 1.5 * iqr))
+                matrix[:, :, _METHOD_POS['iqr_extreme']] = enough_iqr & (
+                    (values < row['q1'] - 3 * iqr) | (values > row['q3'] + 3 * iqr))
+                
+                # 2. Z-Score (ddof=0, igual que scipy.stats.zscore)
+                zscores = np.where(enough_z, np.abs(values - row['mean']) / row['std'], np.nan)
+                matrix[:, :, _METHOD_POS['zscore']] = zscores > zscore_threshold
+                matrix[:, :, _METHOD_POS['zscore_moderate']] = zscores > 2
+                
+                # 3. Z-Score modificado (mediana y MAD)
+                modified = np.where(row['mad'] != 0,
+                                    0.6745 * np.abs(values - row['median']) / row['mad'], 0)
+                matrix[:, :, _METHOD_POS['modified_zscore']] = enough_z & (modified > 3.5)
+            
+            # 4. Rangos lógicos del dominio
+            lower = np.array([self.logical_ranges.get(v, {}).get('min', np.nan) for v in variables])
+            upper = np.array([self.logical_ranges.get(v, {}).get('max', np.nan) for v in variables])
+            has_range = ~np.isnan(lower)
+            matrix[:, :, _METHOD_POS['logical']] = (values < lower) | (values > upper)
+            matrix[:, :, _METHOD_POS['impossible']] = has_range & (values < 0)
+            
+            # 5. Frecuencia (solo variables con menos de 10% de valores únicos)
+            for j, var in enumerate(variables):
+                column = pd.Series(values[:, j])
+                if column.nunique() >= n_rows * 0.1:
+                    continue
+                value_counts = column.map(column.value_counts()).to_numpy(dtype=float)
+                if group_cols:
+                    group_counts = column.groupby([codes, column]).transform('size').to_numpy(dtype=float)
+                    value_counts = np.where(uses_global[codes, j], value_counts, group_counts)
+                valid = row['count'][:, j]
+                matrix[:, j, _METHOD_POS['frequency']] = (valid >= 10) & (
+                    value_counts <= (freq_threshold_pct / 100) * valid)
+        
+        self.outlier_matrix = matrix
+        self.outlier_variables = variables
+        self.outlier_zscores = zscores
+        self.outlier_group_cols = list(group_cols) if group_cols else []
+        self._global_stats = global_stats
+        self.outlier_bounds = self._bounds_table(variables, codes, stats_used, uses_global)
+        return matrix
+    
+    def _bounds_table(self, variables, codes, stats_used, uses_global):
+        """Tabla de umbrales efectivos por grupo y variable"""
+        if not stats_used:
+            return pd.DataFrame()
+        n_groups, n_vars = stats_used['count'].shape
+        table = pd.DataFrame({
+            'variable': np.tile(variables, n_groups),
+            'n_validos': stats_used['count'].ravel(),
+            'q1': stats_used['q1'].ravel(),
+            'mediana': stats_used['median'].ravel(),
+            'q3': stats_used['q3'].ravel(),
+            'media': stats_used['mean'].ravel(),
+            'desv_std': stats_used['std'].ravel(),
+            'mad': stats_used['mad'].ravel(),
+            'usa_umbral_global': np.broadcast_to(uses_global, (n_groups, n_vars)).ravel()
+        })
+        iqr = table['q3'] - table['q1']
+        table['limite_inf_iqr'] = table['q1'] - 1.5 * iqr
+        table['limite_sup_iqr'] = table['q3'] + 1.5 * iqr
+        if self.outlier_group_cols:
+            first_rows = pd.Series(np.arange(len(codes))).groupby(codes, sort=True).first().to_numpy()
+            keys = self.df[self.outlier_group_cols].iloc[first_rows].reset_index(drop=True)
+            keys = keys.loc[keys.index.repeat(n_vars)].reset_index(drop=True)
+            table = pd.concat([keys, table], axis=1)
+        return table
+    
+    def _results_from_matrix(self, j):
+        """Construye el resultado de una variable a partir de su rebanada de la matriz"""
+        variable_name = self.outlier_variables[j]
         series = self.df[variable_name]
+        flags = self.outlier_matrix[:, j, :]
+        counts = flags.sum(axis=0)
+        valid = int(series.notna().sum())
+        pct = lambda c: (c / valid) * 100 if valid > 0 else 0
+        
+        q1 = self._global_stats['q1'][0, j] if self._global_stats else np.nan
+        q3 = self._global_stats['q3'][0, j] if self._global_stats else np.nan
+        iqr = q3 - q1
+        z = self.outlier_zscores[:, j]
+        has_z = bool(np.any(~np.isnan(z)))
         
-        # Aplicar todos los métodos de detección
         results = {
             'variable': variable_name,
             'total_observations': len(series),
             'missing_values': series.isnull().sum(),
-            'valid_observations': len(series.dropna())
+            'valid_observations': valid,
+            'iqr': {
+                'method': 'IQR',
+                'count': int(counts[_METHOD_POS['iqr']]),
+                'extreme_count': int(counts[_METHOD_POS['iqr_extreme']]),
+                'percentage': pct(counts[_METHOD_POS['iqr']]),
+                'bounds': {'lower': q1 - 1.5 * iqr, 'upper': q3 + 1.5 * iqr} if valid >= 4 else None,
+                'Q1': q1, 'Q3': q3, 'IQR': iqr
+            },
+            'zscore': {
+                'method': 'Z-Score',
+                'count': int(counts[_METHOD_POS['zscore']]),
+                'moderate_count': int(counts[_METHOD_POS['zscore_moderate']]),
+                'percentage': pct(counts[_METHOD_POS['zscore']]),
+                'max_zscore': np.nanmax(z) if has_z else np.nan,
+                'mean_zscore': np.nanmean(z) if has_z else np.nan
+            },
+            'logical': {
+                'method': 'Logical',
+                'count': int(counts[_METHOD_POS['logical']]),
+                'impossible_count': int(counts[_METHOD_POS['impossible']]),
+                'percentage': pct(counts[_METHOD_POS['logical']]),
+                'ranges': self.logical_ranges.get(variable_name),
+                'min_value': series.min(),
+                'max_value': series.max()
+            },
+            'modified_zscore': {
+                'method': 'Modified Z-Score',
+                'count': int(counts[_METHOD_POS['modified_zscore']]),
+                'percentage': pct(counts[_METHOD_POS['modified_zscore']])
+            },
+            'frequency': {
+                'method': 'Frequency',
+                'count': int(counts[_METHOD_POS['frequency']]),
+                'percentage': pct(counts[_METHOD_POS['frequency']])
+            }
         }
         
-        # Método IQR
-        iqr_result = self.detect_iqr_outliers(series, variable_name)
-        results['iqr'] = iqr_result
-        
-        # Método Z-Score
-        zscore_result = self.detect_zscore_outliers(series)
-        results['zscore'] = zscore_result
-        
-        # Método de rangos lógicos
-        logical_result = self.detect_logical_outliers(series, variable_name)
-        results['logical'] = logical_result
-        
-        # Método de frecuencia (solo para variables con pocos valores únicos)
-        if series.nunique() < len(series) * 0.1:  # Menos del 10% de valores únicos
-            freq_result = self.detect_frequency_outliers(series)
-            results['frequency'] = freq_result
-        
-        # Combinar todos los outliers únicos
-        all_outliers = set()
-        methods_detecting = []
-        
-        if iqr_result['count'] > 0:
-            all_outliers.update(iqr_result['outliers_idx'])
-            methods_detecting.append('IQR')
-        
-        if zscore_result['count'] > 0:
-            all_outliers.update(zscore_result['outliers_idx'])
-            methods_detecting.append('Z-Score')
-        
-        if logical_result['count'] > 0:
-            all_outliers.update(logical_result['outliers_idx'])
-            methods_detecting.append('Logical')
-        
+        # Combinar IQR, Z-Score y lógicos; consenso = detectado por todos los métodos activos
+        main = flags[:, _MAIN_METHODS]
+        active = main.any(axis=0)
+        union = main.any(axis=1)
+        consensus = np.all(main | ~active, axis=1) & (active.sum() >= 2)
         results['summary'] = {
-            'total_unique_outliers': len(all_outliers),
-            'outlier_indices': list(all_outliers),
-            'percentage_outliers': (len(all_outliers) / len(series.dropna())) * 100 if len(series.dropna()) > 0 else 0,
-            'methods_detecting': methods_detecting,
-            'consensus_outliers': []  # Outliers detectados por múltiples métodos
+            'total_unique_outliers': int(union.sum()),
+            'consensus_count': int(consensus.sum()),
+            'percentage_outliers': pct(union.sum()),
+            'methods_detecting': [name for name, on in zip(['IQR', 'Z-Score', 'Logical'], active) if on]
         }
-        
-        # Encontrar outliers detectados por múltiples métodos
-        method_sets = []
-        if iqr_result['count'] > 0:
-            method_sets.append(set(iqr_result['outliers_idx']))
-        if zscore_result['count'] > 0:
-            method_sets.append(set(zscore_result['outliers_idx']))
-        if logical_result['count'] > 0:
-            method_sets.append(set(logical_result['outliers_idx']))
-        
-        if len(method_sets) >= 2:
-            consensus = method_sets[0]
-            for method_set in method_sets[1:]:
-                consensus = consensus.intersection(method_set)
-            results['summary']['consensus_outliers'] = list(consensus)
-        
-        # Evaluar contexto y generar recomendaciones
-        recommendations = self.evaluate_outlier_context(variable_name, results['summary'], series)
-        results['recommendations'] = recommendations
-        
+        results['recommendations'] = self.evaluate_outlier_context(variable_name, results['summary'], series)
         return results
     
-    def analyze_all_numeric_variables(self):
-        """Analiza todas las variables numéricas"""
+    def analyze_variable(self, variable_name, group_cols=None):
+        """Analiza una variable específica con todos los métodos"""
+        if variable_name not in self.df.columns:
+            return None
+        self.compute_outlier_matrix([variable_name], group_cols=group_cols)
+        return self._results_from_matrix(0)
+    
+    def analyze_all_numeric_variables(self, group_cols=None):
+        """Analiza todas las variables numéricas con una sola matriz de outliers"""
         # Variables a excluir del análisis de outliers
         variables_excluir = {
             'id', 'PaginaWeb', 'Ciudad', 'Fecha_Scrap', 
@@ -348,108 +365,96 @@ class OutliersDetectorInmuebles:
         
         print(f"🔍 Analizando outliers en {len(numeric_vars)} variables numéricas...")
         print(f"📋 Variables a analizar: {', '.join(numeric_vars)}")
+        if group_cols:
+            print(f"🧩 Umbrales por grupo: {', '.join(group_cols)}")
         
-        for var in numeric_vars:
-            print(f"   Procesando: {var}")
-            self.outliers_results[var] = self.analyze_variable(var)
+        self.compute_outlier_matrix(numeric_vars, group_cols=group_cols)
+        for j, var in enumerate(self.outlier_variables):
+            self.outliers_results[var] = self._results_from_matrix(j)
     
     def create_outliers_summary(self):
-        """Crea un resumen consolidado de todos los outliers"""
-        summary_data = []
-        
-        for var_name, results in self.outliers_results.items():
-            if results is None:
-                continue
-            
-            # Información básica
-            row = {
-                'variable': var_name,
-                'total_obs': results['total_observations'],
-                'missing_values': results['missing_values'],
-                'valid_obs': results['valid_observations']
-            }
-            
-            # Resultados por método
-            row['iqr_outliers'] = results['iqr']['count']
-            row['iqr_percentage'] = results['iqr']['percentage']
-            row['iqr_lower_bound'] = results['iqr']['bounds']['lower'] if results['iqr']['bounds'] else None
-            row['iqr_upper_bound'] = results['iqr']['bounds']['upper'] if results['iqr']['bounds'] else None
-            
-            row['zscore_outliers'] = results['zscore']['count']
-            row['zscore_percentage'] = results['zscore']['percentage']
-            row['max_zscore'] = results['zscore']['max_zscore']
-            
-            row['logical_outliers'] = results['logical']['count']
-            row['logical_percentage'] = results['logical']['percentage']
-            row['impossible_values'] = results['logical']['impossible_count']
-            
-            # Resumen general
-            row['total_unique_outliers'] = results['summary']['total_unique_outliers']
-            row['consensus_outliers'] = len(results['summary']['consensus_outliers'])
-            row['methods_agreeing'] = len(results['summary']['methods_detecting'])
-            row['outlier_percentage_total'] = results['summary']['percentage_outliers']
-            
-            # Recomendaciones
-            high_severity = sum(1 for r in results['recommendations'] if r['severity'] == 'HIGH')
-            medium_severity = sum(1 for r in results['recommendations'] if r['severity'] == 'MEDIUM')
-            low_severity = sum(1 for r in results['recommendations'] if r['severity'] == 'LOW')
-            
-            row['high_severity_issues'] = high_severity
-            row['medium_severity_issues'] = medium_severity
-            row['low_severity_issues'] = low_severity
-            
-            # Acción recomendada principal
-            if high_severity > 0:
-                row['main_recommendation'] = 'CRITICAL_REVIEW'
-            elif medium_severity > 0:
-                row['main_recommendation'] = 'INVESTIGATE'
-            else:
-                row['main_recommendation'] = 'MONITOR'
-            
-            summary_data.append(row)
-        
-        return pd.DataFrame(summary_data)
+        """Crea un resumen consolidado de todos los outliers a partir de la matriz"""
+        variables = [v for v in self.outlier_variables if self.outliers_results.get(v) is not None]
+        if not variables:
+            return pd.DataFrame()
+        
+        positions = [self.outlier_variables.index(v) for v in variables]
+        results = [self.outliers_results[v] for v in variables]
+        counts = self.outlier_matrix[:, positions, :].sum(axis=0)
+        valid = np.array([r['valid_observations'] for r in results], dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pct = lambda c: np.where(valid > 0, c / valid * 100, 0)
+        
+        summary = pd.DataFrame({
+            'variable': variables,
+            'total_obs': [r['total_observations'] for r in results],
+            'missing_values': [r['missing_values'] for r in results],
+            'valid_obs': valid.astype(int),
+            'iqr_outliers': counts[:, _METHOD_POS['iqr']],
+            'iqr_percentage': pct(counts[:, _METHOD_POS['iqr']]),
+            'iqr_lower_bound': [r['iqr']['bounds']['lower'] if r['iqr']['bounds'] else None for r in results],
+            'iqr_upper_bound': [r['iqr']['bounds']['upper'] if r['iqr']['bounds'] else None for r in results],
+            'zscore_outliers': counts[:, _METHOD_POS['zscore']],
+            'zscore_percentage': pct(counts[:, _METHOD_POS['zscore']]),
+            'max_zscore': [r['zscore']['max_zscore'] for r in results],
+            'logical_outliers': counts[:, _METHOD_POS['logical']],
+            'logical_percentage': pct(counts[:, _METHOD_POS['logical']]),
+            'impossible_values': counts[:, _METHOD_POS['impossible']],
+            'total_unique_outliers': [r['summary']['total_unique_outliers'] for r in results],
+            'consensus_outliers': [r['summary']['consensus_count'] for r in results],
+            'methods_agreeing': [len(r['summary']['methods_detecting']) for r in results],
+            'outlier_percentage_total': [r['summary']['percentage_outliers'] for r in results]
+        })
+        
+        # Recomendaciones
+        for severity, column in [('HIGH', 'high_severity_issues'), ('MEDIUM', 'medium_severity_issues'),
+                                 ('LOW', 'low_severity_issues')]:
+            summary[column] = [sum(1 for rec in r['recommendations'] if rec['severity'] == severity)
+                               for r in results]
+        
+        # Acción recomendada principal
+        summary['main_recommendation'] = np.select(
+            [summary['high_severity_issues'] > 0, summary['medium_severity_issues'] > 0],
+            ['CRITICAL_REVIEW', 'INVESTIGATE'], default='MONITOR')
+        
+        return summary
     
     def create_detailed_outliers_report(self):
-        """Crea un reporte detallado de cada outlier identificado"""
-        detailed_data = []
-        
-        for var_name, results in self.outliers_results.items():
-            if results is None or results['summary']['total_unique_outliers'] == 0:
-                continue
-            
-            outlier_indices = results['summary']['outlier_indices']
-            
-            for idx in outlier_indices:
-                row = {
-                    'variable': var_name,
-                    'index': idx,
-                    'value': self.df.loc[idx, var_name],
-                    'detected_by_iqr': idx in results['iqr']['outliers_idx'],
-                    'detected_by_zscore': idx in results['zscore']['outliers_idx'],
-                    'detected_by_logical': idx in results['logical']['outliers_idx'],
-                    'methods_count': sum([
-                        idx in results['iqr']['outliers_idx'],
-                        idx in results['zscore']['outliers_idx'],
-                        idx in results['logical']['outliers_idx']
-                    ]),
-                    'is_consensus': idx in results['summary']['consensus_outliers'],
-                    'is_impossible': idx in results['logical'].get('impossible_idx', [])
-                }
-                
-                # Añadir información contextual del registro
-                if 'precio' in self.df.columns:
-                    row['precio'] = self.df.loc[idx, 'precio']
-                if 'area_m2' in self.df.columns:
-                    row['area_m2'] = self.df.loc[idx, 'area_m2']
-                if 'Ciudad' in self.df.columns:
-                    row['ciudad'] = self.df.loc[idx, 'Ciudad']
-                if 'Colonia' in self.df.columns:
-                    row['colonia'] = self.df.loc[idx, 'Colonia']
-                
-                detailed_data.append(row)
-        
-        return pd.DataFrame(detailed_data)
+        """Crea un reporte detallado de cada outlier identificado a partir de la matriz"""
+        if getattr(self, 'outlier_matrix', None) is None or self.outlier_matrix.size == 0:
+            return pd.DataFrame()
+        
+        main = self.outlier_matrix[:, :, _MAIN_METHODS]
+        active = main.any(axis=0)
+        consensus = np.all(main | ~active[None, :, :], axis=2) & (active.sum(axis=1) >= 2)[None, :]
+        union = main.any(axis=2)
+        
+        # Orden variable → fila, igual que el recorrido original por variable
+        var_pos, row_pos = np.nonzero(union.T)
+        values = self.df[self.outlier_variables].to_numpy()
+        
+        detailed = pd.DataFrame({
+            'variable': np.asarray(self.outlier_variables, dtype=object)[var_pos],
+            'index': self.df.index.to_numpy()[row_pos],
+            'value': values[row_pos, var_pos],
+            'detected_by_iqr': main[row_pos, var_pos, 0],
+            'detected_by_zscore': main[row_pos, var_pos, 1],
+            'detected_by_logical': main[row_pos, var_pos, 2],
+            'methods_count': main[row_pos, var_pos, :].sum(axis=1),
+            'is_consensus': consensus[row_pos, var_pos],
+            'is_impossible': self.outlier_matrix[row_pos, var_pos, _METHOD_POS['impossible']]
+        })
+        
+        # Añadir información contextual del registro
+        for source, target in [('precio', 'precio'), ('area_m2', 'area_m2'),
+                               ('Ciudad', 'ciudad'), ('Colonia', 'colonia')]:
+            if source in self.df.columns:
+                detailed[target] = self.df[source].to_numpy()[row_pos]
+        for col in self.outlier_group_cols:
+            if col not in ('Ciudad', 'Colonia'):
+                detailed[col] = self.df[col].to_numpy()[row_pos]
+        
+        return detailed
     
     def generate_recommendations_report(self):
         """Genera un reporte de recomendaciones por variable"""
@@ -471,8 +476,8 @@ class OutliersDetectorInmuebles:
         
         return pd.DataFrame(recommendations_data)
     
-    def run_complete_analysis(self, output_file='num_F1Outl_Sep25_01.csv'):
-        """Ejecuta el análisis completo de outliers"""
+    def run_complete_analysis(self, output_file='num_F1Outl_Sep25_01.csv', group_cols=None):
+        """Ejecuta el análisis completo de outliers (umbrales por grupo opcionales)"""
         print("🔍 ANÁLISIS DE OUTLIERS - DATASET INMUEBLES")
         print("=" * 60)
         
@@ -493,11 +498,12 @@ class OutliersDetectorInmuebles:
         print(f"📊 Variables a analizar: {len(variables_analizar)}")
         print(f"   Variables: {list(variables_analizar)}")
         
-        # Analizar variables
-        for col in variables_analizar:
-            if col in self.df.columns:
-                print(f"   Analizando outliers en: {col}")
-                self.detect_outliers_variable(col)
+        # Analizar variables: una sola matriz para todos los métodos
+        variables_analizar = [col for col in variables_analizar if self.df[col].notna().any()]
+        self.compute_outlier_matrix(variables_analizar, group_cols=group_cols)
+        for j, col in enumerate(self.outlier_variables):
+            print(f"   Analizando outliers en: {col}")
+            self.outliers_results[col] = self._method_counts(j)
         
         # Crear reporte consolidado
         print("\n📊 Generando reporte consolidado...")
@@ -517,15 +523,15 @@ class OutliersDetectorInmuebles:
                 'pct_nulos': (self.df[variable].isnull().sum() / len(self.df)) * 100,
                 
                 # Outliers por método
-                'outliers_iqr': len(results.get('iqr_outliers', [])),
-                'outliers_zscore': len(results.get('zscore_outliers', [])),
-                'outliers_logicos': len(results.get('logical_outliers', [])),
-                'outliers_modificados_zscore': len(results.get('modified_zscore_outliers', [])),
+                'outliers_iqr': results.get('iqr_outliers', 0),
+                'outliers_zscore': results.get('zscore_outliers', 0),
+                'outliers_logicos': results.get('logical_outliers', 0),
+                'outliers_modificados_zscore': results.get('modified_zscore_outliers', 0),
                 
                 # Percentiles de outliers
-                'pct_outliers_iqr': (len(results.get('iqr_outliers', [])) / self.df[variable].count()) * 100 if self.df[variable].count() > 0 else 0,
-                'pct_outliers_zscore': (len(results.get('zscore_outliers', [])) / self.df[variable].count()) * 100 if self.df[variable].count() > 0 else 0,
-                'pct_outliers_logicos': (len(results.get('logical_outliers', [])) / self.df[variable].count()) * 100 if self.df[variable].count() > 0 else 0,
+                'pct_outliers_iqr': (results.get('iqr_outliers', 0) / self.df[variable].count()) * 100 if self.df[variable].count() > 0 else 0,
+                'pct_outliers_zscore': (results.get('zscore_outliers', 0) / self.df[variable].count()) * 100 if self.df[variable].count() > 0 else 0,
+                'pct_outliers_logicos': (results.get('logical_outliers', 0) / self.df[variable].count()) * 100 if self.df[variable].count() > 0 else 0,
                 
                 # Estadísticas básicas
                 'valor_min': self.df[variable].min(),
@@ -554,6 +560,9 @@ class OutliersDetectorInmuebles:
         # Crear DataFrame y guardar
         outliers_df = pd.DataFrame(outliers_data)
         outliers_df.to_csv(output_file, index=False, encoding='utf-8-sig')
+        if group_cols:
+            bounds_file = output_file.replace('.csv', '_limites_grupo.csv')
+            self.outlier_bounds.to_csv(bounds_file, index=False, encoding='utf-8-sig')
         
         # Mostrar resumen ejecutivo
         print("\n" + "="*60)
@@ -577,63 +586,34 @@ class OutliersDetectorInmuebles:
         
         print(f"\n✅ Análisis completado")
         print(f"📁 Archivo generado: {output_file}")
+        if group_cols:
+            print(f"📁 Límites por grupo: {bounds_file}")
         
         return outliers_df
     
-    def detect_outliers_variable(self, column):
+    def detect_outliers_variable(self, column, group_cols=None):
         """Detecta outliers en una variable específica usando múltiples métodos"""
         if column not in self.df.columns or self.df[column].isnull().all():
             return
         
-        outliers_info = {}
-        series_clean = self.df[column].dropna()
-        
-        if len(series_clean) == 0:
-            return
-        
-        # 1. Método IQR
-        Q1 = series_clean.quantile(0.25)
-        Q3 = series_clean.quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        
-        iqr_outliers = self.df[(self.df[column] < lower_bound) | (self.df[column] > upper_bound)].index.tolist()
-        outliers_info['iqr_outliers'] = iqr_outliers
-        
-        # 2. Método Z-Score
-        if len(series_clean) > 1:
-            z_scores = np.abs(stats.zscore(series_clean))
-            zscore_outliers = series_clean[z_scores > 3].index.tolist()
-            outliers_info['zscore_outliers'] = zscore_outliers
-        else:
-            outliers_info['zscore_outliers'] = []
-        
-        # 3. Z-Score Modificado (más robusto)
-        if len(series_clean) > 1:
-            median = series_clean.median()
-            mad = np.median(np.abs(series_clean - median))
-            modified_z_scores = 0.6745 * (series_clean - median) / mad if mad != 0 else np.zeros(len(series_clean))
-            modified_zscore_outliers = series_clean[np.abs(modified_z_scores) > 3.5].index.tolist()
-            outliers_info['modified_zscore_outliers'] = modified_zscore_outliers
-        else:
-            outliers_info['modified_zscore_outliers'] = []
-        
-        # 4. Rangos lógicos
-        logical_outliers = []
-        if column in self.logical_ranges:
-            min_val = self.logical_ranges[column]['min']
-            max_val = self.logical_ranges[column]['max']
-            logical_outliers = self.df[(self.df[column] < min_val) | (self.df[column] > max_val)].index.tolist()
-        outliers_info['logical_outliers'] = logical_outliers
-        
-        self.outliers_results[column] = outliers_info
+        self.compute_outlier_matrix([column], group_cols=group_cols)
+        self.outliers_results[column] = self._method_counts(0)
+    
+    def _method_counts(self, j):
+        """Conteos por método de la variable j de la matriz de outliers"""
+        counts = self.outlier_matrix[:, j, :].sum(axis=0)
+        return {
+            'iqr_outliers': int(counts[_METHOD_POS['iqr']]),
+            'zscore_outliers': int(counts[_METHOD_POS['zscore']]),
+            'modified_zscore_outliers': int(counts[_METHOD_POS['modified_zscore']]),
+            'logical_outliers': int(counts[_METHOD_POS['logical']])
+        }
     
     def _evaluar_severidad(self, variable, results):
         """Evalúa la severidad de los outliers en una variable"""
         total_records = len(self.df)
-        iqr_outliers = len(results.get('iqr_outliers', []))
-        logical_outliers = len(results.get('logical_outliers', []))
+        iqr_outliers = results.get('iqr_outliers', 0)
+        logical_outliers = results.get('logical_outliers', 0)
         
         iqr_pct = (iqr_outliers / total_records) * 100 if total_records > 0 else 0
         logical_pct = (logical_outliers / total_records) * 100 if total_records > 0 else 0
@@ -650,8 +630,7 @@ class OutliersDetectorInmuebles:
     def _generar_recomendacion(self, variable, results):
         """Genera recomendación de acción para los outliers"""
         severidad = self._evaluar_severidad(variable, results)
-        logical_outliers = len(results.get('logical_outliers', []))
-        iqr_outliers = len(results.get('iqr_outliers', []))
+        logical_outliers = results.get('logical_outliers', 0)
         
         if logical_outliers > 0:
             return 'ELIMINAR_VALORES_IMPOSIBLES'
@@ -666,9 +645,9 @@ class OutliersDetectorInmuebles:
     
     def _generar_justificacion(self, variable, results):
         """Genera justificación para la recomendación"""
-        iqr_outliers = len(results.get('iqr_outliers', []))
-        logical_outliers = len(results.get('logical_outliers', []))
-        zscore_outliers = len(results.get('zscore_outliers', []))
+        iqr_outliers = results.get('iqr_outliers', 0)
+        logical_outliers = results.get('logical_outliers', 0)
+        zscore_outliers = results.get('zscore_outliers', 0)
         
         justificaciones = []
         
@@ -6,12 +6,276 @@ Registra todas las propiedades eliminadas en cada proceso de análisis
 import pandas as pd
 import numpy as np
 import os
+import re
+import uuid
+import sqlite3
+import pyarrow.parquet as pq
 from datetime import datetime
 import json
+from functools import lru_cache
+
+# Columnas de referencia del registro de eliminaciones
+COLUMNAS_MASTER = [
+    'id_eliminacion', 'fecha_eliminacion', 'hora_eliminacion',
+    'proceso_origen', 'razon_eliminacion', 'categoria_error',
+    'id_original', 'PaginaWeb', 'Ciudad', 'Fecha_Scrap',
+    'tipo_propiedad', 'area_m2', 'recamaras', 'estacionamientos',
+    'operacion', 'precio', 'mantenimiento', 'Colonia',
+    'longitud', 'latitud', 'tiempo_publicacion', 'area_total',
+    'area_cubierta', 'banos_icon', 'estacionamientos_icon',
+    'recamaras_icon', 'medio_banos_icon', 'antiguedad_icon',
+    'detalles_error', 'valores_analizados', 'observaciones'
+]
+
+COLUMNAS_RESUMEN = [
+    'fecha', 'proceso', 'total_procesados', 'total_eliminados',
+    'porcentaje_eliminado', 'categoria_error_principal',
+    'archivo_origen', 'archivo_destino'
+]
+
+# Columnas donde buscar el ID original (en orden de prioridad)
+COLUMNAS_ID = ['id', 'ID_Unico', 'Id', 'ID', 'codigo_inmueble', 'codigo_inmuebles24']
+
+# Categorías de error en orden de prioridad (la primera cuyo término aparezca en la razón)
+CATEGORIAS_ERROR = [
+    ("Datos Faltantes", ['datos básicos', 'faltante', 'vacío', 'nulo']),
+    ("Incoherencia Dimensional", ['dimensional', 'área', 'espacio']),
+    ("Relación Ilógica", ['relación', 'ratio', 'baños', 'recámara']),
+    ("Incoherencia Geográfica", ['colonia', 'precio', 'ubicación']),
+    ("Reglas de Tipo", ['tipo', 'propiedad', 'departamento', 'casa']),
+    ("Outlier Estadístico", ['outlier', 'atípico', 'estadístico']),
+    ("Duplicado", ['duplicado', 'repetido']),
+]
+CATEGORIA_OTRO = "Otro"
+NOMBRES_CATEGORIA = [nombre for nombre, _ in CATEGORIAS_ERROR] + [CATEGORIA_OTRO]
+
+# Valores clave (columna -> llave en valores_analizados)
+VALORES_CLAVE = {'precio': 'precio', 'area_m2': 'area_m2', 'recamaras': 'recamaras',
+                 'banos_icon': 'banos', 'tipo_propiedad': 'tipo'}
+
+
+@lru_cache(maxsize=None)
+def _prioridad_motivo(motivo):
+    """Código de categoría (índice en NOMBRES_CATEGORIA) de un motivo en minúsculas"""
+    for codigo, (_, palabras) in enumerate(CATEGORIAS_ERROR):
+        if any(palabra in motivo for palabra in palabras):
+            return codigo
+    return len(CATEGORIAS_ERROR)
+
+
+def _codigo_razon(razon_lower):
+    """Categoría de una razón con varios motivos separados por ';': la de mayor prioridad.
+    Equivale a evaluar la cascada sobre la razón completa (ningún término contiene ';')."""
+    return min(_prioridad_motivo(motivo) for motivo in razon_lower.split(';'))
+
+
+def categorizar_razones(razones):
+    """Categoría de error por fila, evaluando cada razón distinta una sola vez"""
+    texto = pd.Series(razones).astype(str).str.lower()
+    codigos, unicos = pd.factorize(texto)
+    por_unico = np.array([_codigo_razon(razon) for razon in unicos], dtype=np.int8)
+    return pd.Categorical.from_codes(por_unico[codigos], categories=NOMBRES_CATEGORIA)
+
+
+def _valores_json(valores):
+    """Valores en formato JSON (como json.dumps) calculados una vez por valor distinto"""
+    if pd.api.types.is_bool_dtype(valores):
+        return valores.map({True: 'true', False: 'false'})
+    if pd.api.types.is_numeric_dtype(valores):
+        return valores.astype(str)
+    return valores.map(lambda v: json.dumps(v, ensure_ascii=False, default=str))
+
+
+def _a_real(valor):
+    """float para filtros sobre campos REAL del índice; None si el valor no es numérico"""
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def valores_clave(df):
+    """valores_analizados por fila: JSON con los valores clave no nulos, armado por columnas"""
+    piezas = pd.Series('', index=df.index, dtype=object)
+    for col, llave in VALORES_CLAVE.items():
+        if col not in df.columns:
+            continue
+        presente = df[col].notna()
+        pieza = f'"{llave}": ' + _valores_json(df[col].where(presente).dropna()).reindex(df.index, fill_value='')
+        piezas = piezas.mask(presente, piezas + np.where(piezas == '', '', ', ') + pieza)
+    return '{' + piezas + '}'
+
+# Campos de búsqueda copiados al índice (tipo SQLite); el resto se filtra sobre los fragmentos
+COLUMNAS_INDICE = {
+    'id_original_preservado': 'TEXT',
+    'proceso_origen': 'TEXT',
+    'categoria_error': 'TEXT',
+    'fecha_eliminacion': 'TEXT',
+    'Colonia': 'TEXT',
+    'tipo_propiedad': 'TEXT',
+    'precio': 'REAL',
+}
+
+# Metadatos de la papelera que se quitan al recuperar propiedades
+COLUMNAS_METADATOS = ('id_eliminacion', 'fecha_eliminacion', 'hora_eliminacion', 'proceso_origen',
+                      'razon_eliminacion', 'categoria_error', 'detalles_error', 'valores_analizados',
+                      'observaciones')
+
+# Índice SQLite: qué fragmento y fila contiene cada eliminación
+ESQUEMA_INDICE = """
+CREATE TABLE IF NOT EXISTS fragmentos (
+    fragmento          TEXT PRIMARY KEY,
+    proceso_origen     TEXT NOT NULL,
+    fecha_eliminacion  TEXT NOT NULL,
+    filas              INTEGER NOT NULL,
+    creado             TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS registros (
+    id_eliminacion          TEXT,
+    id_original_preservado  TEXT,
+    proceso_origen          TEXT,
+    categoria_error         TEXT,
+    fecha_eliminacion       TEXT,
+    "Colonia"               TEXT,
+    tipo_propiedad          TEXT,
+    precio                  REAL,
+    fragmento               TEXT NOT NULL,
+    fila                    INTEGER NOT NULL
+);
+"""
+
+INDICES_REGISTROS = """
+CREATE INDEX IF NOT EXISTS idx_registros_id ON registros(id_original_preservado);
+CREATE INDEX IF NOT EXISTS idx_registros_proceso ON registros(proceso_origen);
+CREATE INDEX IF NOT EXISTS idx_registros_categoria ON registros(categoria_error);
+CREATE INDEX IF NOT EXISTS idx_registros_fecha ON registros(fecha_eliminacion);
+CREATE INDEX IF NOT EXISTS idx_registros_colonia ON registros("Colonia");
+CREATE INDEX IF NOT EXISTS idx_registros_tipo ON registros(tipo_propiedad);
+CREATE INDEX IF NOT EXISTS idx_registros_precio ON registros(precio);
+CREATE INDEX IF NOT EXISTS idx_registros_fragmento ON registros(fragmento, fila);
+"""
+
+# Conteos precalculados por proceso/fecha/categoría (se suman en cada registro)
+ESQUEMA_CONTEOS = """
+CREATE TABLE IF NOT EXISTS conteos_categoria (
+    proceso_origen     TEXT NOT NULL,
+    fecha_eliminacion  TEXT NOT NULL,
+    categoria_error    TEXT NOT NULL,
+    n                  INTEGER NOT NULL,
+    PRIMARY KEY (proceso_origen, fecha_eliminacion, categoria_error)
+);
+"""
+
+# Cubo de agregados por proceso × categoría × tipo × Colonia × fecha (se suma en cada registro).
+# Las medidas son aditivas; los cuantiles salen de histogramas logarítmicos por celda.
+DIMENSIONES_CUBO = ['proceso_origen', 'categoria_error', 'tipo_propiedad', 'Colonia', 'fecha_eliminacion']
+VARIABLES_CUBO = ['precio', 'area_m2']
+RANGO_PRECIO_MERCADO = (500_000, 50_000_000)  # precios "razonables" para sugerir recuperaciones
+BINS_POR_DECADA = 40                           # ancho de bin ~6% -> error de cuantil acotado
+BIN_NO_POSITIVO = -1_000_000                   # bin para valores <= 0
+
+_MEDIDAS_VARIABLE = ['n', 'suma', 'min', 'max']
+MEDIDAS_CUBO = ['n'] + [f'{v}_{m}' for v in VARIABLES_CUBO for m in _MEDIDAS_VARIABLE] + ['precio_n_mercado']
+
+_DIMS_SQL = ', '.join(f'"{d}"' for d in DIMENSIONES_CUBO)
+ESQUEMA_CUBO = f"""
+CREATE TABLE IF NOT EXISTS cubo_eliminaciones (
+    proceso_origen     TEXT NOT NULL,
+    categoria_error    TEXT NOT NULL,
+    tipo_propiedad     TEXT NOT NULL,
+    "Colonia"          TEXT NOT NULL,
+    fecha_eliminacion  TEXT NOT NULL,
+    n                  INTEGER NOT NULL,
+    precio_n           INTEGER NOT NULL,
+    precio_suma        REAL NOT NULL,
+    precio_min         REAL,
+    precio_max         REAL,
+    area_m2_n          INTEGER NOT NULL,
+    area_m2_suma       REAL NOT NULL,
+    area_m2_min        REAL,
+    area_m2_max        REAL,
+    precio_n_mercado   INTEGER NOT NULL,
+    PRIMARY KEY ({_DIMS_SQL})
+);
+CREATE TABLE IF NOT EXISTS cubo_histograma (
+    proceso_origen     TEXT NOT NULL,
+    categoria_error    TEXT NOT NULL,
+    tipo_propiedad     TEXT NOT NULL,
+    "Colonia"          TEXT NOT NULL,
+    fecha_eliminacion  TEXT NOT NULL,
+    variable           TEXT NOT NULL,
+    bin                INTEGER NOT NULL,
+    n                  INTEGER NOT NULL,
+    PRIMARY KEY ({_DIMS_SQL}, variable, bin)
+);
+"""
+
+
+def _bins(valores):
+    """Bin logarítmico de cada valor (BINS_POR_DECADA por potencia de 10)"""
+    positivos = valores.where(valores > 0)
+    bins = np.floor(np.log10(positivos) * BINS_POR_DECADA)
+    return bins.fillna(BIN_NO_POSITIVO).astype(np.int64)
+
+
+def agregar_cubo(df):
+    """Celdas del cubo y sus histogramas para un lote de eliminaciones
+    
+    Returns:
+        (celdas: DIMENSIONES_CUBO + MEDIDAS_CUBO, histograma: DIMENSIONES_CUBO + variable, bin, n)
+    """
+    base = pd.DataFrame(index=df.index)
+    for dim in DIMENSIONES_CUBO:
+        base[dim] = df[dim].astype(str).where(df[dim].notna(), '') if dim in df.columns else ''
+    base['categoria_error'] = base['categoria_error'].replace('', CATEGORIA_OTRO)
+    for var in VARIABLES_CUBO:
+        base[var] = pd.to_numeric(df[var], errors='coerce') if var in df.columns else np.nan
+    precio = base['precio']
+    base['precio_n_mercado'] = precio.between(*RANGO_PRECIO_MERCADO)
+    
+    grupos = base.groupby(DIMENSIONES_CUBO, sort=False)
+    celdas = grupos.size().rename('n').to_frame()
+    for var in VARIABLES_CUBO:
+        agregados = grupos[var].agg(['count', 'sum', 'min', 'max'])
+        agregados.columns = [f'{var}_{m}' for m in _MEDIDAS_VARIABLE]
+        celdas = celdas.join(agregados)
+    celdas['precio_n_mercado'] = grupos['precio_n_mercado'].sum()
+    
+    histogramas = []
+    for var in VARIABLES_CUBO:
+        con_valor = base[base[var].notna()]
+        if len(con_valor):
+            histogramas.append(
+                con_valor.assign(variable=var, bin=_bins(con_valor[var]))
+                .groupby(DIMENSIONES_CUBO + ['variable', 'bin'], sort=False).size().rename('n').reset_index()
+            )
+    histograma = (pd.concat(histogramas, ignore_index=True) if histogramas
+                  else pd.DataFrame(columns=DIMENSIONES_CUBO + ['variable', 'bin', 'n']))
+    return celdas.reset_index(), histograma
+
+
+def cuantil_histograma(histograma, q, minimo=None, maximo=None):
+    """Cuantil aproximado desde un histograma (bin, n); se acota al mínimo/máximo exactos"""
+    conteo = histograma.groupby('bin')['n'].sum().sort_index()
+    if conteo.sum() == 0:
+        return np.nan
+    acumulado = conteo.cumsum()
+    bin_q = acumulado.index[np.searchsorted(acumulado.values, q * acumulado.iloc[-1])]
+    valor = 0.0 if bin_q == BIN_NO_POSITIVO else 10 ** ((bin_q + 0.5) / BINS_POR_DECADA)
+    if minimo is not None and pd.notna(minimo):
+        valor = max(valor, minimo)
+    if maximo is not None and pd.notna(maximo):
+        valor = min(valor, maximo)
+    return valor
+
 
 class PapeleraReciclaje:
     """
     Sistema centralizado para registrar propiedades eliminadas
+
+    Almacenamiento append-only: cada registro escribe un fragmento Parquet en
+    fragmentos/proceso=<proceso>/fecha=<fecha>/ y agrega sus filas al índice SQLite,
+    sin leer ni reescribir el historial. compactar() une los fragmentos de cada proceso/fecha.
     """
     
     def __init__(self, directorio_papelera="Papelera_Reciclaje"):
@@ -20,47 +284,460 @@ class PapeleraReciclaje:
             directorio_papelera: Directorio donde guardar los registros eliminados
         """
         self.directorio_papelera = directorio_papelera
-        self.archivo_master = os.path.join(directorio_papelera, "papelera_master.csv")
+        self.directorio_fragmentos = os.path.join(directorio_papelera, "fragmentos")
+        self.archivo_indice = os.path.join(directorio_papelera, "papelera_indice.sqlite")
+        self.archivo_master = os.path.join(directorio_papelera, "papelera_master.csv")  # Formato anterior (se migra)
         self.archivo_resumen = os.path.join(directorio_papelera, "resumen_eliminaciones.csv")
         
-        # Crear directorio si no existe
-        os.makedirs(directorio_papelera, exist_ok=True)
+        # Crear directorios si no existen
+        os.makedirs(self.directorio_fragmentos, exist_ok=True)
         
         # Inicializar archivos si no existen
         self._inicializar_archivos()
     
+    def _conectar(self):
+        return sqlite3.connect(self.archivo_indice)
+    
     def _inicializar_archivos(self):
-        """Inicializa los archivos de papelera si no existen"""
-        
-        # Archivo master - contiene todos los registros eliminados
-        if not os.path.exists(self.archivo_master):
-            columnas_master = [
-                'id_eliminacion', 'fecha_eliminacion', 'hora_eliminacion',
-                'proceso_origen', 'razon_eliminacion', 'categoria_error',
-                'id_original', 'PaginaWeb', 'Ciudad', 'Fecha_Scrap',
-                'tipo_propiedad', 'area_m2', 'recamaras', 'estacionamientos',
-                'operacion', 'precio', 'mantenimiento', 'Colonia',
-                'longitud', 'latitud', 'tiempo_publicacion', 'area_total',
-                'area_cubierta', 'banos_icon', 'estacionamientos_icon',
-                'recamaras_icon', 'medio_banos_icon', 'antiguedad_icon',
-                'detalles_error', 'valores_analizados', 'observaciones'
-            ]
-            
-            df_master = pd.DataFrame(columns=columnas_master)
-            df_master.to_csv(self.archivo_master, index=False)
-            print(f"📁 Creado archivo master: {self.archivo_master}")
+        """Inicializa el índice y el resumen si no existen; migra el master CSV anterior"""
+        
+        # Índice SQLite de fragmentos y registros
+        with self._conectar() as conn:
+            conn.executescript(ESQUEMA_INDICE)
+        self._actualizar_esquema_indice()
+        self._inicializar_conteos()
+        self._inicializar_cubo()
         
         # Archivo resumen - estadísticas por proceso
         if not os.path.exists(self.archivo_resumen):
-            columnas_resumen = [
-                'fecha', 'proceso', 'total_procesados', 'total_eliminados',
-                'porcentaje_eliminado', 'categoria_error_principal',
-                'archivo_origen', 'archivo_destino'
-            ]
-            
-            df_resumen = pd.DataFrame(columns=columnas_resumen)
+            df_resumen = pd.DataFrame(columns=COLUMNAS_RESUMEN)
             df_resumen.to_csv(self.archivo_resumen, index=False)
             print(f"📁 Creado archivo resumen: {self.archivo_resumen}")
+        
+        # Master CSV del formato anterior -> fragmentos
+        if os.path.exists(self.archivo_master):
+            self._migrar_master_csv()
+    
+    def _migrar_master_csv(self):
+        """Convierte papelera_master.csv en fragmentos por proceso/fecha y lo renombra a .migrado"""
+        
+        df_master = pd.read_csv(self.archivo_master, low_memory=False)
+        if len(df_master) > 0:
+            if 'id_original_preservado' not in df_master.columns:
+                df_master['id_original_preservado'] = self._ids_originales(df_master)
+            claves = df_master[['proceso_origen', 'fecha_eliminacion']].fillna('desconocido').astype(str)
+            for (proceso, fecha), grupo in df_master.groupby([claves['proceso_origen'], claves['fecha_eliminacion']]):
+                self._guardar_fragmento(grupo.reset_index(drop=True), proceso, fecha)
+            print(f"📦 Migrados {len(df_master):,} registros del master CSV a fragmentos Parquet")
+        os.replace(self.archivo_master, self.archivo_master + ".migrado")
+    
+    def _actualizar_esquema_indice(self):
+        """Agrega al índice los campos de búsqueda que falten y los llena desde los fragmentos"""
+        
+        with self._conectar() as conn:
+            existentes = {fila[1] for fila in conn.execute("PRAGMA table_info(registros)")}
+            faltantes = [c for c in COLUMNAS_INDICE if c not in existentes]
+            for col in faltantes:
+                conn.execute(f'ALTER TABLE registros ADD COLUMN "{col}" {COLUMNAS_INDICE[col]}')
+            conn.executescript(INDICES_REGISTROS)
+        if not faltantes:
+            return
+        
+        fragmentos = self._fragmentos()['fragmento']
+        for fragmento in fragmentos:
+            ruta = os.path.join(self.directorio_fragmentos, fragmento)
+            disponibles = [c for c in faltantes if c in pq.read_schema(ruta).names]
+            if not disponibles:
+                continue
+            valores = self._valores_indice(pd.read_parquet(ruta, columns=disponibles))[disponibles]
+            valores['fragmento'] = fragmento
+            valores['fila'] = np.arange(len(valores))
+            asignaciones = ', '.join(f'"{c}" = ?' for c in disponibles)
+            with self._conectar() as conn:
+                conn.executemany(
+                    f"UPDATE registros SET {asignaciones} WHERE fragmento = ? AND fila = ?",
+                    valores.astype(object).where(valores.notna(), None).itertuples(index=False, name=None)
+                )
+        if len(fragmentos):
+            print(f"🗂️ Índice de papelera actualizado con: {', '.join(faltantes)}")
+    
+    def _inicializar_conteos(self):
+        """Crea la tabla de conteos; si es nueva y ya hay registros, la calcula desde el índice"""
+        
+        with self._conectar() as conn:
+            nueva = conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'conteos_categoria'"
+            ).fetchone()[0] == 0
+            conn.executescript(ESQUEMA_CONTEOS)
+            if nueva:
+                conn.execute(
+                    "INSERT INTO conteos_categoria "
+                    "SELECT proceso_origen, fecha_eliminacion, COALESCE(categoria_error, ?), COUNT(*) "
+                    "FROM registros GROUP BY 1, 2, 3", (CATEGORIA_OTRO,)
+                )
+    
+    def conteos_categoria(self):
+        """Conteos precalculados (proceso_origen, fecha_eliminacion, categoria_error, n)"""
+        
+        with self._conectar() as conn:
+            return pd.read_sql_query(
+                "SELECT proceso_origen, fecha_eliminacion, categoria_error, n FROM conteos_categoria", conn)
+    
+    def _inicializar_cubo(self):
+        """Crea el cubo de agregados; si es nuevo y ya hay fragmentos, lo calcula desde ellos"""
+        
+        with self._conectar() as conn:
+            nuevo = conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'cubo_eliminaciones'"
+            ).fetchone()[0] == 0
+            conn.executescript(ESQUEMA_CUBO)
+        if not nuevo:
+            return
+        
+        fragmentos = self._fragmentos()
+        for fragmento, proceso, fecha in fragmentos[['fragmento', 'proceso_origen', 'fecha_eliminacion']].itertuples(index=False):
+            ruta = os.path.join(self.directorio_fragmentos, fragmento)
+            columnas = [c for c in DIMENSIONES_CUBO + VARIABLES_CUBO if c in pq.read_schema(ruta).names]
+            df = pd.read_parquet(ruta, columns=columnas).assign(proceso_origen=proceso, fecha_eliminacion=fecha)
+            with self._conectar() as conn:
+                self._sumar_cubo(conn, df)
+        if len(fragmentos):
+            print(f"🧊 Cubo de eliminaciones calculado desde {len(fragmentos)} fragmentos")
+    
+    @staticmethod
+    def _sumar_cubo(conn, df):
+        """Suma un lote de eliminaciones a las celdas e histogramas del cubo"""
+        
+        celdas, histograma = agregar_cubo(df)
+        actualizar = [f'{m} = {m} + excluded.{m}' for m in MEDIDAS_CUBO if not m.endswith(('_min', '_max'))]
+        # MIN/MAX de SQLite con un NULL devuelven NULL; se ignora el lado sin valor
+        actualizar += [f'{m} = {m[-3:]}(COALESCE({m}, excluded.{m}), COALESCE(excluded.{m}, {m}))'
+                       for m in MEDIDAS_CUBO if m.endswith(('_min', '_max'))]
+        columnas = DIMENSIONES_CUBO + MEDIDAS_CUBO
+        conn.executemany(
+            f"INSERT INTO cubo_eliminaciones ({_DIMS_SQL}, {', '.join(MEDIDAS_CUBO)}) "
+            f"VALUES ({', '.join('?' * len(columnas))}) "
+            f"ON CONFLICT ({_DIMS_SQL}) DO UPDATE SET {', '.join(actualizar)}",
+            celdas[columnas].astype(object).where(celdas[columnas].notna(), None).itertuples(index=False, name=None)
+        )
+        conn.executemany(
+            f"INSERT INTO cubo_histograma VALUES ({', '.join('?' * (len(DIMENSIONES_CUBO) + 3))}) "
+            f"ON CONFLICT ({_DIMS_SQL}, variable, bin) DO UPDATE SET n = n + excluded.n",
+            histograma.astype(object).itertuples(index=False, name=None)
+        )
+    
+    def cubo(self):
+        """Celdas del cubo de eliminaciones (DIMENSIONES_CUBO + MEDIDAS_CUBO)"""
+        
+        with self._conectar() as conn:
+            return pd.read_sql_query("SELECT * FROM cubo_eliminaciones", conn)
+    
+    def histograma_cubo(self, variable):
+        """Histograma logarítmico de una variable del cubo (DIMENSIONES_CUBO + bin, n)"""
+        
+        with self._conectar() as conn:
+            return pd.read_sql_query(
+                f"SELECT {_DIMS_SQL}, bin, n FROM cubo_histograma WHERE variable = ?", conn, params=(variable,))
+    
+    @staticmethod
+    def _valores_indice(df):
+        """Columnas de COLUMNAS_INDICE presentes en df con el tipo del índice"""
+        
+        valores = pd.DataFrame(index=df.index)
+        for col, tipo in COLUMNAS_INDICE.items():
+            if col not in df.columns:
+                valores[col] = None
+            elif tipo == 'REAL':
+                valores[col] = pd.to_numeric(df[col], errors='coerce')
+            else:
+                valores[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        return valores
+    
+    @staticmethod
+    def _ids_originales(df):
+        """ID original por fila: primera columna de COLUMNAS_ID con valor; si no, sin_id_idx_<índice>"""
+        
+        ids = pd.Series(np.nan, index=df.index, dtype=object)
+        for col_id in COLUMNAS_ID:
+            if col_id in df.columns:
+                valores = df[col_id].where(df[col_id].notna()).astype(str).str.strip()
+                valores = valores.where(df[col_id].notna() & (valores != ''))
+                ids = ids.fillna(valores)
+        sin_id = 'sin_id_idx_' + pd.Series(df.index, index=df.index).astype(str)
+        return ids.fillna(sin_id)
+    
+    @staticmethod
+    def _ruta_segura(valor):
+        return re.sub(r'[^\w.-]+', '_', str(valor))
+    
+    def _guardar_fragmento(self, df_papelera, proceso, fecha):
+        """Escribe un fragmento Parquet nuevo y agrega sus filas al índice (una transacción)"""
+        
+        particion = os.path.join(f"proceso={self._ruta_segura(proceso)}", f"fecha={self._ruta_segura(fecha)}")
+        os.makedirs(os.path.join(self.directorio_fragmentos, particion), exist_ok=True)
+        fragmento = os.path.join(particion, f"part-{datetime.now():%H%M%S%f}-{uuid.uuid4().hex[:8]}.parquet")
+        ruta = os.path.join(self.directorio_fragmentos, fragmento)
+        
+        df = df_papelera.reset_index(drop=True)
+        # Columnas object con tipos mezclados (texto/número) no se pueden escribir a Parquet
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        df.to_parquet(ruta + ".tmp", index=False)
+        os.replace(ruta + ".tmp", ruta)
+        
+        indice = self._valores_indice(df)
+        indice['proceso_origen'] = str(proceso)
+        indice['fecha_eliminacion'] = str(fecha)
+        indice['id_eliminacion'] = df['id_eliminacion'] if 'id_eliminacion' in df.columns else None
+        indice['fragmento'] = fragmento
+        indice['fila'] = np.arange(len(df))
+        columnas = ', '.join(f'"{c}"' for c in indice.columns)
+        with self._conectar() as conn:
+            conn.execute(
+                "INSERT INTO fragmentos VALUES (?, ?, ?, ?, ?)",
+                (fragmento, str(proceso), str(fecha), len(df), datetime.now().isoformat())
+            )
+            conn.executemany(
+                f"INSERT INTO registros ({columnas}) VALUES ({', '.join('?' * len(indice.columns))})",
+                indice.astype(object).where(indice.notna(), None).itertuples(index=False, name=None)
+            )
+            categorias = indice['categoria_error'].fillna(CATEGORIA_OTRO).value_counts()
+            conn.executemany(
+                "INSERT INTO conteos_categoria VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (proceso_origen, fecha_eliminacion, categoria_error) DO UPDATE SET n = n + excluded.n",
+                [(str(proceso), str(fecha), categoria, int(n)) for categoria, n in categorias.items()]
+            )
+            self._sumar_cubo(conn, df.assign(proceso_origen=str(proceso), fecha_eliminacion=str(fecha)))
+        return fragmento
+    
+    def _fragmentos(self, proceso=None):
+        """Fragmentos registrados en el índice (en orden de creación)"""
+        
+        consulta = "SELECT fragmento, proceso_origen, fecha_eliminacion, filas FROM fragmentos"
+        params = ()
+        if proceso is not None:
+            consulta += " WHERE proceso_origen = ?"
+            params = (proceso,)
+        with self._conectar() as conn:
+            return pd.read_sql_query(consulta + " ORDER BY creado, fragmento", conn, params=params)
+    
+    def cargar_master(self, columnas=None):
+        """
+        Lee todas las eliminaciones registradas (equivalente al antiguo papelera_master.csv)
+        
+        Args:
+            columnas: Lista opcional de columnas a leer
+        """
+        
+        fragmentos = self._fragmentos()['fragmento']
+        partes = []
+        for fragmento in fragmentos:
+            ruta = os.path.join(self.directorio_fragmentos, fragmento)
+            if columnas is not None:
+                disponibles = set(pq.read_schema(ruta).names)
+                partes.append(pd.read_parquet(ruta, columns=[c for c in columnas if c in disponibles]))
+            else:
+                partes.append(pd.read_parquet(ruta))
+        if not partes:
+            return pd.DataFrame(columns=columnas or COLUMNAS_MASTER + ['id_original_preservado'])
+        return pd.concat(partes, ignore_index=True)
+    
+    @staticmethod
+    def _aplicar_filtros(df, filtros):
+        """Filtros en memoria: lista -> isin, dict -> rango min/max, otro valor -> igualdad"""
+        
+        mascara = pd.Series(True, index=df.index)
+        for campo, valor in filtros.items():
+            columna = df[campo] if campo in df.columns else pd.Series(np.nan, index=df.index)
+            if isinstance(valor, list):
+                mascara &= columna.isin(valor)
+            elif isinstance(valor, dict):
+                if 'min' in valor:
+                    mascara &= columna >= valor['min']
+                if 'max' in valor:
+                    mascara &= columna <= valor['max']
+            else:
+                mascara &= columna == valor
+        return df[mascara]
+    
+    def _consulta_indice(self, filtros):
+        """SQL sobre el índice para los filtros indexados; devuelve (where, parámetros, filtros restantes)"""
+        
+        condiciones, params, residuales = [], [], {}
+        for campo, valor in filtros.items():
+            if campo not in COLUMNAS_INDICE:
+                residuales[campo] = valor
+                continue
+            convertir = _a_real if COLUMNAS_INDICE[campo] == 'REAL' else str
+            columna = f'r."{campo}"'
+            if isinstance(valor, list):
+                # Un valor no numérico en un campo REAL no coincide con ninguna fila
+                valores = [v for v in map(convertir, valor) if v is not None]
+                if not valores:
+                    condiciones.append("0")
+                    continue
+                condiciones.append(f"{columna} IN ({', '.join('?' * len(valores))})")
+                params.extend(valores)
+            elif isinstance(valor, dict):
+                for llave, operador in (('min', '>='), ('max', '<=')):
+                    if llave not in valor:
+                        continue
+                    limite = convertir(valor[llave])
+                    if limite is None:
+                        condiciones.append("0")
+                    else:
+                        condiciones.append(f"{columna} {operador} ?")
+                        params.append(limite)
+            else:
+                valor = convertir(valor)
+                if valor is None:
+                    condiciones.append("0")
+                else:
+                    condiciones.append(f"{columna} = ?")
+                    params.append(valor)
+        where = (" WHERE " + " AND ".join(condiciones)) if condiciones else ""
+        return where, params, residuales
+    
+    def iterar_consulta(self, filtros=None):
+        """
+        Recorre las eliminaciones que cumplen filtros, un DataFrame por fragmento
+        
+        Los campos de COLUMNAS_INDICE se resuelven en el índice SQLite y solo se leen las
+        filas indicadas (fragmento, fila); el resto de filtros se aplica sobre esas filas.
+        Un filtro sobre una columna que no existe en ningún fragmento se ignora.
+        
+        Args:
+            filtros: Diccionario campo -> valor | lista | {'min': .., 'max': ..}
+        """
+        
+        ubicaciones, residuales = self._ubicaciones(filtros)
+        yield from self._leer_ubicaciones(ubicaciones, residuales)
+    
+    def _ubicaciones(self, filtros):
+        """(fragmento, fila) de las eliminaciones que cumplen los filtros indexados, en orden de registro,
+        y los filtros restantes sobre columnas que existen en esos fragmentos"""
+        
+        filtros = dict(filtros or {})
+        where, params, residuales = self._consulta_indice(filtros)
+        with self._conectar() as conn:
+            ubicaciones = pd.read_sql_query(
+                "SELECT r.fragmento, r.fila FROM registros r JOIN fragmentos f ON f.fragmento = r.fragmento"
+                f"{where} ORDER BY f.creado, r.fragmento, r.fila", conn, params=params)
+        if residuales:
+            columnas = set(self._columnas_fragmentos(ubicaciones['fragmento'].unique()))
+            residuales = {campo: valor for campo, valor in residuales.items() if campo in columnas}
+        return ubicaciones, residuales
+    
+    def _columnas_fragmentos(self, fragmentos):
+        """Unión de las columnas de los fragmentos (en orden de primera aparición), leyendo solo el esquema"""
+        
+        columnas = {}
+        for fragmento in fragmentos:
+            columnas.update(dict.fromkeys(pq.read_schema(os.path.join(self.directorio_fragmentos, fragmento)).names))
+        return list(columnas)
+    
+    def _leer_ubicaciones(self, ubicaciones, residuales):
+        for fragmento, grupo in ubicaciones.groupby('fragmento', sort=False):
+            tabla = pq.read_table(os.path.join(self.directorio_fragmentos, fragmento))
+            df = tabla.take(grupo['fila'].to_numpy()).to_pandas()
+            if residuales:
+                df = self._aplicar_filtros(df, residuales)
+            if len(df) > 0:
+                yield df
+    
+    def consultar(self, filtros=None):
+        """Eliminaciones que cumplen filtros (ver iterar_consulta) en un solo DataFrame"""
+        
+        partes = list(self.iterar_consulta(filtros))
+        if not partes:
+            return pd.DataFrame(columns=COLUMNAS_MASTER + ['id_original_preservado'])
+        return pd.concat(partes, ignore_index=True)
+    
+    def exportar_recuperacion(self, filtros, destino):
+        """
+        Escribe a destino (CSV) las propiedades que cumplen filtros sin metadatos de papelera,
+        fragmento por fragmento (sin cargar el historial completo), con las columnas de todos
+        los fragmentos alineadas a un mismo encabezado
+        
+        Returns:
+            Número de propiedades escritas
+        """
+        
+        ubicaciones, residuales = self._ubicaciones(filtros)
+        # Los fragmentos de distintos procesos traen columnas distintas (y en otro orden):
+        # el encabezado es la unión de todas y cada fragmento se reordena a él
+        columnas = [c for c in self._columnas_fragmentos(ubicaciones['fragmento'].unique())
+                    if not c.startswith(COLUMNAS_METADATOS)]
+        total = 0
+        tmp = destino + ".tmp"
+        for df in self._leer_ubicaciones(ubicaciones, residuales):
+            df = df.reindex(columns=columnas)
+            df.to_csv(tmp, mode='a' if total else 'w', header=not total, index=False)
+            total += len(df)
+        if total:
+            os.replace(tmp, destino)
+        return total
+    
+    def recuperar_a_esperando(self, filtros, periodo):
+        """
+        Devuelve a Datos_Filtrados/Esperando/<periodo>/ las propiedades que cumplen filtros;
+        el Paso 1 del periodo siguiente las vuelve a consolidar junto con el resto de Esperando
+        
+        Returns:
+            Ruta del archivo escrito o None si no hubo coincidencias
+        """
+        
+        from esdata.utils.paths import path_esperando
+        destino = os.path.join(path_esperando(periodo), f"recuperados_papelera_{periodo}.csv")
+        total = self.exportar_recuperacion(filtros, destino)
+        if total == 0:
+            print("❌ No se encontraron propiedades para recuperar")
+            return None
+        print(f"♻️ {total:,} propiedades devueltas a Esperando: {destino}")
+        return destino
+    
+    def compactar(self, proceso=None):
+        """
+        Une en un solo fragmento los fragmentos de cada proceso/fecha
+        
+        Args:
+            proceso: Limitar la compactación a un proceso
+            
+        Returns:
+            Número de particiones proceso/fecha compactadas
+        """
+        
+        fragmentos = self._fragmentos(proceso)
+        compactadas = 0
+        for (proceso_origen, fecha), grupo in fragmentos.groupby(['proceso_origen', 'fecha_eliminacion'], sort=False):
+            if len(grupo) < 2:
+                continue
+            partes = [pd.read_parquet(os.path.join(self.directorio_fragmentos, f)) for f in grupo['fragmento']]
+            df = pd.concat(partes, ignore_index=True)
+            
+            particion = os.path.dirname(grupo['fragmento'].iloc[0])
+            nuevo = os.path.join(particion, f"compactado-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.parquet")
+            ruta = os.path.join(self.directorio_fragmentos, nuevo)
+            for col in df.columns[df.dtypes == object]:
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+            df.to_parquet(ruta + ".tmp", index=False)
+            os.replace(ruta + ".tmp", ruta)
+            
+            # Reapuntar el índice: la fila i del fragmento k pasa a offset_k + i
+            offsets = np.concatenate([[0], np.cumsum(grupo['filas'].to_numpy())[:-1]])
+            with self._conectar() as conn:
+                for fragmento, offset in zip(grupo['fragmento'], offsets):
+                    conn.execute("UPDATE registros SET fragmento = ?, fila = fila + ? WHERE fragmento = ?",
+                                 (nuevo, int(offset), fragmento))
+                conn.executemany("DELETE FROM fragmentos WHERE fragmento = ?", [(f,) for f in grupo['fragmento']])
+                conn.execute("INSERT INTO fragmentos VALUES (?, ?, ?, ?, ?)",
+                             (nuevo, proceso_origen, fecha, len(df), datetime.now().isoformat()))
+            for fragmento in grupo['fragmento']:
+                os.remove(os.path.join(self.directorio_fragmentos, fragmento))
+            compactadas += 1
+        
+        print(f"🗜️ Compactadas {compactadas} particiones proceso/fecha")
+        return compactadas
     
     def registrar_eliminados(self, df_eliminados, proceso_origen, razones_eliminacion, 
                            archivo_origen=None, archivo_destino=None, detalles_adicionales=None):
@@ -97,23 +774,7 @@ class PapeleraReciclaje:
         df_papelera['proceso_origen'] = proceso_origen
         
         # PRESERVAR ID ORIGINAL - CRÍTICO PARA RECUPERACIÓN
-        ids_originales = []
-        for idx, row in df_eliminados.iterrows():
-            id_original = None
-            
-            # Buscar ID en diferentes columnas posibles
-            for col_id in ['id', 'ID_Unico', 'Id', 'ID', 'codigo_inmueble', 'codigo_inmuebles24']:
-                if col_id in row and pd.notna(row[col_id]) and str(row[col_id]).strip() != '':
-                    id_original = str(row[col_id]).strip()
-                    break
-            
-            # Si no se encuentra ID válido, usar índice con prefijo
-            if id_original is None:
-                id_original = f"sin_id_idx_{idx}"
-            
-            ids_originales.append(id_original)
-        
-        df_papelera['id_original_preservado'] = ids_originales
+        df_papelera['id_original_preservado'] = self._ids_originales(df_eliminados)
         
         # Procesar razones de eliminación
         if isinstance(razones_eliminacion, list) and len(razones_eliminacion) == len(df_eliminados):
@@ -121,8 +782,8 @@ class PapeleraReciclaje:
         else:
             df_papelera['razon_eliminacion'] = str(razones_eliminacion)
         
-        # Categorizar errores
-        df_papelera['categoria_error'] = df_papelera['razon_eliminacion'].apply(self._categorizar_error)
+        # Categorizar errores (una evaluación por razón distinta)
+        df_papelera['categoria_error'] = np.asarray(categorizar_razones(df_papelera['razon_eliminacion']), dtype=object)
         
         # Agregar detalles si están disponibles
         if detalles_adicionales:
@@ -131,23 +792,13 @@ class PapeleraReciclaje:
             df_papelera['detalles_error'] = ""
         
         # Valores analizados (para debugging)
-        df_papelera['valores_analizados'] = df_papelera.apply(
-            lambda row: self._extraer_valores_clave(row), axis=1
-        )
+        df_papelera['valores_analizados'] = valores_clave(df_papelera)
         
         df_papelera['observaciones'] = ""
         
-        # Guardar en archivo master
+        # Guardar como fragmento nuevo (sin leer el historial)
         try:
-            # Leer archivo existente
-            df_master_existente = pd.read_csv(self.archivo_master)
-            
-            # Concatenar nuevos registros
-            df_master_nuevo = pd.concat([df_master_existente, df_papelera], ignore_index=True)
-            
-            # Guardar
-            df_master_nuevo.to_csv(self.archivo_master, index=False)
-            
+            self._guardar_fragmento(df_papelera, proceso_origen, fecha_str)
             print(f"✅ Guardados {len(df_eliminados)} registros en papelera master")
             
         except Exception as e:
@@ -159,49 +810,16 @@ class PapeleraReciclaje:
     
     def _categorizar_error(self, razon):
         """Categoriza el tipo de error"""
-        razon_lower = str(razon).lower()
-        
-        if any(palabra in razon_lower for palabra in ['datos básicos', 'faltante', 'vacío', 'nulo']):
-            return "Datos Faltantes"
-        elif any(palabra in razon_lower for palabra in ['dimensional', 'área', 'espacio']):
-            return "Incoherencia Dimensional"
-        elif any(palabra in razon_lower for palabra in ['relación', 'ratio', 'baños', 'recámara']):
-            return "Relación Ilógica"
-        elif any(palabra in razon_lower for palabra in ['colonia', 'precio', 'ubicación']):
-            return "Incoherencia Geográfica"
-        elif any(palabra in razon_lower for palabra in ['tipo', 'propiedad', 'departamento', 'casa']):
-            return "Reglas de Tipo"
-        elif any(palabra in razon_lower for palabra in ['outlier', 'atípico', 'estadístico']):
-            return "Outlier Estadístico"
-        elif any(palabra in razon_lower for palabra in ['duplicado', 'repetido']):
-            return "Duplicado"
-        else:
-            return "Otro"
+        return NOMBRES_CATEGORIA[_codigo_razon(str(razon).lower())]
     
     def _extraer_valores_clave(self, row):
         """Extrae valores clave para análisis"""
-        valores = {}
-        
-        if 'precio' in row and pd.notna(row['precio']):
-            valores['precio'] = row['precio']
-        if 'area_m2' in row and pd.notna(row['area_m2']):
-            valores['area_m2'] = row['area_m2']
-        if 'recamaras' in row and pd.notna(row['recamaras']):
-            valores['recamaras'] = row['recamaras']
-        if 'banos_icon' in row and pd.notna(row['banos_icon']):
-            valores['banos'] = row['banos_icon']
-        if 'tipo_propiedad' in row and pd.notna(row['tipo_propiedad']):
-            valores['tipo'] = row['tipo_propiedad']
-        
-        return json.dumps(valores, ensure_ascii=False)
+        return valores_clave(pd.DataFrame([row])).iloc[0]
     
     def _actualizar_resumen(self, proceso, total_eliminados, archivo_origen, archivo_destino, df_papelera):
         """Actualiza el archivo resumen"""
         
         try:
-            # Leer resumen existente
-            df_resumen = pd.read_csv(self.archivo_resumen)
-            
             # Calcular estadísticas
             categoria_principal = df_papelera['categoria_error'].value_counts().index[0] if len(df_papelera) > 0 else "N/A"
             
@@ -217,11 +835,9 @@ class PapeleraReciclaje:
                 'archivo_destino': archivo_destino or "N/A"
             }
             
-            # Agregar al resumen
-            df_resumen = pd.concat([df_resumen, pd.DataFrame([nuevo_registro])], ignore_index=True)
-            
-            # Guardar
-            df_resumen.to_csv(self.archivo_resumen, index=False)
+            # Agregar al final del resumen (sin releerlo)
+            pd.DataFrame([nuevo_registro], columns=COLUMNAS_RESUMEN).to_csv(
+                self.archivo_resumen, mode='a', header=False, index=False)
             
             print(f"📊 Actualizado resumen de eliminaciones")
             
@@ -229,10 +845,15 @@ class PapeleraReciclaje:
             print(f"❌ Error al actualizar resumen: {e}")
     
     def generar_reporte_completo(self):
-        """Genera un reporte completo de todas las eliminaciones"""
+        """Genera un reporte completo de todas las eliminaciones
+        
+        Returns:
+            (conteos por proceso/fecha/categoría, resumen de eliminaciones)
+        """
         
         try:
-            df_master = pd.read_csv(self.archivo_master)
+            # Conteos precalculados al registrar (no se lee el historial)
+            conteos = self.conteos_categoria()
             df_resumen = pd.read_csv(self.archivo_resumen)
             
             print("\n" + "="*60)
@@ -240,39 +861,33 @@ class PapeleraReciclaje:
             print("="*60)
             
             # Estadísticas generales
-            total_eliminados = len(df_master)
-            procesos_unicos = df_master['proceso_origen'].nunique()
+            total_eliminados = int(conteos['n'].sum())
+            procesos_unicos = conteos['proceso_origen'].nunique()
             
             print(f"📊 Total de propiedades eliminadas: {total_eliminados:,}")
             print(f"🔄 Procesos que han eliminado datos: {procesos_unicos}")
             
             # Por proceso
             print(f"\n📋 ELIMINACIONES POR PROCESO:")
-            eliminaciones_por_proceso = df_master.groupby('proceso_origen').agg({
-                'id_eliminacion': 'count',
-                'categoria_error': lambda x: x.value_counts().index[0]
-            }).rename(columns={
-                'id_eliminacion': 'total_eliminados',
-                'categoria_error': 'error_principal'
-            })
-            
-            for proceso, stats in eliminaciones_por_proceso.iterrows():
-                print(f"   • {proceso}: {stats['total_eliminados']} eliminados (Principal: {stats['error_principal']})")
+            por_proceso_categoria = conteos.groupby(['proceso_origen', 'categoria_error'])['n'].sum()
+            for proceso, por_categoria in por_proceso_categoria.groupby(level=0):
+                principal = por_categoria.droplevel(0).sort_values(ascending=False, kind='stable').index[0]
+                print(f"   • {proceso}: {por_categoria.sum()} eliminados (Principal: {principal})")
             
             # Por categoría de error
             print(f"\n📋 ELIMINACIONES POR CATEGORÍA:")
-            por_categoria = df_master['categoria_error'].value_counts()
+            por_categoria = conteos.groupby('categoria_error')['n'].sum().sort_values(ascending=False, kind='stable')
             for categoria, cantidad in por_categoria.items():
                 porcentaje = (cantidad / total_eliminados) * 100
                 print(f"   • {categoria}: {cantidad} ({porcentaje:.1f}%)")
             
             # Por fecha
             print(f"\n📋 ELIMINACIONES POR FECHA:")
-            por_fecha = df_master['fecha_eliminacion'].value_counts().sort_index()
+            por_fecha = conteos.groupby('fecha_eliminacion')['n'].sum().sort_index()
             for fecha, cantidad in por_fecha.items():
                 print(f"   • {fecha}: {cantidad} eliminados")
             
-            return df_master, df_resumen
+            return conteos, df_resumen
             
         except Exception as e:
             print(f"❌ Error al generar reporte: {e}")
@@ -285,15 +900,15 @@ class PapeleraReciclaje:
         print("📊 ESTADO ACTUAL DE LA PAPELERA DE RECICLAJE")
         print("=" * 60)
         
-        if not os.path.exists(self.archivo_master):
-            print("🗑️ La papelera está vacía (sin archivo master)")
+        if len(self._fragmentos()) == 0:
+            print("🗑️ La papelera está vacía (sin fragmentos)")
             return
         
         try:
-            df_master = pd.read_csv(self.archivo_master, low_memory=False)
+            df_master = self.cargar_master()
             
             print(f"📁 Total registros en papelera: {len(df_master):,}")
-            print(f"📄 Archivo master: {self.archivo_master}")
+            print(f"📄 Fragmentos: {self.directorio_fragmentos}")
             print("")
             
             # Estadísticas por proceso
@@ -355,40 +970,31 @@ class PapeleraReciclaje:
             DataFrame con los registros encontrados o None si no se encuentra
         """
         
-        if not os.path.exists(self.archivo_master):
+        if len(self._fragmentos()) == 0:
             print("🗑️ No hay archivo de papelera para buscar")
             return None
         
         try:
-            df_master = pd.read_csv(self.archivo_master, low_memory=False)
+            # Búsqueda por ID original preservado en el índice
+            resultados = self.consultar({'id_original_preservado': str(id_buscar).strip()})
             
-            # Buscar por ID original preservado
-            if 'id_original_preservado' in df_master.columns:
-                # Convertir id_buscar a int si es posible, sino mantenerlo como string
-                try:
-                    id_buscar_num = int(id_buscar)
-                    resultados = df_master[df_master['id_original_preservado'] == id_buscar_num]
-                except (ValueError, TypeError):
-                    resultados = df_master[df_master['id_original_preservado'] == str(id_buscar)]
-                
-                if len(resultados) > 0:
-                    print(f"🔍 Encontradas {len(resultados)} eliminaciones para ID: {id_buscar}")
-                    for _, row in resultados.iterrows():
-                        print(f"   • Proceso: {row.get('proceso_origen', 'N/A')}")
-                        print(f"   • Razón: {row.get('razon_eliminacion', 'N/A')}")
-                        print(f"   • Fecha: {row.get('fecha_eliminacion', 'N/A')}")
-                        print("   " + "-" * 50)
-                    return resultados
-                else:
-                    print(f"❌ No se encontró la propiedad con ID: {id_buscar}")
-                    return None
+            if len(resultados) > 0:
+                print(f"🔍 Encontradas {len(resultados)} eliminaciones para ID: {id_buscar}")
+                for _, row in resultados.iterrows():
+                    print(f"   • Proceso: {row.get('proceso_origen', 'N/A')}")
+                    print(f"   • Razón: {row.get('razon_eliminacion', 'N/A')}")
+                    print(f"   • Fecha: {row.get('fecha_eliminacion', 'N/A')}")
+                    print("   " + "-" * 50)
+                return resultados
             else:
-                print("⚠️ No hay información de IDs originales en la papelera")
+                print(f"❌ No se encontró la propiedad con ID: {id_buscar}")
                 return None
                 
         except Exception as e:
             print(f"❌ Error al buscar en papelera: {e}")
             return None
+    
+    def recuperar_propiedades(self, filtros=None, guardar_como=None):
         """
         Permite recuperar propiedades eliminadas según filtros
         
@@ -398,36 +1004,20 @@ class PapeleraReciclaje:
         """
         
         try:
-            df_master = pd.read_csv(self.archivo_master)
-            
             if filtros:
-                df_filtrado = df_master.copy()
-                
-                for campo, valor in filtros.items():
-                    if campo in df_filtrado.columns:
-                        if isinstance(valor, list):
-                            df_filtrado = df_filtrado[df_filtrado[campo].isin(valor)]
-                        else:
-                            df_filtrado = df_filtrado[df_filtrado[campo] == valor]
-                
+                df_filtrado = self.consultar(filtros)
                 print(f"🔍 Encontrados {len(df_filtrado)} registros con los filtros aplicados")
                 
                 if guardar_como and len(df_filtrado) > 0:
                     # Eliminar columnas de metadatos para recuperación
-                    columnas_recuperacion = [col for col in df_filtrado.columns 
-                                           if not col.startswith(('id_eliminacion', 'fecha_eliminacion', 
-                                                                'hora_eliminacion', 'proceso_origen',
-                                                                'razon_eliminacion', 'categoria_error',
-                                                                'detalles_error', 'valores_analizados',
-                                                                'observaciones'))]
-                    
-                    df_recuperado = df_filtrado[columnas_recuperacion]
-                    df_recuperado.to_csv(guardar_como, index=False)
+                    columnas_recuperacion = [col for col in df_filtrado.columns
+                                           if not col.startswith(COLUMNAS_METADATOS)]
+                    df_filtrado[columnas_recuperacion].to_csv(guardar_como, index=False)
                     print(f"💾 Propiedades recuperadas guardadas en: {guardar_como}")
                 
                 return df_filtrado
             else:
-                return df_master
+                return self.cargar_master()
                 
         except Exception as e:
             print(f"❌ Error al recuperar propiedades: {e}")
@@ -452,5 +1042,6 @@ if __name__ == "__main__":
     print("=" * 55)
     print("Sistema inicializado correctamente")
     print(f"📁 Directorio: {papelera.directorio_papelera}")
-    print(f"📄 Archivo master: {papelera.archivo_master}")
+    print(f"📄 Fragmentos: {papelera.directorio_fragmentos}")
+    print(f"🗂️ Índice: {papelera.archivo_indice}")
     print(f"📊 Archivo resumen: {papelera.archivo_resumen}")
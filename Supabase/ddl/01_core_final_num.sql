@@ -1,9 +1,11 @@
 -- 01_core_final_num.sql
 -- Tabla principal final_num consolidando todos los periodos.
--- Recomendación: particionar por rango de periodo (si formato YYYYMM) o usar índice compuesto.
+-- Particionada por LIST(periodo): una partición por periodo (final_num_<periodo>, creada por
+-- ingestion_loader.py) y una DEFAULT. Las consultas con WHERE periodo = ... solo leen su partición.
+-- La llave primaria incluye la llave de partición (id, periodo).
 
 CREATE TABLE IF NOT EXISTS final_num (
-    id                VARCHAR(40) PRIMARY KEY,
+    id                VARCHAR(64) NOT NULL,
     periodo           TEXT NOT NULL,
     pagina_web        TEXT,
     ciudad            TEXT,
@@ -38,11 +40,15 @@ CREATE TABLE IF NOT EXISTS final_num (
     pxm2_mediana      NUMERIC(14,4),
     pxm2_media        NUMERIC(14,4),
     pxm2_max          NUMERIC(14,4),
-    created_at        TIMESTAMPTZ DEFAULT NOW()
-);
+    -- md5 de la fila cruda del CSV (cargas delta entre periodos)
+    row_hash          CHAR(32),
+    created_at        TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (id, periodo)
+) PARTITION BY LIST (periodo);
 
--- Índices auxiliares
-CREATE INDEX IF NOT EXISTS idx_final_num_periodo ON final_num(periodo);
+CREATE TABLE IF NOT EXISTS final_num_default PARTITION OF final_num DEFAULT;
+
+-- Índices auxiliares (se propagan a cada partición; periodo no necesita índice por el particionado)
 CREATE INDEX IF NOT EXISTS idx_final_num_ciudad ON final_num(ciudad);
 CREATE INDEX IF NOT EXISTS idx_final_num_colonia ON final_num(colonia);
 CREATE INDEX IF NOT EXISTS idx_final_num_operacion_tipo ON final_num(operacion, tipo_propiedad);
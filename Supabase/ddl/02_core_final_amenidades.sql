@@ -3,7 +3,7 @@
 -- o normalizarse en formato long. Aquí ofrecemos modelo wide para velocidad de consulta.
 
 CREATE TABLE IF NOT EXISTS final_amenidades (
-    id             VARCHAR(40) PRIMARY KEY REFERENCES final_num(id) ON DELETE CASCADE,
+    id             VARCHAR(64) NOT NULL,
     periodo        TEXT NOT NULL,
     ciudad         TEXT,
     colonia        TEXT,
@@ -18,7 +18,9 @@ CREATE TABLE IF NOT EXISTS final_amenidades (
     amen_balcon        SMALLINT,
     amen_jardin        SMALLINT,
     -- ... (completar con script de inspección)
-    created_at      TIMESTAMPTZ DEFAULT NOW()
+    created_at      TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (id, periodo),
+    FOREIGN KEY (id, periodo) REFERENCES final_num(id, periodo) ON DELETE CASCADE
 );
 
 CREATE INDEX IF NOT EXISTS idx_final_amenidades_periodo ON final_amenidades(periodo);
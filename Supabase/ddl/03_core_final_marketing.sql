@@ -2,7 +2,7 @@
 -- Variables derivadas de análisis de texto (marketing) por listing.
 
 CREATE TABLE IF NOT EXISTS final_marketing (
-    id             VARCHAR(40) PRIMARY KEY REFERENCES final_num(id) ON DELETE CASCADE,
+    id             VARCHAR(64) NOT NULL,
     periodo        TEXT NOT NULL,
     ciudad         TEXT,
     colonia        TEXT,
@@ -13,7 +13,9 @@ CREATE TABLE IF NOT EXISTS final_marketing (
     marketing_keyword_count INTEGER,
     marketing_intensity_idx NUMERIC(10,4),
     -- Prefijos dinámicos (desc_*, titulo_*). Se recomienda crear columnas a demanda.
-    created_at     TIMESTAMPTZ DEFAULT NOW()
+    created_at     TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (id, periodo),
+    FOREIGN KEY (id, periodo) REFERENCES final_num(id, periodo) ON DELETE CASCADE
 );
 
 CREATE INDEX IF NOT EXISTS idx_final_marketing_periodo ON final_marketing(periodo);
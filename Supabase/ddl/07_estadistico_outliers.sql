@@ -1,7 +1,7 @@
 -- 07_estadistico_outliers.sql
 
 CREATE TABLE IF NOT EXISTS estadistico_outliers (
-    id          VARCHAR(40),
+    id          VARCHAR(64),
     periodo     TEXT NOT NULL,
     variable    TEXT NOT NULL,
     valor       NUMERIC(18,6),
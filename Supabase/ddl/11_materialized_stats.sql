@@ -0,0 +1,84 @@
+-- 11_materialized_stats.sql
+-- Contrapartes materializadas de v_colony_stats y v_amenity_presence (10_views.sql).
+-- Se implementan como tablas resumen por periodo en lugar de MATERIALIZED VIEW: refresh_mv_*(periodo)
+-- recalcula solo el periodo indicado (lee únicamente su partición de final_num) dentro de la
+-- transacción del llamador, así que los lectores siguen viendo la versión anterior hasta el COMMIT
+-- (mismo efecto que REFRESH ... CONCURRENTLY, acotado a los periodos tocados por la ingesta).
+
+CREATE TABLE IF NOT EXISTS mv_colony_stats (
+    ciudad          TEXT,
+    colonia         TEXT,
+    operacion       TEXT,
+    tipo_propiedad  TEXT,
+    periodo         TEXT NOT NULL,
+    n_propiedades   BIGINT,
+    pxm2_mediana    DOUBLE PRECISION,
+    pxm2_media      NUMERIC,
+    pxm2_min        NUMERIC(14,4),
+    pxm2_max        NUMERIC(14,4),
+    refreshed_at    TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Llave lógica (PG15+: NULLS NOT DISTINCT para grupos con colonia/tipo nulos)
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_colony_stats
+    ON mv_colony_stats (periodo, ciudad, colonia, operacion, tipo_propiedad) NULLS NOT DISTINCT;
+-- Consultas del dashboard por colonia (todas las operaciones/tipos/periodos)
+CREATE INDEX IF NOT EXISTS idx_mv_colony_stats_colonia ON mv_colony_stats (ciudad, colonia, periodo);
+
+CREATE TABLE IF NOT EXISTS mv_amenity_presence (
+    colonia         TEXT,
+    periodo         TEXT NOT NULL,
+    n_propiedades   BIGINT,
+    ratio_alberca   NUMERIC,
+    ratio_gimnasio  NUMERIC,
+    refreshed_at    TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_amenity_presence
+    ON mv_amenity_presence (periodo, colonia) NULLS NOT DISTINCT;
+CREATE INDEX IF NOT EXISTS idx_mv_amenity_presence_colonia ON mv_amenity_presence (colonia, periodo);
+
+CREATE OR REPLACE FUNCTION refresh_mv_colony_stats(p_periodo TEXT) RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    filas INTEGER;
+BEGIN
+    DELETE FROM mv_colony_stats WHERE periodo = p_periodo;
+    INSERT INTO mv_colony_stats (ciudad, colonia, operacion, tipo_propiedad, periodo,
+                                 n_propiedades, pxm2_mediana, pxm2_media, pxm2_min, pxm2_max)
+    SELECT ciudad, colonia, operacion, tipo_propiedad, periodo,
+           COUNT(*),
+           PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY pxm2),
+           AVG(pxm2),
+           MIN(pxm2),
+           MAX(pxm2)
+    FROM final_num
+    WHERE periodo = p_periodo
+    GROUP BY 1,2,3,4,5;
+    GET DIAGNOSTICS filas = ROW_COUNT;
+    RETURN filas;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION refresh_mv_amenity_presence(p_periodo TEXT) RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    filas INTEGER;
+BEGIN
+    DELETE FROM mv_amenity_presence WHERE periodo = p_periodo;
+    INSERT INTO mv_amenity_presence (colonia, periodo, n_propiedades, ratio_alberca, ratio_gimnasio)
+    SELECT colonia, periodo,
+           COUNT(*),
+           COUNT(*) FILTER (WHERE amen_alberca=1) *1.0 / NULLIF(COUNT(*),0),
+           COUNT(*) FILTER (WHERE amen_gimnasio=1) *1.0 / NULLIF(COUNT(*),0)
+    FROM final_amenidades
+    WHERE periodo = p_periodo
+    GROUP BY 1,2;
+    GET DIAGNOSTICS filas = ROW_COUNT;
+    RETURN filas;
+END;
+$$;
+
+-- Poblado inicial con los periodos ya cargados
+SELECT refresh_mv_colony_stats(periodo) FROM (SELECT DISTINCT periodo FROM final_num) p;
+SELECT refresh_mv_amenity_presence(periodo) FROM (SELECT DISTINCT periodo FROM final_amenidades) p;
@@ -0,0 +1,141 @@
+"""Verifica los resúmenes materializados contra las tablas del propio pipeline.
+
+Compara mv_colony_stats (ddl/11_materialized_stats.sql) de un periodo con:
+ - Paso 8:  Tablas/<Periodo>/<Ciudad>_<Oper>_<Tipo>_<Periodo>_inicial.csv  (n, PxM2_min/mean/max)
+ - Paso 10: Tablas/<Periodo>/metodos_representativos_<Periodo>.csv       (n, PxM2_representativo)
+
+Uso:
+    python Supabase/scripts/check_materialized.py --periodo Sep25 [--tolerancia 0.001] [--max-reporte 20]
+
+Sale con código 1 si hay grupos faltantes o diferencias mayores a la tolerancia
+(pxm2 se guarda como NUMERIC(14,4), de ahí la tolerancia absoluta por defecto).
+"""
+from __future__ import annotations
+import os
+import sys
+import glob
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(__file__))
+from ingestion_loader import BASE_DIR, CSV_BASE, pg_conn  # noqa: E402
+
+KEYS = ['ciudad', 'colonia', 'operacion', 'tipo_propiedad']
+STEP_KEYS = {'Ciudad': 'ciudad', 'Colonia': 'colonia', 'Operacion': 'operacion', 'Tipo': 'tipo_propiedad'}
+
+
+def fetch_colony_stats(conn, periodo: str) -> pd.DataFrame:
+    query = (
+        "SELECT ciudad, colonia, operacion, tipo_propiedad, n_propiedades, "
+        "pxm2_mediana, pxm2_media, pxm2_min, pxm2_max "
+        "FROM mv_colony_stats WHERE periodo = %s"
+    )
+    with conn.cursor() as cur:
+        cur.execute(query, (periodo,))
+        cols = [d[0] for d in cur.description]
+        mv = pd.DataFrame(cur.fetchall(), columns=cols)
+    for col in cols[4:]:
+        mv[col] = pd.to_numeric(mv[col], errors='coerce')
+    return mv
+
+
+def load_step8(tablas_dir: str, periodo: str) -> pd.DataFrame:
+    files = glob.glob(os.path.join(tablas_dir, f'*_{periodo}_inicial.csv'))
+    if not files:
+        return pd.DataFrame()
+    df = pd.concat([pd.read_csv(f, encoding='utf-8-sig') for f in files], ignore_index=True)
+    df = df.rename(columns=STEP_KEYS)
+    return df[KEYS + ['n', 'PxM2_min', 'PxM2_mean', 'PxM2_max']]
+
+
+def load_step10(tablas_dir: str, periodo: str) -> pd.DataFrame:
+    path = os.path.join(tablas_dir, f'metodos_representativos_{periodo}.csv')
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    df = pd.read_csv(path, encoding='utf-8-sig').rename(columns=STEP_KEYS)
+    return df[KEYS + ['n', 'PxM2_metodo', 'PxM2_representativo']]
+
+
+def compare(mv: pd.DataFrame, ref: pd.DataFrame, pares: Dict[str, str], fuente: str, tol: float,
+            faltantes: bool = True) -> pd.DataFrame:
+    """Une por llave de grupo y devuelve un renglón por diferencia (faltante o fuera de tolerancia)."""
+    merged = ref.merge(mv, on=KEYS, how='outer' if faltantes else 'left', indicator=True)
+    issues = []
+    for lado, etiqueta in (('left_only', f'falta en mv ({fuente})'), ('right_only', f'falta en {fuente}')):
+        faltan = merged[merged['_merge'] == lado]
+        if not faltan.empty:
+            issues.append(faltan[KEYS].assign(fuente=fuente, campo=etiqueta, esperado=np.nan, obtenido=np.nan))
+    both = merged[merged['_merge'] == 'both']
+    for ref_col, mv_col in pares.items():
+        esperado = pd.to_numeric(both[ref_col], errors='coerce')
+        obtenido = both[mv_col]
+        ok = np.isclose(esperado, obtenido, rtol=1e-6, atol=tol, equal_nan=True)
+        mal = both[~ok]
+        if not mal.empty:
+            issues.append(mal[KEYS].assign(fuente=fuente, campo=mv_col,
+                                           esperado=esperado[~ok], obtenido=obtenido[~ok]))
+    if not issues:
+        return pd.DataFrame(columns=KEYS + ['fuente', 'campo', 'esperado', 'obtenido'])
+    return pd.concat(issues, ignore_index=True)
+
+
+def check(periodo: str, tol: float = 1e-3, max_reporte: int = 20) -> bool:
+    tablas_dir = os.path.join(CSV_BASE, 'Tablas', periodo)
+    step8 = load_step8(tablas_dir, periodo)
+    step10 = load_step10(tablas_dir, periodo)
+    if step8.empty and step10.empty:
+        print(f"[ERROR] Sin salidas de Paso 8/10 en {os.path.relpath(tablas_dir, BASE_DIR)}")
+        return False
+
+    with pg_conn() as conn:
+        mv = fetch_colony_stats(conn, periodo)
+    if mv.empty:
+        print(f"[ERROR] mv_colony_stats vacío para {periodo} (¿falta refresh_mv_colony_stats?)")
+        return False
+    print(f"[INFO] mv_colony_stats {periodo}: {len(mv)} grupos")
+    for fuente, ref in (('Paso 8', step8), ('Paso 10', step10)):
+        if ref.empty:
+            print(f"[INFO] Sin salida de {fuente} para {periodo}; se omite")
+
+    reportes = []
+    if not step8.empty:
+        reportes.append(compare(mv, step8, {'n': 'n_propiedades', 'PxM2_min': 'pxm2_min',
+                                            'PxM2_mean': 'pxm2_media', 'PxM2_max': 'pxm2_max'}, 'paso8', tol))
+    if not step10.empty:
+        reportes.append(compare(mv, step10[KEYS + ['n']], {'n': 'n_propiedades'}, 'paso10', tol))
+        # El representativo es media o mediana según el método elegido en el Paso 10
+        con_rep = step10.dropna(subset=['PxM2_representativo'])
+        es_media = con_rep['PxM2_metodo'].astype(str).str.startswith('media_')
+        for mask, mv_col in ((es_media, 'pxm2_media'), (~es_media, 'pxm2_mediana')):
+            reportes.append(compare(mv, con_rep[mask][KEYS + ['PxM2_representativo']],
+                                    {'PxM2_representativo': mv_col}, 'paso10', tol, faltantes=False))
+
+    issues = pd.concat(reportes, ignore_index=True)
+    for fuente, sub in issues.groupby('fuente'):
+        print(f"[WARN] {fuente}: {len(sub)} diferencias")
+        print(sub.head(max_reporte).to_string(index=False))
+    if issues.empty:
+        print("[OK] mv_colony_stats coincide con Paso 8 y Paso 10")
+    return issues.empty
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Compara mv_colony_stats con las salidas de Paso 8/10')
+    p.add_argument('--periodo', required=True, help='Periodo a verificar, ej. Sep25')
+    p.add_argument('--tolerancia', type=float, default=1e-3, help='Tolerancia absoluta para PxM2')
+    p.add_argument('--max-reporte', type=int, default=20, help='Máximo de diferencias a imprimir por fuente')
+    return p.parse_args()
+
+
+if __name__ == '__main__':
+    try:
+        from dotenv import load_dotenv
+        for candidate in (os.path.join(BASE_DIR, '.env'), os.path.join(BASE_DIR, 'Supabase', '.env')):
+            if os.path.isfile(candidate):
+                load_dotenv(candidate)
+    except Exception:
+        pass
+    args = parse_args()
+    sys.exit(0 if check(args.periodo, args.tolerancia, args.max_reporte) else 1)
@@ -11,25 +11,48 @@ Uso (PowerShell desde raíz del repo o carpeta Supabase):
     $env:PG_USER = "postgres"; $env:PG_DB = "postgres"; $env:PG_PORT = "5432"
     python Supabase/scripts/ingestion_loader.py --periodos Sep25
 
-    Agregar --dry-run para simular sin cargar.
+    Agregar --dry-run para simular sin cargar y --workers N para el número de COPY en paralelo.
+    Con --delta (y opcionalmente --base-periodo Ago25) final_num solo envía las filas
+    nuevas/cambiadas según row_hash y elimina/omite las que desaparecieron.
+
+    # Prueba local (PostGIS en docker, DDL aplicado con scripts/apply_ddl.py)
+    docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=postgres postgis/postgis
+    $env:PG_HOST = "localhost"; $env:PG_DB = "postgres"
+    python Supabase/scripts/ingestion_loader.py --periodos Sep25
 
 Flujo:
  - Detecta archivos finales en N5_Resultados/Nivel_1/CSV
- - Ordena carga: final_num -> final_amenidades -> final_marketing -> metodos_representativos -> resumen_colonia (si existe)
- - Inserta usando COPY para velocidad.
- - Crea geom si faltan puntos.
- - Loguea métricas por tabla.
+ - Lee cada CSV como texto y aplica en pandas (vectorizado) el esquema declarado de la tabla destino;
+   las filas con valores no representables van a Supabase/cuarentena/<archivo>_cuarentena.csv
+   con el motivo, en lugar de abortar el archivo completo.
+ - COPY en paralelo (pool de conexiones, por bloques) de los valores ya tipados a una staging UNLOGGED
+   con los tipos destino.
+ - Merge en orden de dependencias: final_num -> final_amenidades -> final_marketing -> metodos_representativos
+   con INSERT ... SELECT (periodo del archivo, geom calculada, row_hash) y upsert por llave primaria.
+   Las filas de amenidades/marketing cuyo (id, periodo) no quedó en final_num (p.ej. la fila padre
+   fue a cuarentena) se agregan a la cuarentena de su archivo con motivo 'padre en cuarentena'.
+ - Refresca mv_colony_stats / mv_amenity_presence solo para los periodos cargados.
+ - Conteos vía filas insertadas por periodo + estimación pg_class (sin COUNT(*) completos).
 
 NOTA: Este script no sube artefactos exclusivos del dashboard.
 """
 from __future__ import annotations
 import os
 import sys
+import csv
 import json
 import time
 import glob
+import io
+import re
+import hashlib
 import argparse
+import numpy as np
+import pandas as pd
 import psycopg2
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from typing import List, Dict
 
@@ -50,27 +73,88 @@ REQUIRED_COLS = {
     'final_marketing': ['id', 'periodo'],
 }
 
+# Orden de merge (llaves foráneas: amenidades/marketing referencian final_num)
+LOAD_ORDER = ['final_num', 'final_amenidades', 'final_marketing', 'metodos_representativos']
+# Tabla hija -> tabla padre de su FK (id, periodo); las filas sin padre van a cuarentena antes del merge
+PARENT_TABLES = {'final_amenidades': 'final_num', 'final_marketing': 'final_num'}
+
+# Encabezados del pipeline (normalizados a minúsculas) que no coinciden con la columna destino
+COLUMN_ALIASES = {
+    'paginaweb': 'pagina_web',
+}
+# Columnas indicadoras de amenidades se guardan como amen_<nombre>
+AMENITY_PREFIX = 'amen_'
+
+INTEGER_TYPES = {'smallint', 'integer', 'bigint'}
+
+# Resúmenes materializados (ddl/11_materialized_stats.sql) a refrescar por periodo tocado
+MV_REFRESH = {
+    'final_num': ['refresh_mv_colony_stats'],
+    'final_amenidades': ['refresh_mv_amenity_presence'],
+}
+
+# Tablas particionadas por LIST(periodo) con row_hash para cargas delta
+PARTITIONED_TABLES = {'final_num'}
+HASH_SEP = '\x1f'
+HASH_COLUMN = '_row_hash'  # columna auxiliar de staging con el row_hash calculado en Python
+
+# Coerción de tipos antes del COPY (las filas inválidas van a cuarentena, no abortan el archivo)
+QUARANTINE_DIR = os.path.join(BASE_DIR, 'Supabase', 'cuarentena')
+COPY_CHUNK_ROWS = 50_000
+NULL_TOKENS = {'', 'nan', 'none', 'null', 'nat'}
+INTEGER_LIMITS = {'smallint': 2**15, 'integer': 2**31, 'bigint': 2**63}
+FLOAT_TYPES = {'double precision', 'real', 'numeric'}
+NUMERIC_RE = re.compile(r'numeric\((\d+),(\d+)\)')
+CHAR_RE = re.compile(r'(?:character varying|character)\((\d+)\)')
+BOOL_VALUES = {'true': 't', 't': 't', '1': 't', '1.0': 't', 'si': 't', 'sí': 't', 'yes': 't',
+               'false': 'f', 'f': 'f', '0': 'f', '0.0': 'f', 'no': 'f'}
+
+DEFAULT_WORKERS = 4
+
+
+def _conn_params() -> Dict[str, object]:
+    """Parámetros de conexión: PGURL si existe, si no desde partes."""
+    pgurl = os.getenv('PGURL')
+    if pgurl:
+        return {'dsn': pgurl}
+    return {
+        'host': os.getenv('PG_HOST','localhost'),
+        'port': int(os.getenv('PG_PORT','5432')),
+        'dbname': os.getenv('PG_DB','esdata'),
+        'user': os.getenv('PG_USER','postgres'),
+        'password': os.getenv('PG_PASSWORD','postgres')
+    }
+
+
 @contextmanager
 def pg_conn():
     """Devuelve conexión usando PGURL si existe, si no construye desde partes."""
-    pgurl = os.getenv('PGURL')
-    if pgurl:
-        conn = psycopg2.connect(pgurl)
-    else:
-        cfg = {
-            'host': os.getenv('PG_HOST','localhost'),
-            'port': int(os.getenv('PG_PORT','5432')),
-            'dbname': os.getenv('PG_DB','esdata'),
-            'user': os.getenv('PG_USER','postgres'),
-            'password': os.getenv('PG_PASSWORD','postgres')
-        }
-        conn = psycopg2.connect(**cfg)
+    conn = psycopg2.connect(**_conn_params())
     try:
         yield conn
     finally:
         conn.close()
 
 
+@contextmanager
+def pg_pool(size: int):
+    """Pool de conexiones compartido por los COPY en paralelo."""
+    pool = ThreadedConnectionPool(1, max(1, size), **_conn_params())
+    try:
+        yield pool
+    finally:
+        pool.closeall()
+
+
+@contextmanager
+def pooled(pool):
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+
 def discover_csvs(periodos: List[str] | None = None) -> List[Dict[str,str]]:
     pattern = os.path.join(CSV_BASE, '*.csv')
     files = glob.glob(pattern)
@@ -92,105 +176,545 @@ def discover_csvs(periodos: List[str] | None = None) -> List[Dict[str,str]]:
     return artifacts
 
 
-def copy_csv(conn, table: str, file_path: str):
-    with conn.cursor() as cur, open(file_path, 'r', encoding='utf-8') as fh:
-        cur.copy_expert(sql=f"COPY {table} FROM STDIN WITH CSV HEADER", file=fh)
+def read_header(file_path: str) -> List[str]:
+    """Encabezado normalizado (sin BOM, minúsculas) del CSV."""
+    with open(file_path, 'r', encoding='utf-8-sig') as fh:
+        header = next(csv.reader(fh))
+    return [c.strip().lower() for c in header]
+
+
+def staging_name(art: Dict[str, str]) -> str:
+    periodo = ''.join(ch if ch.isalnum() else '_' for ch in art['periodo'].lower())
+    return f"stg_{art['table']}_{periodo}"
+
+
+def read_raw(file_path: str) -> pd.DataFrame:
+    """CSV como texto crudo (sin inferencia ni NaN), encabezado normalizado como read_header."""
+    raw = pd.read_csv(file_path, dtype=str, keep_default_na=False, na_filter=False, encoding='utf-8-sig')
+    raw.columns = [c.strip().lower() for c in raw.columns]
+    return raw
+
+
+def frame_hashes(raw: pd.DataFrame) -> pd.Series:
+    """md5 por fila de los valores crudos unidos por \\x1f, en orden de encabezado."""
+    cols = [c for c in raw.columns if c != HASH_COLUMN]
+    joined = raw[cols[0]].str.cat([raw[c] for c in cols[1:]], sep=HASH_SEP) if len(cols) > 1 else raw[cols[0]]
+    return pd.Series([hashlib.md5(v.encode('utf-8')).hexdigest() for v in joined], index=raw.index)
+
+
+def coerce_column(raw: pd.Series, sql_type: str) -> tuple[pd.Series, pd.Series]:
+    """Convierte una columna cruda al formato de COPY de sql_type.
+
+    Devuelve (valores como texto, '' = NULL) y la máscara de valores no vacíos que no
+    se pueden representar en el tipo destino.
+    """
+    text = raw.str.strip()
+    empty = text.str.lower().isin(NULL_TOKENS)
+    if sql_type in INTEGER_LIMITS or sql_type in FLOAT_TYPES or NUMERIC_RE.fullmatch(sql_type):
+        num = pd.to_numeric(text.where(~empty), errors='coerce')
+        bad = ~empty & ~np.isfinite(num)
+        if sql_type in INTEGER_LIMITS:
+            # Enteros: el pipeline escribe conteos como '2.0'
+            bad |= ~empty & ((num % 1 != 0) | (num.abs() >= INTEGER_LIMITS[sql_type]))
+            ok = ~empty & ~bad
+            out = pd.Series('', index=raw.index, dtype=object)
+            out[ok] = num[ok].astype('int64').astype(str)
+            return out, bad
+        match = NUMERIC_RE.fullmatch(sql_type)
+        if match:
+            precision, scale = int(match.group(1)), int(match.group(2))
+            bad |= ~empty & (num.round(scale).abs() >= 10 ** (precision - scale))
+        return text.where(~empty & ~bad, ''), bad
+    if sql_type == 'boolean':
+        out = text.str.lower().map(BOOL_VALUES)
+        bad = ~empty & out.isna()
+        return out.fillna(''), bad
+    if sql_type in ('date', 'timestamp without time zone', 'timestamp with time zone'):
+        fechas = pd.to_datetime(text.where(~empty), errors='coerce')
+        bad = ~empty & fechas.isna()
+        fmt = '%Y-%m-%d' if sql_type == 'date' else '%Y-%m-%d %H:%M:%S'
+        return fechas.dt.strftime(fmt).fillna(''), bad
+    match = CHAR_RE.fullmatch(sql_type)
+    if match:
+        bad = raw.str.len() > int(match.group(1))
+        return raw.where(~bad, ''), bad
+    return raw, pd.Series(False, index=raw.index)
+
+
+def coerce_frame(raw: pd.DataFrame, targets: Dict[str, str],
+                 not_null: set[str]) -> tuple[pd.DataFrame, Dict[str, str], pd.Series]:
+    """Aplica el esquema destino a las columnas del CSV que tienen columna en la tabla.
+
+    Devuelve el DataFrame listo para COPY, el tipo de staging por columna y el motivo
+    de cuarentena por fila ('' si la fila es válida).
+    """
+    typed, layout = {}, {}
+    motivo = pd.Series('', index=raw.index, dtype=object)
+    for col in raw.columns:
+        dest = target_column(col, targets)
+        if col == HASH_COLUMN:
+            typed[col], layout[col] = raw[col], 'character(32)'
+            continue
+        if dest is None or dest == 'geom':
+            continue  # Columnas sin destino no se envían
+        typed[col], bad = coerce_column(raw[col], targets[dest])
+        layout[col] = targets[dest]
+        if dest in not_null:
+            bad = bad | (typed[col] == '')
+        motivo = motivo.mask(bad, motivo + f'{col}:{targets[dest]};')
+    return pd.DataFrame(typed, index=raw.index), layout, motivo.str.rstrip(';')
+
+
+def write_quarantine(art: Dict[str, str], rows: pd.DataFrame, motivo, append: bool = False) -> int:
+    """Guarda las filas rechazadas (crudas + motivo) junto al nombre del archivo fuente.
+    Con append se agregan a la cuarentena ya escrita para el archivo en esta carga."""
+    path = os.path.join(QUARANTINE_DIR, os.path.basename(art['file']).replace('.csv', '_cuarentena.csv'))
+    if rows.empty:
+        if os.path.exists(path) and not append:
+            os.remove(path)
+        return 0
+    os.makedirs(QUARANTINE_DIR, exist_ok=True)
+    out = rows.drop(columns=[HASH_COLUMN], errors='ignore').assign(motivo_cuarentena=motivo)
+    if append and os.path.exists(path):
+        previas = pd.read_csv(path, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+        out = pd.concat([previas, out], ignore_index=True)
+    out.to_csv(path, index=False, encoding='utf-8-sig')
+    print(f"[WARN] {art['name']}: {len(rows)} filas en cuarentena -> {os.path.relpath(path, BASE_DIR)}")
+    return len(rows)
+
+
+def copy_frame(cur, staging: str, frame: pd.DataFrame, layout: Dict[str, str]) -> int:
+    """Crea la staging UNLOGGED con los tipos destino y la llena por bloques de COPY CSV."""
+    columns = sql.SQL(', ').join(sql.SQL('{} {}').format(sql.Identifier(c), sql.SQL(t)) for c, t in layout.items())
+    cur.execute(sql.SQL('DROP TABLE IF EXISTS {}').format(sql.Identifier(staging)))
+    cur.execute(sql.SQL('CREATE UNLOGGED TABLE {} ({})').format(sql.Identifier(staging), columns))
+    stmt = sql.SQL('COPY {} FROM STDIN WITH (FORMAT csv)').format(sql.Identifier(staging)).as_string(cur)
+    copied = 0
+    for start in range(0, len(frame), COPY_CHUNK_ROWS):
+        buf = io.StringIO()
+        frame.iloc[start:start + COPY_CHUNK_ROWS].to_csv(buf, index=False, header=False)
+        buf.seek(0)
+        cur.copy_expert(stmt, buf)
+        copied += cur.rowcount
+    return copied
+
+
+def stage_frame(conn, art: Dict[str, str], raw: pd.DataFrame) -> Dict[str, int]:
+    """Coerción vectorizada + cuarentena + COPY tipado a la staging (sin commit).
+
+    Las filas que no cumplen el esquema de la tabla destino se escriben a cuarentena y el
+    resto se carga; si la llave primaria se repite en el archivo gana la última fila.
+    """
+    table = art['table']
+    targets = table_columns(conn, table)
+    if 'row_hash' in targets and HASH_COLUMN not in raw.columns:
+        raw = raw.assign(**{HASH_COLUMN: frame_hashes(raw)})
+    typed, layout, motivo = coerce_frame(raw, targets, not_null_columns(conn, table))
+    bad = motivo != ''
+    quarantined = write_quarantine(art, raw[bad], motivo[bad])
+    typed = typed[~bad]
+    key = [c for c in primary_key(conn, table) if c in typed.columns]
+    before = len(typed)
+    if key:
+        typed = typed.drop_duplicates(subset=key, keep='last')
+    with conn.cursor() as cur:
+        copied = copy_frame(cur, staging_name(art), typed, layout)
+    return {'filas_copiadas': copied, 'filas_cuarentena': quarantined, 'duplicados': before - len(typed)}
+
+
+def copy_to_staging(pool, art: Dict[str, str]) -> Dict[str, int]:
+    """Carga el CSV ya tipado a su staging UNLOGGED. Devuelve filas copiadas / en cuarentena."""
+    raw = read_raw(art['file'])
+    with pooled(pool) as conn:
+        try:
+            stats = stage_frame(conn, art, raw)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return stats
+
+
+def quarantine_orphans(conn, art: Dict[str, str]) -> int:
+    """Saca de la staging de una tabla hija las filas cuyo (id, periodo) no existe en la tabla padre
+    (p.ej. la fila de final_num quedó en cuarentena) y las agrega a la cuarentena del archivo con
+    motivo 'padre en cuarentena'; sin esto el INSERT ... SELECT viola la FK y se pierde el archivo
+    completo. Va en la transacción del merge (sin commit). Devuelve las filas apartadas."""
+    parent = PARENT_TABLES.get(art['table'])
+    if parent is None:
+        return 0
+    staging = staging_name(art)
+    periodo = sql.SQL('s.periodo') if 'periodo' in table_columns(conn, staging) else sql.Literal(art['periodo'])
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL('DELETE FROM {s} s WHERE NOT EXISTS '
+                            '(SELECT 1 FROM {p} p WHERE p.id = s.id AND p.periodo = {periodo}) RETURNING s.id').format(
+            s=sql.Identifier(staging), p=sql.Identifier(parent), periodo=periodo))
+        orphans = [r[0] for r in cur.fetchall()]
+    if not orphans:
+        return 0
+    raw = read_raw(art['file'])
+    write_quarantine(art, raw[raw['id'].isin(orphans)], 'padre en cuarentena', append=True)
+    return len(orphans)
+
+
+def table_columns(conn, table: str) -> Dict[str, str]:
+    """Columnas destino -> tipo SQL (format_type), en orden de definición."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+            FROM pg_attribute a
+            WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped
+            ORDER BY a.attnum;
+        """, (table,))
+        return dict(cur.fetchall())
+
+
+def not_null_columns(conn, table: str) -> set[str]:
+    """Columnas NOT NULL sin valor por defecto (una fila sin ellas va a cuarentena)."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT a.attname
+            FROM pg_attribute a
+            WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped
+              AND a.attnotnull AND NOT a.atthasdef;
+        """, (table,))
+        return {r[0] for r in cur.fetchall()}
+
+
+def primary_key(conn, table: str) -> List[str]:
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT a.attname
+            FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = to_regclass(%s) AND i.indisprimary;
+        """, (table,))
+        return [r[0] for r in cur.fetchall()]
+
+
+def target_column(col: str, targets: Dict[str, str]) -> str | None:
+    for candidate in (col, COLUMN_ALIASES.get(col), AMENITY_PREFIX + col):
+        if candidate and candidate in targets:
+            return candidate
+    return None
+
+
+def build_merge(conn, art: Dict[str, str]) -> tuple[sql.Composed, List[str]]:
+    """INSERT ... SELECT desde la staging tipada con periodo, geom y row_hash; upsert por PK."""
+    table = art['table']
+    targets = table_columns(conn, table)
+    staged = list(table_columns(conn, staging_name(art)))
+
+    insert_cols, select_exprs = [], []
+    for col in staged:
+        dest = target_column(col, targets)
+        if dest is None or dest in insert_cols or dest == 'geom':
+            continue
+        insert_cols.append(dest)
+        select_exprs.append(sql.Identifier(col))
+
+    if 'periodo' in targets and 'periodo' not in insert_cols:
+        insert_cols.append('periodo')
+        select_exprs.append(sql.Literal(art['periodo']))
+
+    if 'geom' in targets and {'longitud', 'latitud'} <= set(staged):
+        insert_cols.append('geom')
+        select_exprs.append(sql.SQL(
+            "CASE WHEN longitud IS NOT NULL AND latitud IS NOT NULL "
+            "THEN ST_SetSRID(ST_MakePoint(longitud::float8, latitud::float8), 4326) END"
+        ))
+
+    if 'row_hash' in targets and HASH_COLUMN in staged:
+        insert_cols.append('row_hash')
+        select_exprs.append(sql.Identifier(HASH_COLUMN))
+
+    pk = primary_key(conn, table)
+    query = sql.SQL('INSERT INTO {} ({}) SELECT {} FROM {}').format(
+        sql.Identifier(table),
+        sql.SQL(', ').join(map(sql.Identifier, insert_cols)),
+        sql.SQL(', ').join(select_exprs),
+        sql.Identifier(staging_name(art))
+    )
+    if pk:
+        updates = [c for c in insert_cols if c not in pk]
+        conflict = sql.SQL(' ON CONFLICT ({}) ').format(sql.SQL(', ').join(map(sql.Identifier, pk)))
+        if updates:
+            query += conflict + sql.SQL('DO UPDATE SET {}').format(sql.SQL(', ').join(
+                sql.SQL('{0} = EXCLUDED.{0}').format(sql.Identifier(c)) for c in updates))
+        else:
+            query += conflict + sql.SQL('DO NOTHING')
+    return query, insert_cols
+
+
+def merge_staging(conn, art: Dict[str, str]) -> tuple[int, int]:
+    """Aplica el merge staging -> tabla final y elimina la staging.
+    Devuelve filas afectadas y filas apartadas a cuarentena por no tener fila padre."""
+    orphans = quarantine_orphans(conn, art)
+    query, _ = build_merge(conn, art)
+    with conn.cursor() as cur:
+        cur.execute(query)
+        affected = cur.rowcount
+        cur.execute(sql.SQL('DROP TABLE IF EXISTS {}').format(sql.Identifier(staging_name(art))))
     conn.commit()
+    return affected, orphans
+
 
+def partition_name(table: str, periodo: str) -> str:
+    return f"{table}_{''.join(ch if ch.isalnum() else '_' for ch in periodo.lower())}"
 
-def ensure_geom(conn):
-    sql = """
-    UPDATE final_num
-    SET geom = ST_SetSRID(ST_MakePoint(longitud, latitud),4326)
-    WHERE geom IS NULL AND longitud IS NOT NULL AND latitud IS NOT NULL;
+
+def ensure_partition(conn, table: str, periodo: str):
+    """Crea la partición LIST del periodo si la tabla está particionada y aún no existe."""
+    part = partition_name(table, periodo)
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (part,))
+        if cur.fetchone()[0]:
+            return
+        cur.execute(sql.SQL('CREATE TABLE {} PARTITION OF {} FOR VALUES IN ({})').format(
+            sql.Identifier(part), sql.Identifier(table), sql.Literal(periodo)))
+    conn.commit()
+    print(f"[OK] Partición {part} creada")
+
+
+def fetch_hashes(conn, table: str, periodo: str) -> Dict[str, str]:
+    """id -> row_hash ya cargados para un periodo (solo lee su partición)."""
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL('SELECT id, row_hash FROM {} WHERE periodo = %s').format(sql.Identifier(table)), (periodo,))
+        return dict(cur.fetchall())
+
+
+def _copy_ids(cur, ids: List[str]):
+    cur.execute('CREATE TEMP TABLE tmp_delta_ids (id TEXT PRIMARY KEY) ON COMMIT DROP')
+    buf = io.StringIO()
+    csv.writer(buf).writerows([i] for i in ids)
+    buf.seek(0)
+    cur.copy_expert('COPY tmp_delta_ids FROM STDIN WITH CSV', file=buf)
+
+
+def delta_load(conn, art: Dict[str, str], base_periodo: str) -> Dict[str, int]:
+    """Carga un periodo enviando solo filas nuevas/cambiadas respecto a base_periodo.
+
+    - Mismo periodo: borra los ids que desaparecieron y hace upsert de nuevos/cambiados.
+    - Periodo nuevo: copia en el servidor (sin transferencia) las filas sin cambios de la
+      partición base y envía solo las nuevas/cambiadas.
+    Todo ocurre en una transacción.
     """
+    table, periodo = art['table'], art['periodo']
+    raw = read_raw(art['file'])
+    raw[HASH_COLUMN] = frame_hashes(raw)
+    raw = raw.drop_duplicates(subset='id', keep='last')
+    base = pd.Series(fetch_hashes(conn, table, base_periodo), dtype=object)
+
+    previo = raw['id'].map(base)
+    sin_cambio = previo == raw[HASH_COLUMN]
+    nuevos = previo.isna()
+    enviar = raw[~sin_cambio]
+    eliminados = base.index.difference(raw['id']).tolist()
+    stats = {'nuevos': int(nuevos.sum()), 'cambiados': int((~sin_cambio & ~nuevos).sum()),
+             'sin_cambio': int(sin_cambio.sum()), 'eliminados': len(eliminados)}
+
+    ensure_partition(conn, table, periodo)
+    try:
+        with conn.cursor() as cur:
+            if base_periodo == periodo:
+                if eliminados:
+                    _copy_ids(cur, eliminados)
+                    cur.execute(sql.SQL('DELETE FROM {} t USING tmp_delta_ids d WHERE t.periodo = %s AND t.id = d.id').format(
+                        sql.Identifier(table)), (periodo,))
+            elif sin_cambio.any():
+                _copy_ids(cur, raw.loc[sin_cambio, 'id'].tolist())
+                cols = [c for c in table_columns(conn, table) if c not in ('periodo', 'created_at')]
+                cur.execute(sql.SQL('INSERT INTO {t} ({cols}, periodo) SELECT {src}, %s FROM {t} t '
+                                    'JOIN tmp_delta_ids d ON d.id = t.id WHERE t.periodo = %s').format(
+                    t=sql.Identifier(table),
+                    cols=sql.SQL(', ').join(map(sql.Identifier, cols)),
+                    src=sql.SQL(', ').join(sql.SQL('t.{}').format(sql.Identifier(c)) for c in cols)
+                ), (periodo, base_periodo))
+
+            if not enviar.empty:
+                staged = stage_frame(conn, art, enviar)
+                stats['cuarentena'] = staged['filas_cuarentena']
+                query, _ = build_merge(conn, art)
+                cur.execute(query)
+                cur.execute(sql.SQL('DROP TABLE IF EXISTS {}').format(sql.Identifier(staging_name(art))))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return stats
+
+
+def has_periodo(conn, table: str, periodo: str) -> bool:
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL('SELECT EXISTS (SELECT 1 FROM {} WHERE periodo = %s)').format(sql.Identifier(table)), (periodo,))
+        return cur.fetchone()[0]
+
+
+def refresh_materialized(conn, touched: List[tuple[str, str]]) -> Dict[str, int]:
+    """Recalcula los resúmenes materializados solo para los (tabla, periodo) cargados.
+
+    Cada función corre en su propia transacción: los lectores ven la versión previa hasta el COMMIT.
+    """
+    refreshed = {}
+    for table, periodo in sorted(set(touched)):
+        for func in MV_REFRESH.get(table, []):
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(sql.SQL('SELECT {}(%s)').format(sql.Identifier(func)), (periodo,))
+                    refreshed[f'{func}({periodo})'] = cur.fetchone()[0]
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"[WARN] No se pudo refrescar {func}({periodo}): {e}")
+    return refreshed
+
+
+def table_estimates(conn, tables: List[str]) -> Dict[str, int]:
+    """Filas estimadas por tabla desde pg_class (tras ANALYZE), sin COUNT(*) completo."""
     with conn.cursor() as cur:
-        cur.execute(sql)
+        for table in tables:
+            cur.execute(sql.SQL('ANALYZE {}').format(sql.Identifier(table)))
+        cur.execute("SELECT relname, reltuples::bigint FROM pg_class WHERE relname = ANY(%s);", (list(tables),))
+        estimates = dict(cur.fetchall())
     conn.commit()
+    return estimates
 
 
 def validate_columns(file_path: str, required: List[str]) -> bool:
-    import csv
-    with open(file_path, 'r', encoding='utf-8') as fh:
-        reader = csv.reader(fh)
-        header = next(reader)
-    missing = [c for c in required if c not in header]
+    header = read_header(file_path)
+    # periodo se deriva del nombre del archivo si el CSV no lo trae
+    missing = [c for c in required if c not in header and c != 'periodo']
     if missing:
         print(f"[WARN] {os.path.basename(file_path)} faltan columnas requeridas: {missing}")
         return False
     return True
 
 
-def ingest(periodos: List[str] | None = None, dry_run: bool = False):
+def ingest(periodos: List[str] | None = None, dry_run: bool = False, workers: int = DEFAULT_WORKERS,
+           delta: bool = False, base_periodo: str | None = None, refresh: bool = True):
     artifacts = discover_csvs(periodos)
     if not artifacts:
         print('[INFO] No se encontraron CSVs para ingesta')
         return
 
-    # Orden de prioridad
-    order = ['final_num', 'final_amenidades', 'final_marketing', 'metodos_representativos']
-    artifacts.sort(key=lambda x: order.index(x['table']) if x['table'] in order else 999)
+    artifacts.sort(key=lambda x: LOAD_ORDER.index(x['table']) if x['table'] in LOAD_ORDER else 999)
+    valid = []
+    for art in artifacts:
+        if art['table'] in REQUIRED_COLS and not validate_columns(art['file'], REQUIRED_COLS[art['table']]):
+            print(f"[SKIP] Columnas insuficientes para {art['name']}")
+            continue
+        valid.append(art)
+
+    if dry_run:
+        for art in valid:
+            modo = 'DELTA' if delta and art['table'] in PARTITIONED_TABLES else 'COPY'
+            print(f"[DRY-RUN] {modo} {art['name']} -> {staging_name(art)} -> {art['table']} (periodo={art['periodo']})")
+        return
 
     summary = []
-    with pg_conn() as conn:
-        for art in artifacts:
-            table = art['table']
-            file_path = art['file']
-            name = art['name']
-            print(f"[INFO] Iniciando carga {name} -> {table}")
-            t0 = time.time()
-            if table in REQUIRED_COLS and not validate_columns(file_path, REQUIRED_COLS[table]):
-                print(f"[SKIP] Columnas insuficientes para {name}")
-                continue
-            try:
-                if dry_run:
-                    print(f"[DRY-RUN] Simulando COPY {file_path} -> {table}")
-                else:
-                    copy_csv(conn, table, file_path)
-                elapsed = time.time() - t0
-                with conn.cursor() as cur:
-                    cur.execute(f'SELECT COUNT(*) FROM {table};')
-                    total = cur.fetchone()[0]
-                print(f"[OK] {name} -> {table} ({elapsed:.2f}s) total filas tabla: {total}")
+    with pg_pool(workers) as pool:
+        # 0) Modo delta: periodo base contra el que se comparan los row_hash
+        bases = {}
+        if delta:
+            with pooled(pool) as conn:
+                for art in valid:
+                    if art['table'] not in PARTITIONED_TABLES:
+                        continue
+                    for candidato in (art['periodo'], base_periodo):
+                        if candidato and has_periodo(conn, art['table'], candidato):
+                            bases[art['name']] = candidato
+                            break
+                    else:
+                        print(f"[INFO] {art['name']}: sin periodo base cargado, carga completa")
+                conn.commit()
+
+        # 1) Coerción + COPY tipado en paralelo a staging (las cargas delta envían solo sus diferencias en el paso 2)
+        t0 = time.time()
+        copied = {}
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(copy_to_staging, pool, art): art for art in valid if art['name'] not in bases}
+            for future, art in futures.items():
+                try:
+                    copied[art['name']] = future.result()
+                    print(f"[OK] {art['name']} -> {staging_name(art)} ({copied[art['name']]['filas_copiadas']} filas)")
+                except Exception as e:
+                    print(f"[ERROR] Fallo COPY {art['name']}: {e}")
+        print(f"[INFO] Staging completo en {time.time() - t0:.2f}s")
+
+        # 2) Merge secuencial respetando dependencias
+        with pooled(pool) as conn:
+            for art in valid:
+                if art['name'] in bases:
+                    t1 = time.time()
+                    try:
+                        stats = delta_load(conn, art, bases[art['name']])
+                    except Exception as e:
+                        print(f"[ERROR] Fallo delta {art['name']} -> {art['table']}: {e}")
+                        continue
+                    elapsed = time.time() - t1
+                    print(f"[OK] Delta {art['name']} vs {bases[art['name']]} ({elapsed:.2f}s): {stats}")
+                    summary.append({
+                        'archivo': art['name'],
+                        'tabla': art['table'],
+                        'periodo': art['periodo'],
+                        'periodo_base': bases[art['name']],
+                        **stats,
+                        'tiempo_merge_seg': round(elapsed, 2)
+                    })
+                    continue
+                if art['name'] not in copied:
+                    continue
+                t1 = time.time()
+                try:
+                    if art['table'] in PARTITIONED_TABLES:
+                        ensure_partition(conn, art['table'], art['periodo'])
+                    affected, orphans = merge_staging(conn, art)
+                except Exception as e:
+                    conn.rollback()
+                    print(f"[ERROR] Fallo merge {art['name']} -> {art['table']}: {e}")
+                    continue
+                elapsed = time.time() - t1
+                print(f"[OK] {art['name']} -> {art['table']} ({elapsed:.2f}s) filas upsert: {affected}")
+                stats = dict(copied[art['name']])
+                if orphans:
+                    print(f"[WARN] {art['name']}: {orphans} filas sin padre en {PARENT_TABLES[art['table']]} a cuarentena")
+                    stats['filas_cuarentena'] += orphans
+                    stats['filas_sin_padre'] = orphans
                 summary.append({
-                    'archivo': name,
-                    'tabla': table,
+                    'archivo': art['name'],
+                    'tabla': art['table'],
                     'periodo': art['periodo'],
-                    'tiempo_seg': round(elapsed,2),
-                    'total_tabla_post': total
+                    **stats,
+                    'filas_upsert': affected,
+                    'tiempo_merge_seg': round(elapsed, 2)
                 })
-            except Exception as e:
-                conn.rollback()
-                print(f"[ERROR] Fallo carga {name}: {e}")
-        # Post procesos
-        if not dry_run:
-            try:
-                ensure_geom(conn)
-                print('[OK] Geometrías actualizadas')
-            except Exception as e:
-                print(f'[WARN] No se pudo actualizar geom: {e}')
+
+            # 3) Resúmenes materializados de los periodos tocados
+            if summary and refresh:
+                refreshed = refresh_materialized(conn, [(r['tabla'], r['periodo']) for r in summary])
+                for name, filas in refreshed.items():
+                    print(f"[OK] {name}: {filas} grupos")
+
+            # 4) Estimaciones de tamaño sin escaneo completo
+            if summary:
+                estimates = table_estimates(conn, sorted({r['tabla'] for r in summary}))
+                for r in summary:
+                    r['total_tabla_estimado'] = estimates.get(r['tabla'], -1)
 
     if summary:
         print('\n=== RESUMEN CARGA ===')
         for r in summary:
             print(json.dumps(r, ensure_ascii=False))
-        # Detección simple de duplicados id (si tabla principal)
-        if not dry_run:
-            with pg_conn() as conn:
-                try:
-                    with conn.cursor() as cur:
-                        cur.execute("SELECT periodo, COUNT(*) total, COUNT(DISTINCT id) distinct_ids FROM final_num GROUP BY periodo;")
-                        rows = cur.fetchall()
-                        for periodo, total, distinct_ids in rows:
-                            if total != distinct_ids:
-                                print(f"[ALERT] Duplicados detectados en final_num periodo={periodo} (total={total} distinct={distinct_ids})")
-                except Exception as e:
-                    print(f"[WARN] No se pudo ejecutar verificación duplicados: {e}")
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Ingesta CSV a Supabase/PostgreSQL')
     parser.add_argument('--periodos', nargs='*', help='Limitar a periodos específicos (ej: Sep25 May25)')
     parser.add_argument('--dry-run', action='store_true', help='Simular sin ejecutar COPY')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Conexiones / COPY en paralelo')
+    parser.add_argument('--delta', action='store_true',
+                        help='final_num: enviar solo filas nuevas/cambiadas/eliminadas (row_hash) respecto al periodo base')
+    parser.add_argument('--skip-refresh', action='store_true', help='No refrescar resúmenes materializados')
+    parser.add_argument('--base-periodo', help='Periodo base para --delta si el periodo a cargar aún no existe (ej: Ago25)')
     return parser.parse_args()
 
 if __name__ == '__main__':
@@ -206,4 +730,5 @@ if __name__ == '__main__':
     except Exception:
         pass
     args = parse_args()
-    ingest(periodos=args.periodos, dry_run=args.dry_run)
+    ingest(periodos=args.periodos, dry_run=args.dry_run, workers=args.workers,
+           delta=args.delta, base_periodo=args.base_periodo, refresh=not args.skip_refresh)
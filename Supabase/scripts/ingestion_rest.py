@@ -13,7 +13,17 @@ Uso:
     python Supabase/scripts/ingestion_rest.py --periodos Sep25
 
 Notas:
-  - Inserta en lotes (chunk) para reducir overhead HTTP.
+  - Lee el CSV en streaming y envía lotes tipados con concurrencia acotada (--workers) sobre una
+    sesión HTTP compartida (keep-alive). Los tipos salen del esquema de la tabla destino (OpenAPI
+    de PostgREST): solo las columnas numéricas van como JSON numbers; el resto se envía como texto
+    tal cual ('' -> null), así un '012' o '1e3' en una columna TEXT no se reescribe.
+  - El tamaño de lote se adapta a la latencia observada (objetivo --target-latency).
+  - Los lotes se envían como upsert sobre la llave primaria (on_conflict=id,periodo,
+    merge-duplicates), por lo que un reintento con backoff tras 429/5xx/errores de red es idempotente.
+  - final_num recibe row_hash (mismo md5 de la fila cruda que ingestion_loader.frame_hashes), así que
+    una carga --delta posterior con ingestion_loader.py compara contra las filas subidas por REST.
+  - Para probar sin Supabase basta apuntar SUPABASE_URL a un servidor HTTP local que
+    responda en /rest/v1/<tabla>.
   - Si una tabla ya tiene filas del periodo, se puede activar --replace-periodo para
     borrar antes (DELETE where periodo=...).
   - Usa el mismo mapeo que ingestion_loader.py: final_num, final_amenidades, final_marketing.
@@ -23,10 +33,15 @@ import os
 import csv
 import json
 import time
+import hashlib
 import glob
+import random
 import argparse
+import threading
 import requests
-from typing import List, Dict
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Iterator
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 CSV_BASE = os.path.join(BASE_DIR, 'N5_Resultados', 'Nivel_1', 'CSV')
@@ -42,7 +57,28 @@ REQUIRED_COLS = {
     'final_marketing': ['id','periodo'],
 }
 
-CHUNK_SIZE = 500  # Ajustable
+# Llave primaria de final_num / final_amenidades / final_marketing (DDL 01-03)
+CONFLICT_KEY = 'id,periodo'
+HASH_SEP = '\x1f'  # mismo separador que ingestion_loader.frame_hashes
+TABLES_WITH_HASH = {'final_num'}
+# Tipos JSON (OpenAPI de PostgREST) que se envían como número y valores que cuentan como nulo en ellos
+NUMERIC_KINDS = {'integer', 'number'}
+NULL_TOKENS = {'', 'nan', 'none', 'null', 'nat'}  # igual que ingestion_loader
+
+# Encabezados del pipeline (normalizados a minúsculas) que no coinciden con la columna destino
+COLUMN_ALIASES = {
+    'paginaweb': 'pagina_web',
+}
+
+CHUNK_SIZE = 500  # Tamaño inicial (se adapta a la latencia)
+MIN_CHUNK_SIZE = 100
+MAX_CHUNK_SIZE = 5000
+TARGET_LATENCY = 1.0  # segundos por POST
+DEFAULT_WORKERS = 4
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5  # segundos (exponencial con jitter)
+RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+REQUEST_TIMEOUT = 60  # segundos por petición HTTP
 
 
 def discover_csvs(periodos: List[str] | None = None) -> List[Dict[str,str]]:
@@ -65,69 +101,225 @@ def discover_csvs(periodos: List[str] | None = None) -> List[Dict[str,str]]:
     return artifacts
 
 
-def load_rows(file_path: str) -> List[Dict[str,str]]:
-    with open(file_path, 'r', encoding='utf-8') as fh:
-        reader = csv.DictReader(fh)
-        return list(reader)
+def normalize_header(header: List[str]) -> List[str]:
+    cols = [c.strip().lower() for c in header]
+    return [COLUMN_ALIASES.get(c, c) for c in cols]
+
+
+def typed_value(value: str, kind: str | None = None):
+    """'' -> None; en columnas numéricas del destino (kind 'integer'/'number') -> int/float; el resto, texto."""
+    if value is None or value == '':
+        return None
+    if kind not in NUMERIC_KINDS:
+        return value
+    if value.strip().lower() in NULL_TOKENS:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return value  # PostgREST rechaza el lote con el detalle del valor
+    if number != number or number in (float('inf'), float('-inf')):
+        return None
+    if kind == 'integer' and number.is_integer():
+        return int(number)  # el pipeline escribe conteos como '2.0'
+    return number
+
+
+def row_hash(values: List[str]) -> str:
+    """md5 de los valores crudos de la fila unidos por \\x1f (igual que ingestion_loader.frame_hashes)."""
+    return hashlib.md5(HASH_SEP.join(values).encode('utf-8')).hexdigest()
+
+
+def iter_chunks(file_path: str, periodo: str, chunker: 'AdaptiveChunker', types: Dict[str, str] | None = None,
+                with_hash: bool = False) -> Iterator[List[Dict[str, object]]]:
+    """Lee el CSV en streaming y produce lotes del tamaño vigente del chunker, tipados según
+    types (columna destino -> tipo JSON de column_types; sin tipo se envía como texto)."""
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as fh:
+        reader = csv.reader(fh)
+        header = normalize_header(next(reader))
+        kinds = [(types or {}).get(col) for col in header]
+        add_periodo = 'periodo' not in header
+        with_hash = with_hash and 'row_hash' not in header
+        chunk = []
+        for values in reader:
+            if not values:
+                continue  # pandas (ingestion_loader) también omite líneas vacías
+            values += [''] * (len(header) - len(values))
+            row = {col: typed_value(v, kind) for col, v, kind in zip(header, values, kinds)}
+            if add_periodo:
+                row['periodo'] = periodo
+            if with_hash:
+                row['row_hash'] = row_hash(values[:len(header)])
+            chunk.append(row)
+            if len(chunk) >= chunker.size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+class AdaptiveChunker:
+    """Ajusta el tamaño de lote para acercar la latencia de cada POST al objetivo."""
+
+    def __init__(self, size: int = CHUNK_SIZE, target: float = TARGET_LATENCY,
+                 min_size: int = MIN_CHUNK_SIZE, max_size: int = MAX_CHUNK_SIZE):
+        self.size = size
+        self.target = target
+        self.min_size = min_size
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+    def observe(self, rows: int, latency: float):
+        if rows <= 0 or latency <= 0:
+            return
+        ideal = rows * self.target / latency
+        with self._lock:
+            # Suavizado para no oscilar con una sola respuesta lenta/rápida
+            proposed = int(0.5 * self.size + 0.5 * ideal)
+            self.size = max(self.min_size, min(self.max_size, proposed))
+
+
+class RestSender:
+    """Envía lotes a PostgREST con sesión compartida, reintentos idempotentes y backoff."""
+
+    def __init__(self, url: str, key: str, workers: int = DEFAULT_WORKERS,
+                 max_retries: int = MAX_RETRIES, backoff: float = BACKOFF_BASE):
+        self.url = url.rstrip('/')
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, workers))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'apikey': key,
+            'Authorization': f"Bearer {key}",
+            'Content-Type': 'application/json',
+        })
+
+    def close(self):
+        self.session.close()
+
+    def column_types(self, table: str) -> Dict[str, str]:
+        """Columna -> tipo JSON ('integer', 'number', 'string', ...) según el OpenAPI de PostgREST."""
+        r = self.session.get(f"{self.url}/rest/v1/", headers={'Accept': 'application/openapi+json'},
+                             timeout=REQUEST_TIMEOUT)
+        try:
+            props = r.json()['definitions'][table]['properties'] if r.status_code == 200 else None
+        except (ValueError, KeyError, TypeError):
+            props = None
+        if not props:
+            print(f"[WARN] Sin esquema de {table} en /rest/v1/ (status={r.status_code}); todo se envía como texto")
+            return {}
+        return {col: spec.get('type') for col, spec in props.items()}
+
+    def post_chunk(self, table: str, rows: List[Dict[str, object]], on_conflict: str | None = CONFLICT_KEY) -> float:
+        """POST (upsert) de un lote; devuelve la latencia del intento exitoso."""
+        endpoint = f"{self.url}/rest/v1/{table}"
+        params = {'on_conflict': on_conflict} if on_conflict else None
+        headers = {'Prefer': 'return=minimal' + (',resolution=merge-duplicates' if on_conflict else '')}
+        if on_conflict:
+            # Un upsert no puede tocar la misma llave dos veces en un lote: se conserva la última
+            key = on_conflict.split(',')
+            rows = list({tuple(row.get(c) for c in key): row for row in rows}.values())
+        body = json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        for attempt in range(self.max_retries + 1):
+            t0 = time.time()
+            try:
+                r = self.session.post(endpoint, data=body, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+            except requests.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if r.status_code in (200, 201, 204):
+                    return time.time() - t0
+                error = f"status={r.status_code} body={r.text[:300]}"
+                if r.status_code not in RETRY_STATUS:
+                    raise RuntimeError(error)
+            if attempt < self.max_retries:
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+        raise RuntimeError(f"sin éxito tras {self.max_retries} reintentos ({error})")
+
+
+def rest_insert(table: str, file_path: str, periodo: str, sender: RestSender | None, dry_run: bool,
+                workers: int = DEFAULT_WORKERS, chunker: AdaptiveChunker | None = None) -> Dict[str, int]:
+    """Envía el CSV en streaming con a lo sumo 2×workers lotes en vuelo. Devuelve conteos."""
+    chunker = chunker or AdaptiveChunker()
+    with_hash = table in TABLES_WITH_HASH
+    types = sender.column_types(table) if sender is not None else {}
+    stats = {'filas': 0, 'lotes': 0, 'fallidos': 0, 'filas_fallidas': 0}
+    if dry_run:
+        for i, chunk in enumerate(iter_chunks(file_path, periodo, chunker, types, with_hash), start=1):
+            print(f"[DRY-RUN] {table} inserción chunk {i} ({len(chunk)} filas)")
+            stats['lotes'] += 1
+            stats['filas'] += len(chunk)
+        return stats
+
+    def send(chunk):
+        latency = sender.post_chunk(table, chunk)
+        chunker.observe(len(chunk), latency)
+        return len(chunk)
+
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        def drain(return_when):
+            done, _ = wait(list(in_flight), return_when=return_when)
+            for future in done:
+                n = len(in_flight.pop(future))
+                try:
+                    future.result()
+                    stats['filas'] += n
+                except Exception as e:
+                    stats['fallidos'] += 1
+                    stats['filas_fallidas'] += n
+                    print(f"[ERROR] POST {table} lote de {n} filas: {e}")
+
+        for chunk in iter_chunks(file_path, periodo, chunker, types, with_hash):
+            if len(in_flight) >= 2 * max(1, workers):
+                drain(FIRST_COMPLETED)
+            in_flight[executor.submit(send, chunk)] = chunk
+            stats['lotes'] += 1
+        if in_flight:
+            drain('ALL_COMPLETED')
+
+    print(f"[OK] Insertadas {stats['filas']} filas en {table} ({stats['lotes']} lotes, "
+          f"tamaño final {chunker.size}, fallidos {stats['fallidos']})")
+    return stats
 
 
 def validate_columns(file_path: str, table: str) -> bool:
     required = REQUIRED_COLS.get(table)
     if not required:
         return True
-    with open(file_path, 'r', encoding='utf-8') as fh:
-        reader = csv.reader(fh)
-        header = next(reader)
-    missing = [c for c in required if c not in header]
+    with open(file_path, 'r', encoding='utf-8-sig') as fh:
+        header = normalize_header(next(csv.reader(fh)))
+    # periodo se agrega desde el nombre del archivo si el CSV no lo trae
+    missing = [c for c in required if c not in header and c != 'periodo']
     if missing:
         print(f"[WARN] {file_path} faltan columnas: {missing}")
         return False
     return True
 
 
-def rest_insert(table: str, rows: List[Dict[str,str]], url: str, key: str, dry_run: bool):
-    endpoint = f"{url}/rest/v1/{table}"
-    headers = {
-        'apikey': key,
-        'Authorization': f"Bearer {key}",
-        'Content-Type': 'application/json'
-    }
-    total = 0
-    for i in range(0, len(rows), CHUNK_SIZE):
-        chunk = rows[i:i+CHUNK_SIZE]
-        if dry_run:
-            print(f"[DRY-RUN] {table} inserción chunk {i//CHUNK_SIZE+1} ({len(chunk)} filas)")
-            continue
-        r = requests.post(endpoint, headers=headers, data=json.dumps(chunk), params={'return':'minimal'} )
-        if r.status_code not in (200,201,204):
-            print(f"[ERROR] POST {table} status={r.status_code} body={r.text[:300]}")
-            raise SystemExit(1)
-        total += len(chunk)
-    if not dry_run:
-        print(f"[OK] Insertadas {total} filas en {table}")
-
-
-def delete_period(table: str, periodo: str, url: str, key: str):
-    endpoint = f"{url}/rest/v1/{table}";
-    headers = {
-        'apikey': key,
-        'Authorization': f"Bearer {key}",
-        'Content-Type': 'application/json'
-    }
-    r = requests.delete(endpoint, headers=headers, params={'periodo':'eq.'+periodo})
+def delete_period(table: str, periodo: str, sender: RestSender):
+    endpoint = f"{sender.url}/rest/v1/{table}"
+    r = sender.session.delete(endpoint, params={'periodo':'eq.'+periodo}, timeout=REQUEST_TIMEOUT)
     if r.status_code not in (200,204):
         print(f"[WARN] No se pudo borrar periodo={periodo} en {table}: {r.status_code} {r.text[:120]}")
 
 
-def count_table(table: str, url: str, key: str) -> int:
-    endpoint = f"{url}/rest/v1/{table}";
+def count_table(table: str, sender: RestSender, periodo: str | None = None) -> int:
+    """Conteo vía Content-Range; por periodo si se indica (evita contar toda la tabla)."""
+    endpoint = f"{sender.url}/rest/v1/{table}"
     headers = {
-        'apikey': key,
-        'Authorization': f"Bearer {key}",
         'Range': '0-0',
-        'Prefer': 'count=exact'
+        'Prefer': 'count=exact' if periodo else 'count=estimated'
     }
-    r = requests.get(endpoint, headers=headers)
+    params = {'select': 'id', 'periodo': 'eq.' + periodo} if periodo else {'select': 'id'}
+    try:
+        r = sender.session.get(endpoint, headers=headers, params=params, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as e:
+        print(f"[WARN] No se pudo contar {table}: {e}")
+        return -1
     if 'content-range' in r.headers:
         try:
             total = r.headers['content-range'].split('/')[-1]
@@ -137,36 +329,46 @@ def count_table(table: str, url: str, key: str) -> int:
     return -1
 
 
-def ingest(periodos: List[str] | None, dry_run: bool, replace: bool):
+def ingest(periodos: List[str] | None, dry_run: bool, replace: bool,
+           workers: int = DEFAULT_WORKERS, target_latency: float = TARGET_LATENCY) -> bool:
     supabase_url = os.getenv('SUPABASE_URL')
     supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
-    if not (supabase_url and supabase_key):
+    if not dry_run and not (supabase_url and supabase_key):
         print('[ERROR] Faltan SUPABASE_URL o SUPABASE_SERVICE_KEY')
         raise SystemExit(1)
 
     artifacts = discover_csvs(periodos)
     if not artifacts:
         print('[INFO] No se encontraron CSVs para ingesta')
-        return
+        return True
     # Orden consistente con script psycopg2
     order = ['final_num','final_amenidades','final_marketing']
     artifacts.sort(key=lambda x: order.index(x['table']) if x['table'] in order else 999)
 
-    for art in artifacts:
-        table = art['table']
-        periodo = art['periodo']
-        file_path = art['file']
-        print(f"[INFO] Procesando {art['name']} -> {table} periodo={periodo}")
-        if not validate_columns(file_path, table):
-            print('[SKIP] Columnas insuficientes')
-            continue
-        rows = load_rows(file_path)
-        if replace and not dry_run:
-            delete_period(table, periodo, supabase_url, supabase_key)
-        rest_insert(table, rows, supabase_url, supabase_key, dry_run)
-        if not dry_run:
-            total = count_table(table, supabase_url, supabase_key)
-            print(f"[TOTAL] {table} filas ahora: {total}")
+    sender = None if dry_run else RestSender(supabase_url, supabase_key, workers=workers)
+    ok = True
+    try:
+        for art in artifacts:
+            table = art['table']
+            periodo = art['periodo']
+            file_path = art['file']
+            print(f"[INFO] Procesando {art['name']} -> {table} periodo={periodo}")
+            if not validate_columns(file_path, table):
+                print('[SKIP] Columnas insuficientes')
+                continue
+            if replace and not dry_run:
+                delete_period(table, periodo, sender)
+            t0 = time.time()
+            stats = rest_insert(table, file_path, periodo, sender, dry_run, workers=workers,
+                                chunker=AdaptiveChunker(target=target_latency))
+            ok &= stats['fallidos'] == 0
+            if not dry_run:
+                total = count_table(table, sender, periodo)
+                print(f"[TOTAL] {table} periodo={periodo} filas ahora: {total} ({time.time() - t0:.1f}s)")
+    finally:
+        if sender is not None:
+            sender.close()
+    return ok
 
 
 def parse_args():
@@ -174,8 +376,11 @@ def parse_args():
     p.add_argument('--periodos', nargs='*', help='Limitar periodos (ej: Sep25 May25)')
     p.add_argument('--dry-run', action='store_true', help='Simular')
     p.add_argument('--replace-periodo', action='store_true', help='Borrar filas del periodo antes de insertar')
+    p.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='POST concurrentes')
+    p.add_argument('--target-latency', type=float, default=TARGET_LATENCY, help='Latencia objetivo por lote (s)')
     return p.parse_args()
 
 if __name__ == '__main__':
     args = parse_args()
-    ingest(args.periodos, args.dry_run, args.replace_periodo)
+    if not ingest(args.periodos, args.dry_run, args.replace_periodo, args.workers, args.target_latency):
+        raise SystemExit(1)
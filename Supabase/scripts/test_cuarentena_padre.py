@@ -0,0 +1,66 @@
+"""Prueba de la cuarentena de filas hijas cuyo padre en final_num fue a cuarentena.
+
+Carga un periodo de prueba (Zz99) con una fila de final_num inválida (precio no numérico) y su fila
+en final_amenidades: la fila padre debe ir a cuarentena, la hija también (motivo 'padre en
+cuarentena') y el resto del archivo de amenidades debe cargarse. Al terminar borra el periodo.
+
+Uso:
+  (PowerShell, contra una base con el DDL aplicado, p.ej. PostGIS local en docker)
+    $env:PG_HOST = "localhost"; $env:PG_DB = "postgres"
+    python Supabase/scripts/test_cuarentena_padre.py
+
+Requisitos:
+  - Variables PGURL o PG_HOST, PG_PORT, PG_DB, PG_USER, PG_PASSWORD
+  - DDL de Supabase/ddl aplicado (scripts/apply_ddl.py)
+"""
+import os
+import shutil
+import tempfile
+import pandas as pd
+from psycopg2 import sql
+import ingestion_loader as loader
+
+PERIODO = 'Zz99'
+
+
+def test_cuarentena_padre():
+    tmp = tempfile.mkdtemp(prefix='cuarentena_padre_')
+    csv_base, quarantine_dir = loader.CSV_BASE, loader.QUARANTINE_DIR
+    loader.CSV_BASE, loader.QUARANTINE_DIR = tmp, os.path.join(tmp, 'cuarentena')
+    try:
+        pd.DataFrame({
+            'id': ['zz-ok', 'zz-malo'], 'precio': ['1500000', 'abc'], 'area_m2': ['90', '120'],
+            'ciudad': ['Gdl', 'Gdl'], 'colonia': ['Centro', 'Centro'],
+        }).to_csv(os.path.join(tmp, f'0.Final_Num_{PERIODO}.csv'), index=False)
+        pd.DataFrame({
+            'id': ['zz-ok', 'zz-malo'], 'alberca': ['1', '0'],
+        }).to_csv(os.path.join(tmp, f'0.Final_Ame_{PERIODO}.csv'), index=False)
+
+        loader.ingest(periodos=[PERIODO], workers=1, refresh=False)
+
+        with loader.pg_conn() as conn, conn.cursor() as cur:
+            cur.execute('SELECT id FROM final_num WHERE periodo = %s ORDER BY id', (PERIODO,))
+            padres = [r[0] for r in cur.fetchall()]
+            cur.execute('SELECT id FROM final_amenidades WHERE periodo = %s ORDER BY id', (PERIODO,))
+            hijas = [r[0] for r in cur.fetchall()]
+        assert padres == ['zz-ok'], padres
+        assert hijas == ['zz-ok'], hijas
+
+        cuarentena = pd.read_csv(os.path.join(loader.QUARANTINE_DIR, f'0.Final_Ame_{PERIODO}_cuarentena.csv'),
+                                 dtype=str, encoding='utf-8-sig')
+        assert cuarentena['id'].tolist() == ['zz-malo'], cuarentena
+        assert cuarentena['motivo_cuarentena'].tolist() == ['padre en cuarentena'], cuarentena
+        print('[OK] Fila hija apartada a cuarentena y archivo de amenidades cargado')
+        return True
+    finally:
+        loader.CSV_BASE, loader.QUARANTINE_DIR = csv_base, quarantine_dir
+        shutil.rmtree(tmp, ignore_errors=True)
+        with loader.pg_conn() as conn, conn.cursor() as cur:
+            cur.execute('DELETE FROM final_num WHERE periodo = %s', (PERIODO,))  # amenidades: ON DELETE CASCADE
+            cur.execute(sql.SQL('DROP TABLE IF EXISTS {}').format(
+                sql.Identifier(loader.partition_name('final_num', PERIODO))))
+            conn.commit()
+
+
+if __name__ == '__main__':
+    test_cuarentena_padre()
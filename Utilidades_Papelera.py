@@ -5,7 +5,7 @@ Herramientas para consultar, analizar y recuperar propiedades eliminadas
 
 import pandas as pd
 import numpy as np
-from Sistema_Papelera_Reciclaje import PapeleraReciclaje
+from Sistema_Papelera_Reciclaje import PapeleraReciclaje, RANGO_PRECIO_MERCADO, cuantil_histograma
 # import matplotlib.pyplot as plt  # Movido a requirements opcionales
 # import seaborn as sns  # Movido a requirements opcionales
 
@@ -24,7 +24,7 @@ class UtilPapelera:
         print("=" * 60)
         
         try:
-            df_master = pd.read_csv(self.papelera.archivo_master)
+            df_master = self.papelera.cargar_master()
             df_resumen = pd.read_csv(self.papelera.archivo_resumen)
             
             # Estadísticas generales
@@ -79,30 +79,21 @@ class UtilPapelera:
         """
         
         try:
-            df_master = pd.read_csv(self.papelera.archivo_master)
-            df_resultado = df_master.copy()
+            # Campos indexados (id, proceso, categoría, Colonia, tipo, precio, fecha) se
+            # resuelven en el índice; solo se leen las filas que coinciden
+            df_resultado = self.papelera.consultar(filtros)
             
             print(f"🔍 BÚSQUEDA EN PAPELERA DE RECICLAJE")
             print("=" * 45)
             
-            # Aplicar filtros
             filtros_aplicados = []
-            
             for campo, valor in filtros.items():
-                if campo in df_resultado.columns:
-                    if isinstance(valor, list):
-                        df_resultado = df_resultado[df_resultado[campo].isin(valor)]
-                        filtros_aplicados.append(f"{campo} en {valor}")
-                    elif isinstance(valor, dict) and 'min' in valor:
-                        # Filtro por rango
-                        if 'min' in valor:
-                            df_resultado = df_resultado[df_resultado[campo] >= valor['min']]
-                        if 'max' in valor:
-                            df_resultado = df_resultado[df_resultado[campo] <= valor['max']]
-                        filtros_aplicados.append(f"{campo}: {valor}")
-                    else:
-                        df_resultado = df_resultado[df_resultado[campo] == valor]
-                        filtros_aplicados.append(f"{campo} = {valor}")
+                if isinstance(valor, list):
+                    filtros_aplicados.append(f"{campo} en {valor}")
+                elif isinstance(valor, dict):
+                    filtros_aplicados.append(f"{campo}: {valor}")
+                else:
+                    filtros_aplicados.append(f"{campo} = {valor}")
             
             print(f"📋 Filtros aplicados:")
             for filtro in filtros_aplicados:
@@ -132,90 +123,88 @@ class UtilPapelera:
     def recuperar_propiedades_selectivas(self, filtros, archivo_recuperacion):
         """
         Recupera propiedades que cumplen ciertos criterios
+        
+        Returns:
+            Número de propiedades escritas en archivo_recuperacion (None si no hubo)
         """
         
-        df_encontradas = self.buscar_propiedades(filtros)
+        # Se escribe fragmento por fragmento, sin armar el resultado completo en memoria
+        total = self.papelera.exportar_recuperacion(filtros, archivo_recuperacion)
         
-        if df_encontradas is not None and len(df_encontradas) > 0:
-            # Preparar para recuperación (eliminar metadatos)
-            columnas_originales = [col for col in df_encontradas.columns 
-                                 if not col.startswith(('id_eliminacion', 'fecha_eliminacion', 
-                                                      'hora_eliminacion', 'proceso_origen',
-                                                      'razon_eliminacion', 'categoria_error',
-                                                      'detalles_error', 'valores_analizados',
-                                                      'observaciones'))]
-            
-            df_recuperado = df_encontradas[columnas_originales]
-            
-            # Guardar
-            df_recuperado.to_csv(archivo_recuperacion, index=False)
-            
+        if total > 0:
             print(f"\n💾 RECUPERACIÓN EXITOSA:")
-            print(f"   • {len(df_recuperado):,} propiedades recuperadas")
+            print(f"   • {total:,} propiedades recuperadas")
             print(f"   • Guardadas en: {archivo_recuperacion}")
             
-            return df_recuperado
+            return total
         else:
             print(f"❌ No se encontraron propiedades para recuperar")
             return None
     
+    def recuperar_a_esperando(self, filtros, periodo):
+        """
+        Devuelve las propiedades que cumplen filtros a Datos_Filtrados/Esperando/<periodo>/
+        para que el Paso 1 del periodo siguiente las reprocese
+        """
+        
+        return self.papelera.recuperar_a_esperando(filtros, periodo)
+    
     def analizar_patrones_eliminacion(self):
-        """Analiza patrones en las eliminaciones para mejorar el proceso"""
+        """Analiza patrones en las eliminaciones para mejorar el proceso
+        
+        Lee el cubo de agregados de la papelera (no el historial); las medianas
+        se estiman con sus histogramas logarítmicos.
+        """
         
         try:
-            df_master = pd.read_csv(self.papelera.archivo_master)
+            cubo = self.papelera.cubo()
             
             print("🔬 ANÁLISIS DE PATRONES DE ELIMINACIÓN")
             print("=" * 50)
             
             # Análisis por precio
-            if 'precio' in df_master.columns:
-                df_master['precio'] = pd.to_numeric(df_master['precio'], errors='coerce')
-                
+            if cubo['precio_n'].sum() > 0:
                 print(f"\n💰 ANÁLISIS POR PRECIO:")
-                stats_precio = df_master['precio'].describe()
-                print(f"   • Precio promedio eliminado: ${stats_precio['mean']:,.0f}")
-                print(f"   • Precio mediano eliminado: ${stats_precio['50%']:,.0f}")
-                print(f"   • Rango: ${stats_precio['min']:,.0f} - ${stats_precio['max']:,.0f}")
+                precio_min, precio_max = cubo['precio_min'].min(), cubo['precio_max'].max()
+                mediana = cuantil_histograma(self.papelera.histograma_cubo('precio'), 0.5, precio_min, precio_max)
+                print(f"   • Precio promedio eliminado: ${cubo['precio_suma'].sum() / cubo['precio_n'].sum():,.0f}")
+                print(f"   • Precio mediano eliminado: ${mediana:,.0f}")
+                print(f"   • Rango: ${precio_min:,.0f} - ${precio_max:,.0f}")
                 
                 # Distribución por categoría
                 print(f"\n   Por categoría de error:")
-                por_categoria_precio = df_master.groupby('categoria_error')['precio'].agg(['mean', 'count'])
-                for categoria in por_categoria_precio.index:
-                    precio_promedio = por_categoria_precio.loc[categoria, 'mean']
-                    cantidad = por_categoria_precio.loc[categoria, 'count']
-                    print(f"      • {categoria}: ${precio_promedio:,.0f} promedio ({cantidad} casos)")
+                por_categoria_precio = cubo.groupby('categoria_error')[['precio_suma', 'precio_n']].sum()
+                for categoria, fila in por_categoria_precio.iterrows():
+                    precio_promedio = fila['precio_suma'] / fila['precio_n'] if fila['precio_n'] else np.nan
+                    print(f"      • {categoria}: ${precio_promedio:,.0f} promedio ({int(fila['precio_n'])} casos)")
             
             # Análisis por área
-            if 'area_m2' in df_master.columns:
-                df_master['area_m2'] = pd.to_numeric(df_master['area_m2'], errors='coerce')
-                
+            if cubo['area_m2_n'].sum() > 0:
                 print(f"\n🏠 ANÁLISIS POR ÁREA:")
-                stats_area = df_master['area_m2'].describe()
-                print(f"   • Área promedio eliminada: {stats_area['mean']:.1f}m²")
-                print(f"   • Área mediana eliminada: {stats_area['50%']:.1f}m²")
-                print(f"   • Rango: {stats_area['min']:.1f}m² - {stats_area['max']:.1f}m²")
+                area_min, area_max = cubo['area_m2_min'].min(), cubo['area_m2_max'].max()
+                mediana = cuantil_histograma(self.papelera.histograma_cubo('area_m2'), 0.5, area_min, area_max)
+                print(f"   • Área promedio eliminada: {cubo['area_m2_suma'].sum() / cubo['area_m2_n'].sum():.1f}m²")
+                print(f"   • Área mediana eliminada: {mediana:.1f}m²")
+                print(f"   • Rango: {area_min:.1f}m² - {area_max:.1f}m²")
             
             # Análisis por tipo de propiedad
-            if 'tipo_propiedad' in df_master.columns:
+            total_eliminados = cubo['n'].sum()
+            por_tipo = cubo[cubo['tipo_propiedad'] != ''].groupby('tipo_propiedad')['n'].sum()
+            if len(por_tipo) > 0:
                 print(f"\n🏢 ANÁLISIS POR TIPO DE PROPIEDAD:")
-                por_tipo = df_master['tipo_propiedad'].value_counts()
-                total_eliminados = len(df_master)
-                
-                for tipo, cantidad in por_tipo.items():
+                for tipo, cantidad in por_tipo.sort_values(ascending=False).items():
                     porcentaje = (cantidad / total_eliminados) * 100
                     print(f"   • {tipo}: {cantidad:,} ({porcentaje:.1f}%)")
             
             # Tendencias temporales
             print(f"\n📈 TENDENCIAS TEMPORALES:")
-            df_master['fecha_eliminacion'] = pd.to_datetime(df_master['fecha_eliminacion'])
-            por_fecha = df_master.groupby('fecha_eliminacion').size()
+            por_fecha = cubo.groupby('fecha_eliminacion')['n'].sum()
             
             print(f"   • Promedio diario: {por_fecha.mean():.1f} eliminaciones")
             print(f"   • Máximo en un día: {por_fecha.max()} eliminaciones")
             print(f"   • Días con actividad: {len(por_fecha)}")
             
-            return df_master
+            return cubo
             
         except Exception as e:
             print(f"❌ Error en análisis de patrones: {e}")
@@ -225,47 +214,42 @@ class UtilPapelera:
         """Sugiere propiedades que podrían recuperarse"""
         
         try:
-            df_master = pd.read_csv(self.papelera.archivo_master)
+            cubo = self.papelera.cubo()
             
             print("💡 SUGERENCIAS DE RECUPERACIÓN")
             print("=" * 40)
             
             sugerencias = []
             
-            # Buscar propiedades con precios razonables eliminadas por otros motivos
-            if 'precio' in df_master.columns and 'categoria_error' in df_master.columns:
-                df_master['precio'] = pd.to_numeric(df_master['precio'], errors='coerce')
-                
-                # Propiedades con precio entre 500k-50M eliminadas por coherencia dimensional
-                candidatos_dimensionales = df_master[
-                    (df_master['categoria_error'] == 'Incoherencia Dimensional') &
-                    (df_master['precio'] >= 500000) &
-                    (df_master['precio'] <= 50000000)
-                ]
-                
-                if len(candidatos_dimensionales) > 0:
-                    sugerencias.append({
-                        'categoria': 'Revisar Dimensionales con Precio Razonable',
-                        'cantidad': len(candidatos_dimensionales),
-                        'descripcion': 'Propiedades eliminadas por área pero con precios del mercado',
-                        'filtros': {
-                            'categoria_error': 'Incoherencia Dimensional',
-                            'precio': {'min': 500000, 'max': 50000000}
-                        }
-                    })
+            # Propiedades con precio de mercado (500k-50M) eliminadas por coherencia dimensional
+            precio_min, precio_max = RANGO_PRECIO_MERCADO
+            candidatos_dimensionales = cubo.loc[
+                cubo['categoria_error'] == 'Incoherencia Dimensional', 'precio_n_mercado'
+            ].sum()
+            
+            if candidatos_dimensionales > 0:
+                sugerencias.append({
+                    'categoria': 'Revisar Dimensionales con Precio Razonable',
+                    'cantidad': int(candidatos_dimensionales),
+                    'descripcion': 'Propiedades eliminadas por área pero con precios del mercado',
+                    'filtros': {
+                        'categoria_error': 'Incoherencia Dimensional',
+                        'precio': {'min': precio_min, 'max': precio_max}
+                    }
+                })
             
             # Buscar propiedades únicas en colonias premium
-            if 'Colonia' in df_master.columns:
-                colonias_premium = ['Providencia', 'Chapalita', 'Americana', 'Del Valle']
-                for colonia in colonias_premium:
-                    en_colonia = df_master[df_master['Colonia'].str.contains(colonia, na=False, case=False)]
-                    if len(en_colonia) > 0:
-                        sugerencias.append({
-                            'categoria': f'Propiedades en {colonia}',
-                            'cantidad': len(en_colonia),
-                            'descripcion': f'Revisar eliminaciones en zona premium {colonia}',
-                            'filtros': {'Colonia': colonia}
-                        })
+            por_colonia = cubo.groupby('Colonia')['n'].sum()
+            colonias_premium = ['Providencia', 'Chapalita', 'Americana', 'Del Valle']
+            for colonia in colonias_premium:
+                en_colonia = por_colonia[por_colonia.index.str.contains(colonia, case=False, regex=False)].sum()
+                if en_colonia > 0:
+                    sugerencias.append({
+                        'categoria': f'Propiedades en {colonia}',
+                        'cantidad': int(en_colonia),
+                        'descripcion': f'Revisar eliminaciones en zona premium {colonia}',
+                        'filtros': {'Colonia': colonia}
+                    })
             
             # Mostrar sugerencias
             if sugerencias:
@@ -0,0 +1 @@
+"""Benchmarks offline del pipeline: datos sintéticos (sintetico) y corridas por paso (pipeline_bench)."""
@@ -0,0 +1,358 @@
+"""Micro-benchmarks de funciones calientes de parseo y normalización (Pasos 1, 4 y 5).
+Cada caso corre una función sobre un corpus fijo (misma semilla -> mismas entradas) con una o más
+variantes de ejecución:
+  escalar      la llamada fila a fila que usa hoy el pipeline ([f(v) for v in valores])
+  unicos       f sobre los valores únicos (pd.factorize) y reexpansión por código
+  vectorizado  implementación con métodos .str de pandas (solo donde existe una equivalente)
+  categorias   ruta de columna del Paso 5 (factorize, una evaluación por valor distinto + Categorical.from_codes)
+Como pytest-benchmark, se reportan min/mediana/media/desviación por llamada y ops/s sobre varias
+rondas (con una ronda de calentamiento y el GC apagado), pero corre sin pytest ni red.
+La memoria por llamada se mide en una pasada aparte con tracemalloc (pico y retenida, incluye la
+lista de resultados). Cada variante se valida contra la escalar (columna 'coincide').
+
+Salida: N5_Resultados/Benchmarks/micro_<timestamp>.csv/.json y comparación contra el reporte micro
+previo (o --base): 'regresion' si la mediana por llamada supera UMBRAL_REGRESION veces la previa.
+
+Uso:
+    python -m esdata.benchmark.micro [--filtro step5] [--n 20000] [--rondas 7] [--base <micro.json>] [--estricto]
+"""
+from __future__ import annotations
+import os
+import gc
+import sys
+import glob
+import json
+import math
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from esdata.utils.paths import path_base, ensure_dir
+from esdata.utils.logging_setup import get_logger
+from esdata.utils.profiling import UMBRAL_REGRESION
+from esdata.benchmark.sintetico import CARACTERISTICAS, SERVICIOS, AMENIDADES, EXTERIORES, SEGMENTOS
+
+log = get_logger('micro')
+
+N_CORPUS = 20_000
+RONDAS = 7
+
+COLUMNAS_REPORTE = ['caso', 'variante', 'n', 'unicos', 'rondas', 'min_ns', 'mediana_ns', 'media_ns', 'desv_ns',
+                    'ops_s', 'mem_pico_b', 'mem_retenida_b', 'coincide', 'vs_escalar']
+
+
+# ---------------------------------------------------------------------------
+# Corpus fijos (valores con los formatos crudos del scraping y casos sucios)
+# ---------------------------------------------------------------------------
+
+def _mezclar(rng, n: int, comunes, raros, frac_raros: float = 0.05) -> list:
+    """n valores de `comunes` con una fracción `frac_raros` tomada de `raros` (nulos, basura...)."""
+    salida = np.asarray(comunes, dtype=object)
+    raro = rng.random(n) < frac_raros
+    salida[raro] = np.asarray(raros, dtype=object)[rng.integers(0, len(raros), raro.sum())]
+    return salida.tolist()
+
+
+def corpus_precio(n: int, rng) -> list:
+    montos = np.round(rng.lognormal(np.log(3_000_000), 1.2, n), -3).astype(np.int64)
+    oper = rng.choice(['venta', 'renta'], n)
+    moneda = rng.choice(['MN', 'USD', 'mn'], n, p=[0.97, 0.02, 0.01])
+    comunes = [f'{o}{m} {v:,}' for o, m, v in zip(oper, moneda, montos)]
+    raros = [None, np.nan, 'Desconocido', '', 'Precio a consultar', '$ 2,500,000', 'MN 15000.50', 'ventaMN 1,250,000.75']
+    return _mezclar(rng, n, comunes, raros)
+
+
+def corpus_numero(n: int, rng) -> list:
+    area = rng.integers(15, 900, n)
+    plantillas = np.array(['{}m²', '{} m² tot.', '{} m² cub.', 'Mantenimiento MN {:,}', '{} baños', '{}.5'])
+    elegidas = plantillas[rng.integers(0, len(plantillas), n)]
+    comunes = [p.format(int(a) * (10 if p.startswith('Mant') else 1)) for p, a in zip(elegidas, area)]
+    raros = [None, np.nan, '', 'abc', '1,234.5', '1.234.567', '12,5']
+    return _mezclar(rng, n, comunes, raros)
+
+
+def corpus_url(n: int, rng) -> list:
+    lat = rng.uniform(20.55, 20.80, n)
+    lon = rng.uniform(-103.50, -103.25, n)
+    comunes = [f'https://maps.google.com/maps/api/staticmap?center={a:.15f},{o:.15f}&zoom=16&markers={a:.15f},{o:.15f}'
+               f'&size=780x456&sensor=true&scale=2' for a, o in zip(lat, lon)]
+    raros = [None, np.nan, '', 'https://maps.google.com/maps/api/staticmap?zoom=16', 'center=20.6,-103.3', 12345]
+    return _mezclar(rng, n, comunes, raros)
+
+
+def corpus_tiempo(n: int, rng) -> list:
+    dias = rng.integers(2, 365, n)
+    comunes = np.array([f'Publicado hace {d} días' for d in dias], dtype=object)
+    u = rng.random(n)
+    comunes[u < 0.22] = 'Publicado hace más de 1 año'
+    comunes[(u >= 0.22) & (u < 0.24)] = 'Publicado desde ayer'
+    comunes[(u >= 0.24) & (u < 0.25)] = 'Publicado hoy'
+    raros = [None, np.nan, 'Publicado hace 3 meses', 'Publicado hace mas de un año', 'Desconocido', 'hace 1 dia']
+    return _mezclar(rng, n, comunes, raros)
+
+
+def _terminos() -> list:
+    return [t for vocab in (CARACTERISTICAS, SERVICIOS, AMENIDADES, EXTERIORES) for t, _ in vocab]
+
+
+def corpus_token(n: int, rng) -> list:
+    terminos = _terminos()
+    comunes = np.asarray(terminos, dtype=object)[rng.integers(0, len(terminos), n)]
+    variantes = rng.random(n)
+    comunes[variantes < 0.10] = [t.upper() for t in comunes[variantes < 0.10]]
+    comunes[(variantes >= 0.10) & (variantes < 0.15)] = [f'  {t} ' for t in comunes[(variantes >= 0.10) & (variantes < 0.15)]]
+    raros = ['', ' ', 'roof-garden', 'Pet Friendly', 'Área de Juegos', 'xyz desconocido', '#1']
+    return _mezclar(rng, n, comunes, raros)
+
+
+def corpus_lista(n: int, rng) -> list:
+    terminos = np.asarray(_terminos(), dtype=object)
+    largos = rng.integers(1, 9, n)
+    comunes = ['; '.join(terminos[rng.integers(0, len(terminos), k)]) for k in largos]
+    raros = [None, np.nan, '', 'Desconocido', 'nan', 'Alberca, Gimnasio / Terraza | Jardín\nAsador']
+    return _mezclar(rng, n, comunes, raros)
+
+
+def corpus_tipo(n: int, rng) -> list:
+    comunes = [s[0] for s in SEGMENTOS] + [s[1] for s in SEGMENTOS] + ['LocC', 'Departamentos', 'Lote']
+    raros = [None, np.nan, 'Desconocido', 'Bodega comercial', 'Casa en condominio', 'Edificio', ' departamento ']
+    return _mezclar(rng, n, np.asarray(comunes, dtype=object)[rng.integers(0, len(comunes), n)], raros)
+
+
+def corpus_operacion(n: int, rng) -> list:
+    comunes = ['venta', 'renta', 'Venta', 'Renta', 'Ven', 'Ren']
+    raros = [None, np.nan, 'Preventa', 'Traspaso', 'Alquiler', 'RENTA', 'Desconocido']
+    return _mezclar(rng, n, np.asarray(comunes, dtype=object)[rng.integers(0, len(comunes), n)], raros)
+
+
+# ---------------------------------------------------------------------------
+# Variantes de ejecución
+# ---------------------------------------------------------------------------
+
+def escalar(func):
+    def variante(valores):
+        return [func(v) for v in valores]
+    return variante
+
+
+def unicos(func):
+    """f una vez por valor distinto (los nulos cuentan como un valor) y reexpansión por código."""
+    def variante(valores):
+        codigos, distintos = pd.factorize(pd.Series(valores, dtype=object), use_na_sentinel=False)
+        resultados = np.empty(len(distintos), dtype=object)
+        for i, v in enumerate(distintos):
+            resultados[i] = func(v)
+        return resultados[codigos].tolist()
+    return variante
+
+
+def _coords_vectorizado(patron):
+    def variante(valores):
+        partes = pd.Series(valores, dtype=object).str.extract(patron)
+        lat = pd.to_numeric(partes[0]).round(6)
+        lon = pd.to_numeric(partes[1]).round(6)
+        return [(None, None) if math.isnan(a) else (o, a) for o, a in zip(lon.tolist(), lat.tolist())]
+    return variante
+
+
+def _tiempo_vectorizado(dias_re, mes_re):
+    def variante(valores):
+        s = pd.Series(valores, dtype=object)
+        texto = s.where(s.isna(), s.astype(str).str.lower())
+        dias = pd.to_numeric(texto.str.extract(dias_re, expand=False))
+        meses = pd.to_numeric(texto.str.extract(mes_re, expand=False)) * 30
+        salida = dias.fillna(meses)
+        salida = salida.mask(texto.str.contains('ayer', regex=False, na=False), 1)
+        salida = salida.mask(texto.str.contains('hoy', regex=False, na=False), 0)
+        anio = texto.str.contains(r'm[aá]s de un año|mas de 1 año', na=False)  # mismas frases que la escalar
+        salida = salida.mask(anio, 366)
+        return [None if math.isnan(v) else int(v) for v in salida.tolist()]
+    return variante
+
+
+def _categorias(func):
+    def variante(valores):
+        return func(pd.Series(valores, dtype=object))  # la categórica se itera como valores
+    return variante
+
+
+def casos() -> dict:
+    """{nombre: (corpus, {variante: función(lista) -> lista})}. Importa los pasos solo al usarse."""
+    from esdata.pipeline import step1_consolidar_adecuar as s1
+    from esdata.text import step4_analisis_variables_texto as s4
+    from esdata.pipeline import step5_analisis_logico_corroboracion as s5
+    def basicas(func):
+        return {'escalar': escalar(func), 'unicos': unicos(func)}
+    return {
+        'step1._extract_precio': (corpus_precio, basicas(s1._extract_precio)),
+        'step1._clean_number': (corpus_numero, basicas(s1._clean_number)),
+        'step1._extract_coords': (corpus_url, {**basicas(s1._extract_coords),
+                                               'vectorizado': _coords_vectorizado(s1.RE_COORD)}),
+        'step1._parse_tiempo_publicacion': (corpus_tiempo, {**basicas(s1._parse_tiempo_publicacion),
+                                                            'vectorizado': _tiempo_vectorizado(s1.TIEMPO_DIAS_RE,
+                                                                                               s1.TIEMPO_MES_RE)}),
+        'step4._normalize_token': (corpus_token, basicas(s4._normalize_token)),
+        'step4._split_items': (corpus_lista, basicas(s4._split_items)),
+        'step5._normalize_property_type': (corpus_tipo, {**basicas(s5._normalize_property_type),
+            'categorias': _categorias(lambda s: s5._normalize_series(s, s5._normalize_property_type))}),
+        'step5._normalize_operation': (corpus_operacion, {**basicas(s5._normalize_operation),
+            'categorias': _categorias(lambda s: s5._normalize_series(s, s5._normalize_operation))}),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Medición
+# ---------------------------------------------------------------------------
+
+def _iguales(a, b) -> bool:
+    if isinstance(a, (tuple, list)) and isinstance(b, (tuple, list)):
+        return len(a) == len(b) and all(_iguales(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) and isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-12) or (math.isnan(a) and math.isnan(b))
+    return a == b
+
+
+def _diferencias(esperado: list, obtenido: list) -> int:
+    return sum(not _iguales(a, b) for a, b in zip(esperado, obtenido)) + abs(len(esperado) - len(obtenido))
+
+
+def medir_tiempo(variante, valores, rondas: int = RONDAS) -> list[float]:
+    """Segundos por ronda (una pasada completa al corpus), tras una ronda de calentamiento."""
+    variante(valores)
+    gc_activo = gc.isenabled()
+    gc.disable()
+    try:
+        tiempos = []
+        for _ in range(rondas):
+            t0 = time.perf_counter()
+            variante(valores)
+            tiempos.append(time.perf_counter() - t0)
+    finally:
+        if gc_activo:
+            gc.enable()
+    return tiempos
+
+
+def medir_memoria(variante, valores) -> tuple[int, int]:
+    """(pico, retenida) en bytes asignados durante una pasada; la retenida incluye los resultados."""
+    ya_activo = tracemalloc.is_tracing()
+    if not ya_activo:
+        tracemalloc.start()
+    try:
+        gc.collect()
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        resultado = variante(valores)
+        actual, pico = tracemalloc.get_traced_memory()
+        del resultado
+    finally:
+        if not ya_activo:
+            tracemalloc.stop()
+    return pico - base, actual - base
+
+
+def correr(filtro: str | None = None, n: int = N_CORPUS, rondas: int = RONDAS, semilla: int = 0) -> pd.DataFrame:
+    filas = []
+    for nombre, (corpus, variantes) in casos().items():
+        if filtro and filtro not in nombre:
+            continue
+        valores = corpus(n, np.random.default_rng(semilla))
+        distintos = pd.Series(valores, dtype=object).nunique(dropna=False)
+        referencia = variantes['escalar'](valores)
+        base_ns = None
+        for variante, func in variantes.items():
+            dif = _diferencias(referencia, func(valores))
+            tiempos = [t / n * 1e9 for t in medir_tiempo(func, valores, rondas)]
+            pico, retenida = medir_memoria(func, valores)
+            mediana = statistics.median(tiempos)
+            base_ns = mediana if variante == 'escalar' else base_ns
+            filas.append({
+                'caso': nombre, 'variante': variante, 'n': n, 'unicos': distintos, 'rondas': rondas,
+                'min_ns': min(tiempos), 'mediana_ns': mediana, 'media_ns': statistics.fmean(tiempos),
+                'desv_ns': statistics.stdev(tiempos) if len(tiempos) > 1 else 0.0,
+                'ops_s': 1e9 / mediana if mediana > 0 else None,
+                'mem_pico_b': pico / n, 'mem_retenida_b': retenida / n,
+                'coincide': dif == 0, 'vs_escalar': mediana / base_ns if base_ns else None,
+            })
+            if dif:
+                log.warning(f'⚠️ {nombre} [{variante}]: {dif:,} resultados distintos a la versión escalar')
+            log.info(f'   • {nombre} [{variante}]: {mediana:,.0f} ns/llamada | {pico / n:,.0f} B pico/llamada')
+    return pd.DataFrame(filas, columns=COLUMNAS_REPORTE)
+
+
+# ---------------------------------------------------------------------------
+# Reporte y regresiones
+# ---------------------------------------------------------------------------
+
+def _dir_reportes() -> str:
+    return path_base('N5_Resultados', 'Benchmarks')
+
+
+def reporte_previo(excluir: str | None = None) -> str | None:
+    previos = sorted(p for p in glob.glob(os.path.join(_dir_reportes(), 'micro_*.json')) if p != excluir)
+    return previos[-1] if previos else None
+
+
+def cargar_reporte(path: str) -> pd.DataFrame:
+    with open(path, encoding='utf-8') as f:
+        return pd.DataFrame(json.load(f)['resultados'])
+
+
+def comparar(actual: pd.DataFrame, previo: pd.DataFrame, umbral: float = UMBRAL_REGRESION) -> pd.DataFrame:
+    """Une por (caso, variante) y clasifica la mediana por llamada: regresion / mejora / estable / nuevo."""
+    llaves = ['caso', 'variante']
+    comp = actual[llaves + ['mediana_ns', 'mem_pico_b']].merge(
+        previo[llaves + ['mediana_ns', 'mem_pico_b']], on=llaves, how='left', suffixes=('', '_previo'))
+    comp['razon'] = comp['mediana_ns'] / comp['mediana_ns_previo']
+    comp['estado'] = np.select(
+        [comp['razon'].isna(), comp['razon'] > umbral, comp['razon'] < 1 / umbral],
+        ['nuevo', 'regresion', 'mejora'], 'estable')
+    return comp
+
+
+def guardar_reporte(reporte: pd.DataFrame, comparacion: pd.DataFrame | None, base: str | None) -> str:
+    destino = os.path.join(ensure_dir(_dir_reportes()), f"micro_{datetime.now():%Y%m%d_%H%M%S}")
+    reporte.to_csv(destino + '.csv', index=False, encoding='utf-8-sig')
+    with open(destino + '.json', 'w', encoding='utf-8') as f:
+        json.dump({'fecha': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+                   'pandas': pd.__version__, 'plataforma': platform.platform(), 'base': base,
+                   'resultados': json.loads(reporte.to_json(orient='records'))}, f, ensure_ascii=False, indent=2)
+    if comparacion is not None:
+        comparacion.to_csv(destino + '_comparacion.csv', index=False, encoding='utf-8-sig')
+    log.info(f'💾 Reporte micro: {destino}.csv')
+    return destino + '.json'
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Micro-benchmarks de funciones calientes (Pasos 1, 4 y 5)')
+    p.add_argument('--filtro', default=None, help='Subcadena del caso, ej. step5 o _extract_precio')
+    p.add_argument('--n', type=int, default=N_CORPUS, help='Tamaño del corpus por caso')
+    p.add_argument('--rondas', type=int, default=RONDAS)
+    p.add_argument('--semilla', type=int, default=0)
+    p.add_argument('--base', default=None, help='Reporte micro_*.json contra el cual comparar (por defecto el último)')
+    p.add_argument('--umbral', type=float, default=UMBRAL_REGRESION, help='Razón de mediana que cuenta como regresión')
+    p.add_argument('--estricto', action='store_true', help='Salir con código 1 si hay regresiones')
+    p.add_argument('--no-guardar', action='store_true', help='Solo imprimir, sin escribir el reporte')
+    return p.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    reporte = correr(args.filtro, args.n, args.rondas, args.semilla)
+    print(reporte.to_string(index=False, float_format=lambda v: f'{v:,.2f}'))
+    base = args.base or reporte_previo()
+    comparacion = comparar(reporte, cargar_reporte(base), args.umbral) if base else None
+    regresiones = pd.DataFrame()
+    if comparacion is not None:
+        regresiones = comparacion[comparacion['estado'] == 'regresion']
+        log.info(f'📊 Comparación contra {os.path.basename(base)}: {len(regresiones)} regresiones')
+        for _, r in regresiones.iterrows():
+            log.warning(f"⚠️ Regresión {r['caso']} [{r['variante']}]: {r['mediana_ns_previo']:,.0f} -> "
+                        f"{r['mediana_ns']:,.0f} ns/llamada (x{r['razon']:.2f})")
+    if not args.no_guardar:
+        guardar_reporte(reporte, comparacion, base)
+    sys.exit(1 if args.estricto and not regresiones.empty else 0)
@@ -0,0 +1,176 @@
+"""Benchmark de los Pasos 1–10 sobre datos sintéticos (sin depender de Base_de_Datos real).
+Para cada escala:
+  1. Crea un sandbox (raíz temporal) con docs/ y los GeoJSON de colonias del repo.
+  2. Genera el dataset sintético (esdata.benchmark.sintetico) en <sandbox>/Base_de_Datos/<Periodo>.
+  3. Ejecuta cada paso en un subproceso con ESDATA_BASE_DIR=<sandbox> y mide tiempo de pared,
+     CPU y pico de RSS del proceso (aislado por paso).
+Reporta filas/s (filas sintéticas / segundos) por paso y de punta a punta en
+N5_Resultados/Benchmarks/benchmark_<timestamp>.csv/.json del repo.
+
+Uso:
+    python -m esdata.benchmark.pipeline_bench --filas 10000 [--filas 100000 ...] [--pasos 1-6] [--conservar]
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import importlib
+import subprocess
+import tempfile
+from datetime import datetime
+import pandas as pd
+from esdata.utils.paths import path_base, ensure_dir
+from esdata.utils.logging_setup import get_logger
+from esdata.benchmark.sintetico import generar_dataset
+from esdata.pipeline.run_pipeline import PASOS
+
+try:
+    import resource
+except ImportError:  # Windows: sin pico de RSS
+    resource = None
+
+log = get_logger('benchmark')
+
+
+# Archivos del repo que los pasos leen además de Base_de_Datos
+ARCHIVOS_SANDBOX = [
+    os.path.join('docs', 'Lista de Varibales Orquestacion.csv'),
+    os.path.join('N1_Tratamiento', 'Geolocalizacion', 'Colonias', 'colonias-Guadalajara.geojson'),
+    os.path.join('N1_Tratamiento', 'Geolocalizacion', 'Colonias', 'colonias-Zapopan.geojson'),
+]
+
+MARCA_RESULTADO = '__BENCH__'
+
+
+def _pico_rss_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def _ejecutar_hijo(paso: int, periodo: str):
+    """Corre un paso en este proceso e imprime sus métricas (lo invoca el proceso padre)."""
+    modulo = importlib.import_module(PASOS[paso])
+    t0, c0 = time.perf_counter(), time.process_time()
+    modulo.run(periodo)
+    metricas = {'wall_s': time.perf_counter() - t0, 'cpu_s': time.process_time() - c0, 'rss_pico_mb': _pico_rss_mb()}
+    print(MARCA_RESULTADO + json.dumps(metricas), flush=True)
+
+
+def preparar_sandbox(directorio: str | None = None) -> str:
+    """Raíz temporal con los archivos de referencia que necesita el pipeline."""
+    raiz = directorio or tempfile.mkdtemp(prefix='esdata_bench_')
+    for rel in ARCHIVOS_SANDBOX:
+        origen = path_base(rel)
+        if not os.path.exists(origen):
+            log.warning(f'⚠️ No existe {origen}; el paso que lo usa puede fallar')
+            continue
+        ensure_dir(os.path.dirname(os.path.join(raiz, rel)))
+        shutil.copy2(origen, os.path.join(raiz, rel))
+    return raiz
+
+
+def correr_paso(paso: int, periodo: str, sandbox: str, filas: int) -> dict:
+    """Ejecuta un paso en un subproceso aislado y devuelve sus métricas."""
+    env = dict(os.environ, ESDATA_BASE_DIR=sandbox, ESDATA_PERFIL=os.environ.get('ESDATA_PERFIL', '0'))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [path_base(), env.get('PYTHONPATH')]))
+    cmd = [sys.executable, '-m', 'esdata.benchmark.pipeline_bench', '--hijo', str(paso), '--periodo', periodo]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True, encoding='utf-8', errors='replace')
+    fila = {'filas': filas, 'paso': paso, 'modulo': PASOS[paso], 'ok': proc.returncode == 0,
+            'wall_s': time.perf_counter() - t0, 'cpu_s': None, 'rss_pico_mb': None}
+    for linea in proc.stdout.splitlines():
+        if linea.startswith(MARCA_RESULTADO):
+            fila.update(json.loads(linea[len(MARCA_RESULTADO):]))
+    if not fila['ok']:
+        ultimo = (proc.stderr.strip().splitlines() or [''])[-1]
+        log.error(f'❌ Paso {paso} falló: {ultimo}')
+    fila['filas_por_s'] = filas / fila['wall_s'] if fila['ok'] and fila['wall_s'] > 0 else None
+    return fila
+
+
+def benchmark(escalas: list[int], pasos: list[int], periodo: str = 'Sep25', semilla: int = 0,
+              conservar: bool = False) -> pd.DataFrame:
+    """Genera y corre cada escala; devuelve una fila por (escala, paso) más el total de punta a punta."""
+    filas_reporte = []
+    for filas in escalas:
+        sandbox = preparar_sandbox()
+        log.info(f'🏁 Benchmark {filas:,} filas en {sandbox}')
+        try:
+            t0 = time.perf_counter()
+            generar_dataset(filas, periodo, sandbox, semilla)
+            filas_reporte.append({'filas': filas, 'paso': 0, 'modulo': 'sintetico', 'ok': True,
+                                  'wall_s': time.perf_counter() - t0})
+            resultados = []
+            for paso in pasos:
+                fila = correr_paso(paso, periodo, sandbox, filas)
+                resultados.append(fila)
+                log.info(f"   • Paso {paso}: {fila['wall_s']:.1f}s"
+                         + (f" | {fila['filas_por_s']:,.0f} filas/s" if fila['filas_por_s'] else '')
+                         + (f" | pico {fila['rss_pico_mb']:.0f} MB" if fila['rss_pico_mb'] else ''))
+                if not fila['ok']:
+                    break  # los pasos siguientes dependen de este
+            filas_reporte.extend(resultados)
+            total = sum(r['wall_s'] for r in resultados)
+            picos = [r['rss_pico_mb'] for r in resultados if r['rss_pico_mb'] is not None]
+            filas_reporte.append({'filas': filas, 'paso': 'total', 'modulo': 'punta_a_punta',
+                                  'ok': all(r['ok'] for r in resultados), 'wall_s': total,
+                                  'cpu_s': sum(r['cpu_s'] or 0 for r in resultados),
+                                  'rss_pico_mb': max(picos) if picos else None,
+                                  'filas_por_s': filas / total if total > 0 else None})
+            log.info(f'✅ {filas:,} filas: {total:.1f}s punta a punta')
+        finally:
+            if conservar:
+                log.info(f'📁 Sandbox conservado: {sandbox}')
+            else:
+                shutil.rmtree(sandbox, ignore_errors=True)
+    return pd.DataFrame(filas_reporte)
+
+
+def guardar_reporte(reporte: pd.DataFrame, pasos: list[int]) -> str:
+    salida = ensure_dir(path_base('N5_Resultados', 'Benchmarks'))
+    base = os.path.join(salida, f"benchmark_{datetime.now():%Y%m%d_%H%M%S}")
+    reporte.to_csv(base + '.csv', index=False, encoding='utf-8-sig')
+    with open(base + '.json', 'w', encoding='utf-8') as f:
+        json.dump({'fecha': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+                   'plataforma': platform.platform(), 'cpus': os.cpu_count(), 'pasos': pasos,
+                   'resultados': json.loads(reporte.to_json(orient='records'))}, f, ensure_ascii=False, indent=2)
+    log.info(f'💾 Reporte de benchmark: {base}.csv')
+    return base + '.csv'
+
+
+def _parse_pasos(texto: str) -> list[int]:
+    pasos = []
+    for parte in texto.split(','):
+        ini, _, fin = parte.partition('-')
+        pasos.extend(range(int(ini), int(fin or ini) + 1))
+    desconocidos = [p for p in pasos if p not in PASOS]
+    if desconocidos:
+        raise argparse.ArgumentTypeError(f'Pasos inexistentes: {desconocidos}')
+    return pasos
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Benchmark del pipeline sobre datos sintéticos')
+    p.add_argument('--filas', type=int, action='append', help='Escala a probar (repetible), ej. --filas 10000 --filas 1000000')
+    p.add_argument('--pasos', type=_parse_pasos, default=list(PASOS), help='Pasos a correr, ej. 1-6 o 1,2,5 (por defecto 1-10)')
+    p.add_argument('--periodo', default='Sep25')
+    p.add_argument('--semilla', type=int, default=0)
+    p.add_argument('--conservar', action='store_true', help='No borrar el sandbox al terminar')
+    p.add_argument('--hijo', type=int, help=argparse.SUPPRESS)
+    return p.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.hijo is not None:
+        _ejecutar_hijo(args.hijo, args.periodo)
+        sys.exit(0)
+    reporte = benchmark(args.filas or [10_000], args.pasos, args.periodo, args.semilla, args.conservar)
+    print(reporte.to_string(index=False))
+    guardar_reporte(reporte, args.pasos)
@@ -0,0 +1,276 @@
+"""Generador de datos sintéticos estilo Inmuebles24 para benchmarks.
+Escribe Base_de_Datos/<Periodo>/Inm24_<Ciu>_<Oper>_<Tipo>_<Periodo>_01.csv con el mismo
+encabezado y formatos crudos que el scraping real:
+  precio 'ventaMN 3,450,000' / 'rentaUSD 1,650', area_m2 '95m²', íconos '2 baños', '1 estac.',
+  tiempo_publicacion 'Publicado hace 12 días', ubicacion_url con center=<lat>,<lon> dentro del
+  polígono real de la colonia (GeoJSON del Paso 2) y texto de características/amenidades.
+Incluye una fracción de casos sucios (precios/áreas atípicos, coordenadas fuera de colonias,
+campos vacíos) para que los pasos de validación trabajen como con datos reales.
+Se genera por bloques vectorizados, así que escala de 10K a 5M filas con memoria acotada.
+Sin destino se escribe en un directorio temporal nuevo; nunca se escribe en una carpeta
+Base_de_Datos/<Periodo> que ya tenga CSV (no pisa datos reales del repo).
+
+Uso:
+    python -m esdata.benchmark.sintetico --filas 100000 --periodo Sep25 [--destino <raiz_vacia>] [--semilla 0]
+"""
+from __future__ import annotations
+import os
+import glob
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+import shapely
+from esdata.utils.paths import ensure_dir
+from esdata.utils.logging_setup import get_logger
+
+log = get_logger('sintetico')
+
+COLUMNAS = [
+    'id', 'PaginaWeb', 'Ciudad', 'Fecha Scrap', 'tipo_propiedad', 'area_m2', 'recamaras', 'estacionamientos',
+    'operacion', 'precio', 'mantenimiento', 'direccion', 'ubicacion_url', 'titulo', 'descripcion', 'anunciante',
+    'codigo_anunciante', 'codigo_inmuebles24', 'tiempo_publicacion', 'area_total', 'area_cubierta', 'banos_icon',
+    'estacionamientos_icon', 'recamaras_icon', 'medio_banos_icon', 'antiguedad_icon',
+    'Características generales', 'Servicios', 'Amenidades', 'Exteriores'
+]
+
+# (etiqueta tipo, abreviatura archivo, operación, peso, área mediana m², sigma área, recámaras (min, max) o None)
+SEGMENTOS = [
+    ('Departamento', 'Dep', 'venta', 0.33, 95, 0.35, (1, 3)),
+    ('Departamento', 'Dep', 'renta', 0.22, 85, 0.35, (1, 3)),
+    ('Casa', 'Cas', 'venta', 0.20, 200, 0.45, (2, 5)),
+    ('Casa', 'Cas', 'renta', 0.08, 180, 0.45, (2, 4)),
+    ('Oficina', 'Ofc', 'venta', 0.05, 120, 0.70, None),
+    ('Terreno / Lote', 'Terr', 'venta', 0.06, 400, 0.90, None),
+    ('Local comercial', 'local', 'venta', 0.06, 100, 0.80, None),
+]
+OPER_ARCHIVO = {'venta': 'Ven', 'renta': 'Ren'}
+CIUDAD_NOMBRE = {'Gdl': 'Guadalajara', 'Zap': 'Zapopan'}
+
+# Precio por m² (mediana, sigma lognormal) por operación; cada colonia multiplica por su factor
+PXM2 = {'venta': (38_000, 0.35), 'renta': (220, 0.30)}
+SIGMA_FACTOR_COLONIA = 0.35
+TIPO_CAMBIO_USD = 20
+
+# Fracciones de casos especiales
+FRAC_USD = 0.01
+FRAC_PRECIO_ATIPICO = 0.005
+FRAC_AREA_ATIPICA = 0.003
+FRAC_FUERA_COLONIA = 0.015
+FRAC_SIN_URL = 0.005
+
+PUNTOS_POR_COLONIA = 32
+FILAS_POR_BLOQUE = 200_000
+
+# Vocabulario (término, probabilidad) observado en los CSV de Inmuebles24
+CARACTERISTICAS = [
+    ('Cocina integral', 0.59), ('Elevador : 1', 0.48), ('Alberca', 0.40), ('Estado de conservación : Excelente', 0.39),
+    ('Caseta de guardia', 0.35), ('Escuelas Cercanas', 0.34), ('Piso en el que se encuentra : 3', 0.29),
+    ('Mascotas', 0.25), ('Acceso discapacitados', 0.24), ('Terraza', 0.18), ('Closet', 0.14),
+    ('Cuartos de servicio', 0.12), ('Ubicación : Frente', 0.10), ('Amueblado', 0.10), ('Jacuzzi', 0.09),
+    ('Frente a Parque', 0.05), ('Chimenea', 0.01),
+]
+SERVICIOS = [
+    ('Seguridad privada', 0.43), ('Gimnasio', 0.40), ('Aire acondicionado', 0.30), ('Área de Juegos Infantiles', 0.23),
+    ('Servicios básicos (agua/luz)', 0.18), ('Internet/Wifi', 0.13), ('Area de lavandería', 0.12),
+    ('Espacio de co-working', 0.11), ('Línea blanca', 0.06), ('Calefacción', 0.04),
+]
+AMENIDADES = [
+    ('Salón de usos múltiples', 0.27), ('Closets : 1', 0.16), ('Bodega(s)', 0.14), ('Area de eventos', 0.10),
+    ('Estudio', 0.07), ('Sótano', 0.06), ('Cuarto de juegos', 0.05), ('Cuarto de TV', 0.05), ('Patio', 0.04),
+]
+EXTERIORES = [
+    ('Estacionamientos', 0.17), ('Asador', 0.14), ('Balcón(es)', 0.12), ('Jardín Privado', 0.08),
+    ('Cancha de tenis', 0.013),
+]
+CALLES = ['Av. Vallarta', 'Av. Patria', 'Av. López Mateos', 'Calle Hidalgo', 'Calle Morelos', 'Av. Guadalupe',
+          'Calle Juárez', 'Av. Acueducto', 'Calle Pedro Moreno', 'Av. Chapultepec', 'Calle Libertad', 'Av. México']
+ADJETIVOS = ['', 'Amplio ', 'Hermoso ', 'Moderno ', 'Excelente ', 'Nuevo ']
+
+
+def _colonias():
+    """Colonias del Paso 2 (EPSG:4326) con ciudad y nombre."""
+    from esdata.geo.step2_procesamiento_geoespacial import cargar_colonias
+    colonias = cargar_colonias()
+    colonias = colonias[colonias.geometry.notna() & ~colonias.geometry.is_empty].reset_index(drop=True)
+    colonias['NOMCOL1'] = colonias['NOMCOL1'].fillna('Desconocido') if 'NOMCOL1' in colonias else 'Desconocido'
+    return colonias
+
+
+def puntos_en_colonias(colonias, rng, por_colonia: int = PUNTOS_POR_COLONIA) -> np.ndarray:
+    """(n_colonias, por_colonia, 2) puntos lon/lat muestreados por rechazo dentro de cada polígono."""
+    puntos = np.empty((len(colonias), por_colonia, 2))
+    for i, geom in enumerate(colonias.geometry.values):
+        shapely.prepare(geom)
+        minx, miny, maxx, maxy = geom.bounds
+        dentro = np.empty((0, 2))
+        for _ in range(20):
+            cand = rng.uniform((minx, miny), (maxx, maxy), size=(por_colonia * 4, 2))
+            dentro = np.vstack([dentro, cand[shapely.contains_xy(geom, cand[:, 0], cand[:, 1])]])
+            if len(dentro) >= por_colonia:
+                break
+        if len(dentro) < por_colonia:  # polígonos muy delgados: se completa con su punto interior
+            interior = geom.representative_point()
+            dentro = np.vstack([dentro, np.tile([interior.x, interior.y], (por_colonia - len(dentro), 1))])
+        puntos[i] = dentro[:por_colonia]
+    return puntos
+
+
+def _miles(valores) -> pd.Series:
+    return pd.Series(np.asarray(valores, dtype=np.int64)).map('{:,}'.format)
+
+
+def _con_nulos(serie: pd.Series, rng, frac: float) -> pd.Series:
+    return serie.where(rng.random(len(serie)) >= frac)
+
+
+def _lista_terminos(vocab, rng, n: int) -> pd.Series:
+    """Texto 'a; b; c' con cada término presente con su probabilidad (vacío -> NaN).
+    La presencia se codifica como máscara de bits y el texto se arma una vez por combinación."""
+    codigos = np.zeros(n, dtype=np.int64)
+    for i, (_, p) in enumerate(vocab):
+        codigos |= (rng.random(n) < p).astype(np.int64) << i
+    unicos, inversa = np.unique(codigos, return_inverse=True)
+    textos = np.array(['; '.join(t for i, (t, _) in enumerate(vocab) if c >> i & 1) or None for c in unicos],
+                      dtype=object)
+    return pd.Series(textos[inversa])
+
+
+def generar_bloque(n: int, segmento, colonias, puntos, pesos_colonia, factor_colonia, periodo: str,
+                   id_inicio: int, rng) -> pd.DataFrame:
+    """n filas crudas de un segmento (tipo/operación) con los formatos del scraping."""
+    tipo, _, oper, _, area_med, area_sigma, rango_rec = segmento
+    idx_col = rng.choice(len(colonias), size=n, p=pesos_colonia)
+    pts = puntos[idx_col, rng.integers(0, puntos.shape[1], size=n)]
+    lon, lat = pts[:, 0].copy(), pts[:, 1].copy()
+    fuera = rng.random(n) < FRAC_FUERA_COLONIA
+    lat[fuera] += rng.choice([-1, 1], size=fuera.sum()) * rng.uniform(0.5, 1.5, size=fuera.sum())
+    nombres = colonias['NOMCOL1'].to_numpy()[idx_col]
+    ciudades = colonias['__Ciudad_ref'].to_numpy()[idx_col]
+
+    area = np.maximum(np.round(rng.lognormal(np.log(area_med), area_sigma, n)), 15).astype(np.int64)
+    atipica = rng.random(n) < FRAC_AREA_ATIPICA
+    area[atipica] = rng.choice([1, 2, 99_999], size=atipica.sum())
+    pxm2_med, pxm2_sigma = PXM2[oper]
+    precio = area * rng.lognormal(np.log(pxm2_med), pxm2_sigma, n) * factor_colonia[idx_col]
+    precio = np.round(precio, -3 if oper == 'venta' else -2)
+    atipico = rng.random(n) < FRAC_PRECIO_ATIPICO
+    precio[atipico] *= rng.choice([0.001, 100.0], size=atipico.sum())
+    usd = rng.random(n) < FRAC_USD
+    precio = np.where(usd, np.round(precio / TIPO_CAMBIO_USD), np.maximum(precio, 1)).astype(np.int64)
+    moneda = np.where(usd, 'USD ', 'MN ')
+
+    if rango_rec is not None:
+        rec = rng.integers(rango_rec[0], rango_rec[1] + 1, size=n)
+        banos = np.clip(rec - rng.integers(0, 2, size=n), 1, None)
+    else:
+        rec = np.zeros(n, dtype=np.int64)
+        banos = rng.integers(0, 3, size=n)
+    estac = rng.integers(0, 4, size=n)
+    medios = rng.choice([0, 1, 2], size=n, p=[0.72, 0.25, 0.03])
+    antig = rng.integers(1, 50, size=n)
+    dias = rng.integers(2, 365, size=n)
+
+    df = pd.DataFrame(index=range(n))
+    df['id'] = np.arange(id_inicio, id_inicio + n)
+    df['PaginaWeb'] = 'Inm24'
+    df['Ciudad'] = np.nan
+    df['Fecha Scrap'] = f'{periodo[:3].lower()}-{periodo[3:]}'
+    df['tipo_propiedad'] = tipo
+    df['area_m2'] = pd.Series(area).astype(str) + 'm²'
+    df['recamaras'] = pd.Series(rec.astype(float)).where(rec > 0)
+    df['estacionamientos'] = _con_nulos(pd.Series(estac.astype(float)), rng, 0.19)
+    df['operacion'] = oper
+    df['precio'] = oper + pd.Series(moneda) + _miles(precio)
+    df['mantenimiento'] = _con_nulos('Mantenimiento MN ' + _miles(np.round(rng.lognormal(np.log(1800), 0.5, n), -2)),
+                                     rng, 0.75)
+    df['direccion'] = (pd.Series(rng.choice(CALLES, size=n)) + ' ' + pd.Series(rng.integers(10, 4000, size=n)).astype(str)
+                       + ',  ' + pd.Series(nombres) + ', ' + pd.Series(ciudades).map(CIUDAD_NOMBRE))
+    centro = pd.Series(lat).map('{:.15f}'.format) + ',' + pd.Series(lon).map('{:.15f}'.format)
+    df['ubicacion_url'] = _con_nulos('https://maps.google.com/maps/api/staticmap?center=' + centro
+                                     + '&zoom=16&markers=' + centro + '&size=780x456&sensor=true&scale=2',
+                                     rng, FRAC_SIN_URL)
+    oper_titulo = 'Venta' if oper == 'venta' else 'Renta'
+    df['titulo'] = pd.Series(rng.choice(ADJETIVOS, size=n)) + f'{tipo} en {oper_titulo} en ' + pd.Series(nombres)
+    df['descripcion'] = (f'{tipo} en {oper} ubicado en ' + pd.Series(nombres) + '. Cuenta con '
+                         + pd.Series(rec).astype(str) + ' recámaras, ' + pd.Series(banos).astype(str)
+                         + ' baños y ' + pd.Series(area).astype(str) + ' m² de construcción.')
+    df['anunciante'] = 'Inmobiliaria ' + pd.Series(rng.integers(1, 1000, size=n)).astype(str)
+    df['codigo_anunciante'] = pd.Series(rng.integers(100_000, 999_999, size=n)).astype(str) + 'K'
+    df['codigo_inmuebles24'] = 140_000_000 + df['id']
+    tiempo = np.where(rng.random(n) < 0.22, 'Publicado hace más de 1 año',
+                      'Publicado hace ' + pd.Series(dias).astype(str) + ' días')
+    extra = rng.random(n)
+    tiempo = np.where(extra < 0.02, 'Publicado desde ayer', np.where(extra < 0.03, 'Publicado hoy', tiempo))
+    df['tiempo_publicacion'] = tiempo
+    lote = tipo in ('Casa', 'Terreno / Lote')
+    df['area_total'] = _con_nulos(pd.Series(np.round(area * rng.uniform(1.0, 1.4, n)).astype(np.int64)).astype(str)
+                                  + (' m² lote' if lote else ' m² tot.'), rng, 0.15)
+    df['area_cubierta'] = _con_nulos(pd.Series(area).astype(str) + pd.Series(rng.choice([' m² cub.', ' m² constr.'], size=n)),
+                                     rng, 0.02)
+    df['banos_icon'] = pd.Series(banos).astype(str) + np.where(banos == 1, ' baño', ' baños')
+    df['banos_icon'] = df['banos_icon'].where(banos > 0)
+    df['estacionamientos_icon'] = (pd.Series(estac).astype(str) + ' estac.').where(estac > 0)
+    df['recamaras_icon'] = (pd.Series(rec).astype(str) + ' rec.').where(rec > 0)
+    df['medio_banos_icon'] = (pd.Series(medios).astype(str) + np.where(medios == 1, ' medio baño', ' medios baños')).where(medios > 0)
+    u = rng.random(n)
+    df['antiguedad_icon'] = np.where(u < 0.48, 'A estrenar', np.where(u < 0.49, 'En construcción',
+                                     pd.Series(antig).astype(str) + ' años'))
+    df['antiguedad_icon'] = df['antiguedad_icon'].where(u < 0.95)
+    df['Características generales'] = _lista_terminos(CARACTERISTICAS, rng, n)
+    df['Servicios'] = _lista_terminos(SERVICIOS, rng, n)
+    df['Amenidades'] = _lista_terminos(AMENIDADES, rng, n)
+    df['Exteriores'] = _lista_terminos(EXTERIORES, rng, n)
+    df['__ciudad_archivo'] = ciudades
+    return df[COLUMNAS + ['__ciudad_archivo']]
+
+
+def generar_dataset(filas: int, periodo: str, destino: str | None = None, semilla: int = 0,
+                    filas_por_bloque: int = FILAS_POR_BLOQUE) -> list[str]:
+    """Genera `filas` propiedades sintéticas en <destino>/Base_de_Datos/<periodo>/. Devuelve los CSV escritos.
+    Sin destino usa un directorio temporal nuevo; falla si la carpeta de salida ya tiene CSV."""
+    salida = os.path.join(destino or tempfile.mkdtemp(prefix='esdata_sintetico_'), 'Base_de_Datos', periodo)
+    if glob.glob(os.path.join(salida, '*.csv')):
+        raise FileExistsError(f'{salida} ya contiene CSV; usar un --destino vacío para no sobrescribir datos')
+    ensure_dir(salida)
+    rng = np.random.default_rng(semilla)
+    colonias = _colonias()
+    puntos = puntos_en_colonias(colonias, rng)
+    # Pocas colonias concentran muchos anuncios (como en el scraping real)
+    pesos = rng.pareto(1.2, len(colonias)) + 0.05
+    pesos = pesos / pesos.sum()
+    factor = rng.lognormal(0, SIGMA_FACTOR_COLONIA, len(colonias))
+
+    pesos_seg = np.array([s[3] for s in SEGMENTOS])
+    por_segmento = rng.multinomial(filas, pesos_seg / pesos_seg.sum())
+    escritos = set()
+    siguiente_id = 1
+    for segmento, n_seg in zip(SEGMENTOS, por_segmento):
+        for inicio in range(0, n_seg, filas_por_bloque):
+            n = min(filas_por_bloque, n_seg - inicio)
+            bloque = generar_bloque(n, segmento, colonias, puntos, pesos, factor, periodo, siguiente_id, rng)
+            siguiente_id += n
+            for ciudad, parte in bloque.groupby('__ciudad_archivo', sort=False):
+                nombre = f'Inm24_{ciudad}_{OPER_ARCHIVO[segmento[2]]}_{segmento[1]}_{periodo}_01.csv'
+                ruta = os.path.join(salida, nombre)
+                nuevo = ruta not in escritos
+                parte[COLUMNAS].to_csv(ruta, index=False, encoding='utf-8-sig' if nuevo else 'utf-8',
+                                       mode='w' if nuevo else 'a', header=nuevo)
+                escritos.add(ruta)
+        log.info(f'🧪 {segmento[0]} {segmento[2]}: {n_seg:,} filas sintéticas')
+    log.info(f'✅ Dataset sintético: {filas:,} filas en {len(escritos)} archivos ({salida})')
+    return sorted(escritos)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Genera CSV sintéticos estilo Inmuebles24')
+    p.add_argument('--filas', type=int, required=True, help='Número total de propiedades (ej. 10000 a 5000000)')
+    p.add_argument('--periodo', required=True, help='Periodo de salida, ej. Sep25')
+    p.add_argument('--destino', default=None, help='Raíz donde crear Base_de_Datos/<periodo> (por defecto un directorio temporal nuevo)')
+    p.add_argument('--semilla', type=int, default=0)
+    return p.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    generar_dataset(args.filas, args.periodo, args.destino, args.semilla)
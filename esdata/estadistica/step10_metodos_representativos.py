@@ -15,6 +15,7 @@ import pandas as pd
 from esdata.utils.paths import path_results_level, path_resultados_tablas_periodo
 from esdata.utils.io import read_csv, write_csv
 from esdata.utils.logging_setup import get_logger
+from esdata.utils.profiling import perfilar_paso
 
 log = get_logger('step10')
 
@@ -52,6 +53,7 @@ def metodo_para(n: int, skew: float|None, shapiro_p: float|None, coef_var: float
         return 'media_desv', 'n>=30 & normalidad (skew bajo)'
     return 'mediana_IQR', 'condiciones mixtas: preferible robustez'
 
+@perfilar_paso('step10')
 def run(periodo: str):
     base_num = os.path.join(path_results_level(1), f'0.Final_Num_{periodo}.csv')
     if not os.path.exists(base_num):
@@ -6,6 +6,8 @@ Salidas organizadas en:
   N2_Estadisticas/Estudios/<Periodo>/
       F1_Descriptivo_<Periodo>.csv (detalle completo)
       F1_Outliers_<Periodo>.csv (límites y conteos)
+      F1_Outliers_Grupos_<Periodo>.csv (límites IQR/MAD por Ciudad, operacion, tipo_propiedad)
+      F1_Outliers_Flags_<Periodo>.csv (banderas de outlier por fila según su grupo)
       F1_Normalidad_<Periodo>.csv (skew, kurtosis, shapiro)
   N2_Estadisticas/Resultados/<Periodo>/
       F1_Parametricos_<Periodo>.csv (coef. variación, IQR, rango, sugerencia método preliminar)
@@ -40,6 +42,7 @@ from esdata.utils.paths import (
 )
 from esdata.utils.io import read_csv, write_csv
 from esdata.utils.logging_setup import get_logger
+from esdata.utils.profiling import perfilar, perfilar_paso
 
 log = get_logger('step7')
 
@@ -47,6 +50,11 @@ TARGET_VARS = ['precio','area_m2','PxM2']
 
 PERCENTILES_EXT = [0.01,0.05,0.10,0.25,0.50,0.75,0.90,0.95,0.99]
 
+# Outliers por grupo: evita mezclar p.ej. Casas en Zapopan con Departamentos en Guadalajara
+GROUP_KEYS = ['Ciudad','operacion','tipo_propiedad']
+MIN_GROUP_N = 4
+MAD_Z_THRESHOLD = 3.5
+
 def _ensure_pxm2(df: pd.DataFrame) -> pd.DataFrame:
     if 'PxM2' not in df.columns and {'precio','area_m2'} <= set(df.columns):
         mask = df['area_m2'].notna() & (df['area_m2']>0) & df['precio'].notna()
@@ -55,6 +63,7 @@ def _ensure_pxm2(df: pd.DataFrame) -> pd.DataFrame:
         df.loc[mask,'PxM2'] = df.loc[mask,'precio']/df.loc[mask,'area_m2']
     return df
 
+@perfilar
 def _describe(df: pd.DataFrame, var: str) -> pd.DataFrame:
     serie = df[var].dropna().astype(float)
     if serie.empty:
@@ -86,6 +95,7 @@ def _describe(df: pd.DataFrame, var: str) -> pd.DataFrame:
     stats['kurtosis'] = pd.to_numeric(pd.Series([serie.kurt()]), errors='coerce').iloc[0]
     return pd.DataFrame([stats])
 
+@perfilar
 def _outliers_iqr(df: pd.DataFrame, var: str) -> pd.DataFrame:
     s = df[var].dropna().astype(float)
     if len(s)<4:
@@ -107,6 +117,55 @@ def _outliers_iqr(df: pd.DataFrame, var: str) -> pd.DataFrame:
         'ratio': len(outliers)/len(s) if len(s)>0 else 0
     }])
 
+@perfilar
+def _outliers_grouped(df: pd.DataFrame, vars_present: list[str]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Outliers IQR y MAD (z modificado) con límites calculados por grupo GROUP_KEYS.
+
+    Los grupos se codifican una sola vez; por variable se hace un único groupby-quantile
+    (q1, mediana, q3) y una mediana de desviaciones absolutas, y los límites se difunden
+    a cada fila por código de grupo. Grupos con menos de MIN_GROUP_N valores no marcan outliers.
+    Devuelve (banderas por fila, límites por grupo y variable).
+    """
+    keys = [k for k in GROUP_KEYS if k in df.columns]
+    if not keys or not vars_present or df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    codes = df.groupby(keys, dropna=False, sort=False).ngroup().to_numpy()
+    group_keys = df[keys].drop_duplicates().reset_index(drop=True)
+    flags = df[[c for c in ['id'] + keys if c in df.columns]].copy()
+    bounds_frames = []
+    for v in vars_present:
+        s = pd.to_numeric(df[v], errors='coerce')
+        quart = s.groupby(codes).quantile([0.25, 0.50, 0.75]).unstack().reindex(range(len(group_keys)))
+        n = s.groupby(codes).count().reindex(range(len(group_keys)), fill_value=0).to_numpy()
+        q1, med, q3 = (quart[q].to_numpy() for q in (0.25, 0.50, 0.75))
+        mad = (s - med[codes]).abs().groupby(codes).median().reindex(range(len(group_keys))).to_numpy()
+        valid = n >= MIN_GROUP_N
+        iqr = q3 - q1
+        lower = np.where(valid, q1 - 1.5*iqr, np.nan)
+        upper = np.where(valid, q3 + 1.5*iqr, np.nan)
+        vals = s.to_numpy(dtype=float)
+        out_iqr = (vals < lower[codes]) | (vals > upper[codes])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mz = 0.6745*np.abs(vals - med[codes])/mad[codes]
+        out_mad = valid[codes] & (mad[codes] > 0) & (mz > MAD_Z_THRESHOLD)
+        flags[f'{v}_outlier_iqr'] = out_iqr
+        flags[f'{v}_outlier_mad'] = out_mad
+        n_iqr = np.bincount(codes, weights=out_iqr, minlength=len(group_keys))
+        n_mad = np.bincount(codes, weights=out_mad, minlength=len(group_keys))
+        b = group_keys.copy()
+        b.insert(len(keys), 'variable', v)
+        b['n'] = n
+        b['q1'] = q1; b['median'] = med; b['q3'] = q3; b['iqr'] = iqr
+        b['lower'] = lower; b['upper'] = upper; b['mad'] = mad
+        b['outliers_iqr'] = n_iqr.astype(int)
+        b['outliers_mad'] = n_mad.astype(int)
+        b['ratio_iqr'] = np.where(n>0, n_iqr/np.maximum(n,1), 0)
+        b['ratio_mad'] = np.where(n>0, n_mad/np.maximum(n,1), 0)
+        bounds_frames.append(b)
+    bounds = pd.concat(bounds_frames, ignore_index=True)
+    return flags, bounds
+
+@perfilar
 def _normality(df: pd.DataFrame, var: str) -> pd.DataFrame:
     from scipy.stats import shapiro
     s = df[var].dropna().astype(float)
@@ -139,6 +198,7 @@ def _suggest_method(row: pd.Series) -> str:
         return 'media_desv' if n>=30 else 'mediana_IQR'
     return 'mediana_IQR'
 
+@perfilar_paso('step7')
 def run(periodo: str):
     num_path = os.path.join(path_results_level(1), f'0.Final_Num_{periodo}.csv')
     if not os.path.exists(num_path):
@@ -159,6 +219,7 @@ def run(periodo: str):
     descriptivo = pd.concat(desc_frames, ignore_index=True) if desc_frames else pd.DataFrame()
     outliers = pd.concat(out_frames, ignore_index=True) if out_frames else pd.DataFrame()
     normalidad = pd.concat(norm_frames, ignore_index=True) if norm_frames else pd.DataFrame()
+    outlier_flags, outliers_grupos = _outliers_grouped(df, vars_present)
 
     # Sugerencia método preliminar (por variable global, sirve como referencia general)
     if not descriptivo.empty:
@@ -167,6 +228,8 @@ def run(periodo: str):
     # Guardar Estudios (detalle completo)
     write_csv(descriptivo, os.path.join(estudios_dir, f'F1_Descriptivo_{periodo}.csv'))
     write_csv(outliers, os.path.join(estudios_dir, f'F1_Outliers_{periodo}.csv'))
+    write_csv(outliers_grupos, os.path.join(estudios_dir, f'F1_Outliers_Grupos_{periodo}.csv'))
+    write_csv(outlier_flags, os.path.join(estudios_dir, f'F1_Outliers_Flags_{periodo}.csv'))
     write_csv(normalidad, os.path.join(estudios_dir, f'F1_Normalidad_{periodo}.csv'))
 
     # Resultados (parámetros clave por variable)
@@ -205,6 +268,7 @@ def run(periodo: str):
     return {
         'descriptivo': descriptivo.shape,
         'outliers': outliers.shape,
+        'outliers_grupos': outliers_grupos.shape,
         'normalidad': normalidad.shape,
         'resultados': resultados.shape
     }
@@ -17,7 +17,7 @@ Uso CLI:
 Si no se proporciona <Periodo>, se usa el periodo actual (mes abreviado + año, ej. Sep25).
 """
 from __future__ import annotations
-import os, re, json, glob
+import os, re, glob
 import pandas as pd
 from esdata.utils.paths import (
     path_results_level, path_resultados_tablas_periodo, path_esperando,
@@ -25,6 +25,8 @@ from esdata.utils.paths import (
 )
 from esdata.utils.io import read_csv, write_csv
 from esdata.utils.logging_setup import get_logger
+from esdata.utils.profiling import perfilar, perfilar_paso
+from esdata.geo.catalogo_colonias import cargar_catalogo
 
 log = get_logger('step8')
 
@@ -55,6 +57,7 @@ def decision_method(n: int, skew: float|None) -> str:
         return 'media_desv'
     return 'mediana_IQR'
 
+@perfilar
 def resumen_inicial(df: pd.DataFrame, periodo: str, ciudad: str, oper: str, tipo: str) -> pd.DataFrame:
     grp = df.groupby('Colonia')
     rows = []
@@ -77,6 +80,7 @@ def resumen_inicial(df: pd.DataFrame, periodo: str, ciudad: str, oper: str, tipo
         rows.append(row)
     return pd.DataFrame(rows)
 
+@perfilar
 def resumen_final(df: pd.DataFrame, periodo: str, ciudad: str, oper: str, tipo: str, esperando_dir: str) -> pd.DataFrame:
     grp = df.groupby('Colonia')
     final_rows = []
@@ -117,45 +121,15 @@ def resumen_final(df: pd.DataFrame, periodo: str, ciudad: str, oper: str, tipo:
         write_csv(esperar_df, esperar_path)
     return pd.DataFrame(final_rows)
 
+@perfilar
 def cargar_todas_las_colonias():
-    """Cargar todas las colonias de los archivos GeoJSON"""
-    import glob
-    import json
-    
-    colonias_path = "N1_Tratamiento/Geolocalizacion/Colonias/"
-    geojson_files = glob.glob(os.path.join(colonias_path, "*.geojson"))
-    
-    todas_colonias = []
-    for geojson_file in geojson_files:
-        log.info(f'📍 Cargando colonias de: {os.path.basename(geojson_file)}')
-        
-        with open(geojson_file, 'r', encoding='utf-8') as f:
-            geojson_data = json.load(f)
-        
-        # Extraer el nombre de la ciudad del archivo
-        filename = os.path.basename(geojson_file)
-        if 'Guadalajara' in filename:
-            ciudad = 'Gdl'
-        elif 'Zapopan' in filename:
-            ciudad = 'Zap'
-        else:
-            ciudad = 'Desconocido'
-        
-        # Extraer todas las colonias
-        for feature in geojson_data['features']:
-            properties = feature.get('properties', {})
-            colonia_name = properties.get('NOMCOL1', 'Desconocido')
-            
-            todas_colonias.append({
-                'Ciudad': ciudad,
-                'Colonia': colonia_name
-            })
-    
-    colonias_df = pd.DataFrame(todas_colonias).drop_duplicates()
+    """Cargar todas las colonias (Ciudad, Colonia) desde el catálogo compilado de los GeoJSON"""
+    colonias_df = cargar_catalogo()[['Ciudad', 'Colonia']].drop_duplicates()
     log.info(f'📋 Total colonias únicas cargadas: {len(colonias_df)}')
     
     return colonias_df
 
+@perfilar
 def generar_resumen_transversal(df: pd.DataFrame, periodo: str):
     """Generar CSV de resumen transversal con colonias como filas y combinaciones como columnas"""
     log.info('📊 Generando resumen transversal de colonias...')
@@ -257,16 +231,14 @@ def generar_resumen_transversal(df: pd.DataFrame, periodo: str):
     
     return resumen_path
 
+@perfilar
 def generar_tablero_maestro_colonias(df: pd.DataFrame, periodo: str):
     """Generar tablero maestro con TODAS las colonias del GeoJSON (tengan datos o no)"""
     log.info('🗺️ Generando tablero maestro con TODAS las colonias...')
     
-    # Importar función para cargar colonias
-    from esdata.geo.step2_procesamiento_geoespacial import cargar_colonias
-    
-    # Cargar todas las colonias del GeoJSON
-    colonias_gdf = cargar_colonias()
-    log.info(f'📍 Colonias del GeoJSON cargadas: {len(colonias_gdf):,}')
+    # Cargar todas las colonias del catálogo compilado (sin volver a parsear GeoJSON)
+    catalogo = cargar_catalogo()
+    log.info(f'📍 Colonias del catálogo cargadas: {len(catalogo):,}')
     
     # Obtener todas las combinaciones únicas de operación y tipo de propiedad de los datos
     operaciones = df['operacion'].unique()
@@ -276,17 +248,7 @@ def generar_tablero_maestro_colonias(df: pd.DataFrame, periodo: str):
     log.info(f'🏠 Tipos de propiedad encontrados: {list(tipos_propiedad)}')
     
     # Crear base de datos con todas las colonias y sus ciudades
-    colonias_base = []
-    for _, colonia_row in colonias_gdf.iterrows():
-        colonia_name = colonia_row.get('NOMCOL1', 'Desconocido')
-        ciudad_name = colonia_row.get('__Ciudad_ref', 'Desconocido')  # Asumiendo que tienes este campo
-        
-        colonias_base.append({
-            'Ciudad': ciudad_name,
-            'Colonia': colonia_name
-        })
-    
-    colonias_df = pd.DataFrame(colonias_base).drop_duplicates()
+    colonias_df = catalogo[['Ciudad', 'Colonia']].drop_duplicates()
     log.info(f'📋 Colonias únicas procesadas: {len(colonias_df)}')
     
     # Crear combinaciones completas: Todas las colonias x Todas las operaciones x Todos los tipos
@@ -379,6 +341,7 @@ def generar_tablero_maestro_colonias(df: pd.DataFrame, periodo: str):
     
     return tablero_path
 
+@perfilar
 def generar_final_puntos(df: pd.DataFrame, periodo: str):
     """Generar archivo Final_Puntos con TODAS las propiedades (sin filtros de colonia)"""
     # Variables específicas requeridas para puntos
@@ -407,6 +370,7 @@ def generar_final_puntos(df: pd.DataFrame, periodo: str):
     
     return puntos_path
 
+@perfilar
 def generar_resumen_consolidado(df: pd.DataFrame, periodo: str):
     """Generar archivo consolidado con TODAS las colonias y combinaciones"""
     log.info('📋 Generando resumen consolidado de todas las colonias...')
@@ -620,6 +584,7 @@ def generar_resumen_transversal_completo(periodo: str):
     
     return resumen_transversal_path
 
+@perfilar_paso('step8')
 def run(periodo: str):
     log.info('=' * 80)
     log.info('📊 INICIANDO STEP 8: RESUMEN POR COLONIAS Y GENERACIÓN DE PUNTOS')
@@ -1,26 +1,24 @@
 """Paso 9: Separar por Colonias
-Genera un CSV por colonia para cada combinación Ciudad-Operacion-Tipo, sólo si tiene >=5 propiedades.
-Ruta: N1_Tratamiento/Consolidados/Colonias/<Ciudad>/<Venta|Renta>/<Tipo>/<Periodo>/
-Nombre: Ciudad_Oper_Tipo_Periodo_ColXXXX.csv (Colonia abreviada a 7 chars)
-Colonias con <5 propiedades se exportan a Esperando.
+Genera un dataset particionado estilo Hive por Ciudad-Operacion-Tipo-Colonia, sólo para colonias con >=5 propiedades.
+Ruta: N1_Tratamiento/Consolidados/Colonias/<Periodo>/Ciudad=<..>/Operacion=<..>/Tipo=<..>/Colonia=<..>/part-0.parquet
+(o .csv con --formato csv). Índice de particiones: _indice_particiones.csv en la raíz del dataset.
+Cada corrida reemplaza el dataset completo del periodo (sin particiones de corridas anteriores).
+Colonias con <5 propiedades se exportan a Esperando (un archivo acumulado por combinación).
 """
 from __future__ import annotations
-import os, re, unicodedata
+import os, re, argparse, unicodedata
 import pandas as pd
 from esdata.utils.paths import (
-    path_results_level, path_colonias_branch, path_esperando
+    path_results_level, path_colonias_dataset, path_esperando
 )
-from esdata.utils.io import read_csv, write_csv
+from esdata.utils.io import read_csv, write_csv, write_partitioned
 from esdata.utils.logging_setup import get_logger
+from esdata.utils.profiling import perfilar_paso
 
 log = get_logger('step9')
 
-def _slugify_colonia(nombre: str) -> str:
-    if not isinstance(nombre,str):
-        return 'COL'
-    s = unicodedata.normalize('NFKD', nombre).encode('ascii','ignore').decode('ascii')
-    s = re.sub(r'[^A-Za-z0-9]+','',s)
-    return (s[:7] or 'COL').upper()
+MIN_PROPIEDADES = 5
+PARTICIONES = {'Ciudad': 'Ciudad', 'Operacion': 'operacion', 'Tipo': 'tipo_propiedad', 'Colonia': 'Colonia'}
 
 def _sanitize_token(token: str) -> str:
     if not isinstance(token, str):
@@ -34,7 +32,8 @@ def _sanitize_token(token: str) -> str:
     s = re.sub(r'_+','_', s).strip('_')
     return s or 'NA'
 
-def run(periodo: str):
+@perfilar_paso('step9')
+def run(periodo: str, formato: str = 'parquet', max_workers: int = 8):
     base_num = os.path.join(path_results_level(1), f'0.Final_Num_{periodo}.csv')
     if not os.path.exists(base_num):
         raise FileNotFoundError(base_num)
@@ -44,29 +43,38 @@ def run(periodo: str):
     if miss:
         raise ValueError(f'Faltan columnas: {miss}')
     esperando_dir = path_esperando(periodo)
-    combos = df[['Ciudad','operacion','tipo_propiedad']].drop_duplicates()
-    for _, combo in combos.iterrows():
-        ciudad = combo['Ciudad']; oper = combo['operacion']; tipo = combo['tipo_propiedad']
+    # Tamaño de cada colonia dentro de su combinación (filas sin Colonia quedan fuera, NaN)
+    tamano = df.groupby(['Ciudad','operacion','tipo_propiedad','Colonia'])['id'].transform('size')
+    validas = df[tamano >= MIN_PROPIEDADES]
+    pequenas = df[tamano < MIN_PROPIEDADES]
+
+    # Colonias válidas: un solo dataset particionado (orden único + escritura en paralelo)
+    dataset_dir = path_colonias_dataset(periodo)
+    indice = write_partitioned(validas, dataset_dir, list(PARTICIONES.values()), names=list(PARTICIONES.keys()),
+                               fmt=formato, max_workers=max_workers)
+    write_csv(indice, os.path.join(dataset_dir, '_indice_particiones.csv'))
+
+    # Colonias pequeñas: un archivo Esperando acumulado por combinación (tokens seguros)
+    for (ciudad, oper, tipo), sub in pequenas.groupby(['Ciudad','operacion','tipo_propiedad']):
         ciudad_tok = _sanitize_token(ciudad)
         oper_tok = _sanitize_token(oper)
         tipo_tok = _sanitize_token(tipo)
         if ciudad_tok != ciudad or oper_tok != oper or tipo_tok != tipo:
             log.warning(f'Step9: tokens normalizados -> ciudad:"{ciudad}"=>"{ciudad_tok}" oper:"{oper}"=>"{oper_tok}" tipo:"{tipo}"=>"{tipo_tok}"')
-        sub_combo = df[(df['Ciudad']==ciudad)&(df['operacion']==oper)&(df['tipo_propiedad']==tipo)]
-        for colonia, sub_col in sub_combo.groupby('Colonia'):
-            if len(sub_col) < 5:
-                # Append to esperando (uno por combo acumulativo) usando tokens seguros
-                write_csv(sub_col, os.path.join(esperando_dir, f'esperando_{ciudad_tok}_{oper_tok}_{tipo_tok}_{periodo}.csv'))
-                continue
-            abre = _slugify_colonia(colonia)
-            # Usar tokens sanitizados para la ruta de carpetas (evita crear directorios inválidos)
-            out_dir = path_colonias_branch(periodo, ciudad_tok, oper_tok, tipo_tok)
-            out_name = f'{ciudad_tok}_{oper_tok}_{tipo_tok}_{periodo}_{abre}.csv'
-            write_csv(sub_col, os.path.join(out_dir, out_name))
-        log.info(f'Colonias separadas {ciudad_tok}-{oper_tok}-{tipo_tok}')
+        write_csv(sub, os.path.join(esperando_dir, f'esperando_{ciudad_tok}_{oper_tok}_{tipo_tok}_{periodo}.csv'))
+    log.info(f'Colonias separadas: {len(indice)} particiones ({len(validas)} filas), {len(pequenas)} filas a Esperando')
     log.info('Paso 9 completado')
+    return {'particiones': len(indice), 'filas_particionadas': len(validas), 'filas_esperando': len(pequenas)}
 
 if __name__=='__main__':
-    from datetime import datetime
-    per = datetime.now().strftime('%b%y')
-    run(per)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Paso 9 Separar Colonias')
+    parser.add_argument('periodo', nargs='?', help='Periodo (ej: Sep25)', default=None)
+    parser.add_argument('--formato', choices=['parquet','csv'], default='parquet')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+    if args.periodo:
+        per = args.periodo
+    else:
+        from datetime import datetime
+        per = datetime.now().strftime('%b%y')
+    run(per, formato=args.formato, max_workers=args.workers)
@@ -0,0 +1,86 @@
+"""Catálogo compilado de colonias.
+Se construye una sola vez desde los GeoJSON de colonias (Paso 2) y se guarda como
+N1_Tratamiento/Geolocalizacion/Colonias/catalogo_colonias.csv con:
+  colonia_id (GEOCOL), ID, Ciudad, Colonia (NOMCOL1), Municipio, CP,
+  centroide_lon/lat, bbox_min_lon/min_lat/max_lon/max_lat (WGS84), area_poligono_m2.
+Cualquier paso que solo necesite la lista de colonias (p.ej. Paso 8) lo lee sin
+parsear GeoJSON ni requerir geopandas. Se reconstruye si algún GeoJSON es más reciente.
+"""
+from __future__ import annotations
+import os
+import pandas as pd
+from esdata.utils.paths import path_base, path_geoloc
+from esdata.utils.io import read_csv, write_csv
+from esdata.utils.logging_setup import get_logger
+
+log = get_logger('catalogo_colonias')
+
+COLONIAS_FILES = {
+    'Gdl': 'N1_Tratamiento/Geolocalizacion/Colonias/colonias-Guadalajara.geojson',
+    'Zap': 'N1_Tratamiento/Geolocalizacion/Colonias/colonias-Zapopan.geojson'
+}
+
+# CRS métrico de la zona (UTM 13N, el mismo de los GeoJSON fuente) para áreas y centroides
+CRS_METRICO = 32613
+
+CATALOGO_COLS = ['colonia_id','ID','Ciudad','Colonia','Municipio','CP',
+                 'centroide_lon','centroide_lat','bbox_min_lon','bbox_min_lat','bbox_max_lon','bbox_max_lat',
+                 'area_poligono_m2']
+
+def path_catalogo() -> str:
+    return os.path.join(path_geoloc(), 'Colonias', 'catalogo_colonias.csv')
+
+def _catalogo_vigente(path: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    mtime = os.path.getmtime(path)
+    fuentes = [path_base(f) for f in COLONIAS_FILES.values()]
+    return all(os.path.getmtime(f) <= mtime for f in fuentes if os.path.exists(f))
+
+def construir_catalogo(colonias_gdf=None) -> pd.DataFrame:
+    """Compila el catálogo desde un GeoDataFrame de colonias (EPSG:4326, con __Ciudad_ref).
+    Si no se proporciona, se carga con step2.cargar_colonias().
+    """
+    if colonias_gdf is None:
+        from esdata.geo.step2_procesamiento_geoespacial import cargar_colonias
+        colonias_gdf = cargar_colonias()
+    metrico = colonias_gdf.to_crs(CRS_METRICO)
+    centroides = metrico.geometry.centroid.to_crs(4326)
+    bounds = colonias_gdf.geometry.bounds
+    props = lambda col, default=None: colonias_gdf[col] if col in colonias_gdf.columns else default
+    catalogo = pd.DataFrame({
+        'colonia_id': props('GEOCOL'),
+        'ID': props('ID'),
+        'Ciudad': props('__Ciudad_ref', 'Desconocido'),
+        'Colonia': props('NOMCOL1', 'Desconocido'),
+        'Municipio': props('MUNICIPIO'),
+        'CP': props('CP'),
+        'centroide_lon': centroides.x.values,
+        'centroide_lat': centroides.y.values,
+        'bbox_min_lon': bounds['minx'].values,
+        'bbox_min_lat': bounds['miny'].values,
+        'bbox_max_lon': bounds['maxx'].values,
+        'bbox_max_lat': bounds['maxy'].values,
+        'area_poligono_m2': metrico.geometry.area.values
+    }, index=colonias_gdf.index)
+    catalogo['Colonia'] = catalogo['Colonia'].fillna('Desconocido')
+    return catalogo[CATALOGO_COLS].reset_index(drop=True)
+
+def actualizar_catalogo(colonias_gdf=None, force: bool = False) -> str:
+    """Reescribe el catálogo si falta, está desactualizado o force=True. Devuelve su ruta."""
+    path = path_catalogo()
+    if force or not _catalogo_vigente(path):
+        catalogo = construir_catalogo(colonias_gdf)
+        write_csv(catalogo, path)
+        log.info(f'🗂️ Catálogo de colonias compilado: {len(catalogo):,} colonias')
+    return path
+
+def cargar_catalogo() -> pd.DataFrame:
+    """Lee el catálogo compilado (lo construye desde los GeoJSON solo si falta o está desactualizado)."""
+    path = actualizar_catalogo()
+    catalogo = read_csv(path)
+    catalogo['colonia_id'] = catalogo['colonia_id'].astype(str).str.zfill(6)
+    return catalogo
+
+if __name__ == '__main__':
+    actualizar_catalogo(force=True)
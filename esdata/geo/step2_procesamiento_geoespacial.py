@@ -4,6 +4,7 @@
 - Propiedades sin colonia -> Datos_Filtrados/Eliminados/<Periodo>/sin_colonia_<Periodo>.csv
 - Propiedades con lat/lng "Desconocido" -> Datos_Filtrados/Eliminados/<Periodo>/coordenadas_desconocido_<Periodo>.csv
 - Salida: 2.Consolidado_ConColonia_<Periodo>.csv
+- Actualiza el catálogo compilado de colonias (esdata.geo.catalogo_colonias) si los GeoJSON cambiaron
 """
 from __future__ import annotations
 import os
@@ -13,14 +14,12 @@ from shapely.geometry import Point
 from esdata.utils.paths import path_consolidados, ensure_dir, path_base
 from esdata.utils.io import read_csv, write_csv
 from esdata.utils.logging_setup import get_logger
+from esdata.utils.profiling import perfilar, perfilar_paso
+from esdata.geo.catalogo_colonias import COLONIAS_FILES, actualizar_catalogo
 
 log = get_logger('step2')
 
-COLONIAS_FILES = {
-    'Gdl': 'N1_Tratamiento/Geolocalizacion/Colonias/colonias-Guadalajara.geojson',
-    'Zap': 'N1_Tratamiento/Geolocalizacion/Colonias/colonias-Zapopan.geojson'
-}
-
+@perfilar
 def cargar_colonias():
     frames = []
     crs_ref = None
@@ -49,6 +48,7 @@ def cargar_colonias():
         colonias = colonias.to_crs(4326)
     return colonias
 
+@perfilar
 def completar_id_con_ubicacion(df: pd.DataFrame):
     """Completa el ID agregando Ciudad y Colonia al inicio"""
     
@@ -93,6 +93,7 @@ def completar_id_con_ubicacion(df: pd.DataFrame):
     
     return df
 
+@perfilar
 def geocodificar(df: pd.DataFrame, colonias_gdf: gpd.GeoDataFrame):
     # Identificar coordenadas "Desconocido" (como string)
     coord_desconocido_mask = ((df['longitud'].astype(str).str.lower() == 'desconocido') | 
@@ -117,6 +118,7 @@ def geocodificar(df: pd.DataFrame, colonias_gdf: gpd.GeoDataFrame):
     
     return df, coord_desconocido_mask
 
+@perfilar_paso('step2')
 def run(periodo):
     log.info('=' * 80)
     log.info('🌍 INICIANDO STEP 2: PROCESAMIENTO GEOESPACIAL')
@@ -139,6 +141,8 @@ def run(periodo):
     log.info('🗺️ Cargando datos de colonias...')
     colonias = cargar_colonias()
     log.info(f'✅ Colonias cargadas: {len(colonias):,} polígonos')
+    # Reutilizar los polígonos ya cargados para compilar el catálogo compartido (Paso 8, etc.)
+    actualizar_catalogo(colonias)
     
     # Procesar geocodificación
     log.info('🔄 Iniciando proceso de geocodificación...')
@@ -0,0 +1,115 @@
+"""Ejecuta los Pasos 1–10 de un periodo registrando cada paso en el manifiesto de corrida
+(esdata.utils.manifest: N5_Resultados/Manifiestos/manifiesto_<Periodo>.json).
+
+Con --reanudar, cada paso se omite si está al día (terminó bien con los mismos parámetros y el mismo
+código: módulo y módulos esdata.* que importa; sus entradas tienen el mismo hash y sus salidas
+siguen intactas) y se ejecuta desde el primero cuyas entradas cambiaron o que falló. Tras reejecutar
+un paso, los siguientes se vuelven a evaluar con las salidas nuevas, así que solo corre lo que de
+verdad cambió. Un commit nuevo por sí solo (p.ej. de documentación) no invalida pasos.
+
+Uso:
+    python -m esdata.pipeline.run_pipeline Sep25                 # pasos 1-10, registra el manifiesto
+    python -m esdata.pipeline.run_pipeline Sep25 --reanudar      # omite pasos al día
+    python -m esdata.pipeline.run_pipeline Sep25 --plan          # solo muestra qué se reejecutaría
+    python -m esdata.pipeline.run_pipeline Sep25 --desde 8 --hasta 10
+"""
+from __future__ import annotations
+import sys
+import argparse
+import importlib
+from esdata.utils.paths import periodo_actual
+from esdata.utils.logging_setup import get_logger
+from esdata.utils.manifest import cargar_manifiesto, ejecutar_paso, motivo_reejecucion, path_manifiesto
+
+log = get_logger('pipeline')
+
+PASOS = {
+    1: 'esdata.pipeline.step1_consolidar_adecuar',
+    2: 'esdata.geo.step2_procesamiento_geoespacial',
+    3: 'esdata.pipeline.step3_versiones_especiales',
+    4: 'esdata.text.step4_analisis_variables_texto',
+    5: 'esdata.pipeline.step5_analisis_logico_corroboracion',
+    6: 'esdata.pipeline.step6_remover_duplicados',
+    7: 'esdata.estadistica.step7_estadisticas_variables',
+    8: 'esdata.estadistica.step8_resumen_colonias',
+    9: 'esdata.estadistica.step9_separar_colonias',
+    10: 'esdata.estadistica.step10_metodos_representativos',
+}
+
+# Entradas que los pasos leen sin esdata.utils.io (o carpetas donde un archivo nuevo debe invalidar el paso).
+# Patrones glob relativos a BASE_DIR; {periodo} y {previo} se sustituyen.
+ENTRADAS_EXTRA = {
+    1: ['Base_de_Datos/{periodo}/*.csv', 'Datos_Filtrados/Esperando/{previo}/*.csv',
+        'docs/Lista de Varibales Orquestacion.csv'],
+    2: ['N1_Tratamiento/Geolocalizacion/Colonias/colonias-*.geojson'],
+    10: ['N2_Estadisticas/Reportes/{periodo}/F1_Descriptivo_Rep_{periodo}.csv',
+         'N2_Estadisticas/Reportes/{periodo}/F1_Normalidad_Rep_{periodo}.csv'],
+}
+
+
+def correr(periodo: str, desde: int = 1, hasta: int = 10, reanudar: bool = False) -> list[dict]:
+    """Ejecuta los pasos [desde, hasta]. Devuelve un resumen por paso (ejecutado / omitido y motivo)."""
+    resumen = []
+    for paso in range(desde, hasta + 1):
+        modulo = importlib.import_module(PASOS[paso])
+        extra = ENTRADAS_EXTRA.get(paso, [])
+        if reanudar:
+            registro = cargar_manifiesto(periodo)['pasos'].get(str(paso))
+            motivo = motivo_reejecucion(registro, modulo, periodo, entradas_extra=extra)
+            if motivo is None:
+                log.info(f'⏭️ Paso {paso} al día, se omite')
+                resumen.append({'paso': paso, 'accion': 'omitido', 'motivo': 'al día'})
+                continue
+            log.info(f'🔁 Paso {paso}: se reejecuta ({motivo})')
+        else:
+            motivo = 'ejecución completa'
+        log.info(f'🚀 Paso {paso}: {PASOS[paso]}')
+        try:
+            registro = ejecutar_paso(paso, modulo, periodo, entradas_extra=extra)
+        except Exception:
+            log.error(f'❌ Paso {paso} falló; corregir y reanudar con --reanudar (manifiesto: {path_manifiesto(periodo)})')
+            resumen.append({'paso': paso, 'accion': 'error', 'motivo': motivo})
+            raise
+        log.info(f"✅ Paso {paso} terminado en {registro['duracion_s']:.1f}s")
+        resumen.append({'paso': paso, 'accion': 'ejecutado', 'motivo': motivo})
+    return resumen
+
+
+def plan(periodo: str, desde: int = 1, hasta: int = 10) -> list[dict]:
+    """Motivo de reejecución de cada paso contra el estado actual de los archivos (no ejecuta nada).
+    Los pasos posteriores al primero pendiente pueden quedar al día si la reejecución produce lo mismo."""
+    pasos = cargar_manifiesto(periodo)['pasos']
+    filas = []
+    for paso in range(desde, hasta + 1):
+        modulo = importlib.import_module(PASOS[paso])
+        motivo = motivo_reejecucion(pasos.get(str(paso)), modulo, periodo,
+                                    entradas_extra=ENTRADAS_EXTRA.get(paso, []))
+        filas.append({'paso': paso, 'accion': 'omitir' if motivo is None else 'reejecutar', 'motivo': motivo or 'al día'})
+    return filas
+
+
+def _paso(texto: str) -> int:
+    paso = int(texto)
+    if paso not in PASOS:
+        raise argparse.ArgumentTypeError(f'Paso inexistente: {paso}')
+    return paso
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Ejecuta el pipeline de un periodo con manifiesto y reanudación')
+    p.add_argument('periodo', nargs='?', default=None, help='Periodo (ej. Sep25); por defecto el mes actual')
+    p.add_argument('--desde', type=_paso, default=min(PASOS))
+    p.add_argument('--hasta', type=_paso, default=max(PASOS))
+    p.add_argument('--reanudar', action='store_true', help='Omitir pasos al día según el manifiesto')
+    p.add_argument('--plan', action='store_true', help='Solo mostrar qué pasos se reejecutarían y por qué')
+    return p.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    per = args.periodo or periodo_actual()
+    if args.plan:
+        for fila in plan(per, args.desde, args.hasta):
+            print(f"Paso {fila['paso']:>2}: {fila['accion']:<10} {fila['motivo']}")
+        sys.exit(0)
+    correr(per, args.desde, args.hasta, args.reanudar)
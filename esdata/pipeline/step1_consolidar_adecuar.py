@@ -15,6 +15,7 @@ from esdata.utils.paths import path_input_base, ensure_dir, path_consolidados, o
 from esdata.utils.paths import path_esperando as _path_esperando  # para no crear si no existe manualmente
 from esdata.utils.io import read_csv, write_csv
 from esdata.utils.logging_setup import get_logger
+from esdata.utils.profiling import perfilar, perfilar_paso
 
 log = get_logger('step1')
 
@@ -389,6 +390,7 @@ def _build_id(row):
     # Construir ID parcial: tipo-precio-area_rec-banos-estac_anunc-lng-lat
     return f"{tipo}-{precio}-{area}_{recamaras}-{banos}-{estacionamientos}_{anunciante}-{longitud}-{latitud}"
 
+@perfilar
 def cargar_csvs_fuente(periodo: str, include_waiting_prev: bool=True) -> pd.DataFrame:
     """Carga únicamente los CSV del periodo actual y opcionalmente los 'esperando' del periodo previo.
     Requisitos nuevos multi-periodo: evitar mezclar históricos para no inflar n_propiedades.
@@ -485,6 +487,7 @@ def _fill_desconocido(df: pd.DataFrame):
             df[col] = df[col].apply(lambda x: 'Desconocido' if (pd.isna(x) or str(x).strip()=='' ) else str(x).strip())
     return df
 
+@perfilar
 def normalizar(df: pd.DataFrame) -> pd.DataFrame:
     # Eliminar columnas basura Unnamed
     drop_cols=[c for c in df.columns if c.startswith('Unnamed')]
@@ -725,6 +728,7 @@ def normalizar(df: pd.DataFrame) -> pd.DataFrame:
     
     return df
 
+@perfilar_paso('step1')
 def run(output_period: str|None=None, include_waiting_prev: bool=True):
     global _PERIODO_OVERRIDE
     period = output_period or PERIODO_ACTUAL
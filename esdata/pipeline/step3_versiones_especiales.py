@@ -9,12 +9,14 @@ import numpy as np
 from esdata.utils.io import read_csv, write_csv
 from esdata.utils.paths import path_consolidados, ensure_dir
 from esdata.utils.logging_setup import get_logger
+from esdata.utils.profiling import perfilar, perfilar_paso
 
 log = get_logger('step3')
 
 NUM_COLS = ["id","PaginaWeb","Ciudad","Fecha_Scrap","tipo_propiedad","area_m2","recamaras","estacionamientos","operacion","precio","mantenimiento","Colonia","longitud","latitud","tiempo_publicacion","Banos_totales","estacionamientos_icon","recamaras_icon","antiguedad_icon"]
 TEX_COLS = ["id","PaginaWeb","Ciudad","Fecha_Scrap","tipo_propiedad","area_m2","recamaras","estacionamientos","operacion","precio","mantenimiento","Colonia","longitud","latitud","direccion","titulo","descripcion","anunciante","codigo_anunciante","codigo_inmuebles24","Caracteristicas_generales","Servicios","Amenidades","Exteriores"]
 
+@perfilar
 def calcular_pxm2(df):
     """Calcula precio por metro cuadrado (PxM2) de forma segura"""
     df['PxM2'] = np.nan
@@ -37,6 +39,7 @@ def calcular_pxm2(df):
     
     return df
 
+@perfilar_paso('step3')
 def run(periodo):
     base_dir = os.path.join(path_consolidados(), periodo)
     inp = os.path.join(base_dir, f'2.Consolidado_ConColonia_{periodo}.csv')
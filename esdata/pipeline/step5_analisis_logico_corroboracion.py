@@ -16,11 +16,13 @@ Salidas:
 """
 from __future__ import annotations
 import os, sys, argparse
+from functools import lru_cache
 import pandas as pd
 import numpy as np
 from esdata.utils.io import read_csv, write_csv
 from esdata.utils.paths import path_consolidados, path_base, ensure_dir
 from esdata.utils.logging_setup import get_logger
+from esdata.utils.profiling import perfilar, perfilar_paso
 
 log = get_logger('step5')
 
@@ -108,12 +110,28 @@ PROPERTY_CONDITIONS = {
 }
 
 
+# Columnas categóricas con tipo/operación normalizados (se calculan una vez en run y las reusan los filtros)
+TIPO_NORM_COL = 'tipo_norm'
+OPERACION_NORM_COL = 'operacion_norm'
+NORM_COLS = [TIPO_NORM_COL, OPERACION_NORM_COL]
+
+# Condiciones por defecto (MÁS ESTRICTAS) para combinaciones sin condiciones específicas
+DEFAULT_CONDITIONS = {
+    'area_min': 30, 'area_max': 500,
+    'precio_min': 100000, 'precio_max': 20000000,
+    'pxm2_min': 1000, 'pxm2_max': 80000
+}
+
+
 def _normalize_property_type(tipo):
     """Normaliza el tipo de propiedad a los valores estándar"""
     if pd.isna(tipo):
         return 'unknown'
-    
-    tipo_str = str(tipo).strip()
+    return _normalize_property_type_str(str(tipo))
+
+@lru_cache(maxsize=None)
+def _normalize_property_type_str(tipo_raw: str):
+    tipo_str = tipo_raw.strip()
     tipo_lower = tipo_str.lower()
     
     # Primero verificar si es un código estandarizado
@@ -146,8 +164,11 @@ def _normalize_operation(operacion):
     """Normaliza la operación a los valores estándar"""
     if pd.isna(operacion):
         return 'unknown'
-    
-    op_str = str(operacion).strip()
+    return _normalize_operation_str(str(operacion))
+
+@lru_cache(maxsize=None)
+def _normalize_operation_str(op_raw: str):
+    op_str = op_raw.strip()
     op_lower = op_str.lower()
     
     # Primero verificar valores directos y códigos estandarizados
@@ -164,10 +185,30 @@ def _normalize_operation(operacion):
     else:
         return op_lower
 
+def _normalize_series(serie: pd.Series, normalizar) -> pd.Series:
+    """Normaliza una columna evaluando `normalizar` una vez por valor distinto.
+    Devuelve una columna categórica (los nulos quedan como 'unknown')."""
+    codigos, distintos = pd.factorize(serie)
+    normalizados = [normalizar(v) for v in distintos]
+    if (codigos == -1).any():
+        normalizados.append(normalizar(None))  # el código -1 (nulo) toma el último elemento
+    codigos_cat, categorias = pd.factorize(np.array(normalizados, dtype=object))
+    return pd.Series(pd.Categorical.from_codes(codigos_cat[codigos], categorias), index=serie.index)
+
+def _add_normalized_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrega tipo_norm/operacion_norm si faltan (no recalcula si ya existen)."""
+    if TIPO_NORM_COL not in df.columns:
+        df[TIPO_NORM_COL] = _normalize_series(df['tipo_propiedad'], _normalize_property_type)
+    if OPERACION_NORM_COL not in df.columns:
+        df[OPERACION_NORM_COL] = _normalize_series(df['operacion'], _normalize_operation)
+    return df
+
+@perfilar
 def _merge(num_df, tex_df):
     """Combina los DataFrames numérico y de texto"""
     return pd.merge(num_df, tex_df, on='id', how='left', suffixes=('', '_texto'))
 
+@perfilar
 def _improve(df):
     """Mejora los datos reemplazando valores faltantes desde texto"""
     # Reemplazar recamaras/banos si faltan
@@ -186,94 +227,103 @@ def _compute_pxm2(df: pd.DataFrame):
     df.loc[mask,'PxM2']= df.loc[mask,'precio']/df.loc[mask,'area_m2']
     return df
 
+def _numeric_column(df: pd.DataFrame, col: str) -> pd.Series:
+    """Columna como float (NaN si falta la columna o el valor no es numérico)."""
+    if col not in df.columns:
+        return pd.Series(np.nan, index=df.index, dtype=float)
+    return pd.to_numeric(df[col], errors='coerce').astype(float)
+
+def _fmt_num(values: pd.Series) -> pd.Series:
+    """Texto de los valores numéricos como str() de Python (3.0, 2.5)."""
+    return values.astype(float).astype(str)
+
+def _append_change(cambios: pd.Series, mask: pd.Series, texto: pd.Series) -> pd.Series:
+    """Agrega texto (separado por ', ') al log de las filas de mask."""
+    return cambios.mask(mask, cambios + np.where(cambios == '', '', ', ') + texto)
+
+@perfilar
 def _imputation_and_correction(df: pd.DataFrame):
     """
     1. IMPUTACIÓN Y CORRECCIÓN INICIAL
     Intenta corregir valores nulos o atípicos antes de eliminar registros.
     Prioridad: Salvar la mayor cantidad de registros posibles.
+
+    Las reglas se aplican en el mismo orden que por fila, pero por columna (máscaras):
+    cada regla ve los valores ya imputados por las anteriores.
+    Devuelve (df corregido, log de cambios por fila; '' si la fila no cambió).
     """
-    corrected_records = 0
-    imputed_records = 0
-    corrections_log = []
-    
     log.info("🔧 Iniciando imputación y corrección inicial...")
     
     df_corrected = df.copy()
-    
-    for idx, row in df.iterrows():
-        changes = []
-        original_recamaras = row.get('recamaras')
-        original_banos = row.get('Banos_totales')
-        original_estacionamientos = row.get('estacionamientos')
-        area = row.get('area_m2')
-        
-        # IMPUTACIÓN DE RECÁMARAS basada en área
-        if pd.isna(original_recamaras) or original_recamaras <= 0:
-            if pd.notna(area) and area > 0:
-                # Estimación: 1 recámara por cada 45 m², mínimo 1, máximo 4
-                recamaras_estimadas = max(1, min(4, round(area / 45)))
-                df_corrected.loc[df_corrected.index == idx, 'recamaras'] = recamaras_estimadas
-                changes.append(f'recamaras_imputadas_{recamaras_estimadas}')
-                imputed_records += 1
-        
-        # IMPUTACIÓN DE BAÑOS basada en recámaras
-        recamaras_actual = df_corrected.loc[df_corrected.index == idx, 'recamaras'].iloc[0]
-        if pd.isna(original_banos) or original_banos <= 0:
-            if pd.notna(recamaras_actual) and recamaras_actual > 0:
-                # Estimación: 1 baño por recámara como mínimo, máximo 1.5 * recámaras
-                banos_estimados = min(recamaras_actual * 1.5, recamaras_actual + 1)
-                df_corrected.loc[df_corrected.index == idx, 'Banos_totales'] = banos_estimados
-                changes.append(f'banos_imputados_{banos_estimados}')
-                imputed_records += 1
-        
-        # IMPUTACIÓN DE ESTACIONAMIENTOS basada en recámaras
-        if pd.isna(original_estacionamientos) or original_estacionamientos < 0:
-            if pd.notna(recamaras_actual) and recamaras_actual > 0:
-                # Estimación: 1 estacionamiento por recámara, máximo recámaras + 1
-                estacionamientos_estimados = min(recamaras_actual, recamaras_actual + 1)
-                df_corrected.loc[df_corrected.index == idx, 'estacionamientos'] = estacionamientos_estimados
-                changes.append(f'estacionamientos_imputados_{estacionamientos_estimados}')
-                imputed_records += 1
-        
-        # CORRECCIÓN DE VALORES ATÍPICOS POR ERRORES DE DIGITACIÓN
-        banos_actual = df_corrected.loc[df_corrected.index == idx, 'Banos_totales'].iloc[0]
-        estacionamientos_actual = df_corrected.loc[df_corrected.index == idx, 'estacionamientos'].iloc[0]
-        
-        # Corrección de baños (posibles errores como 25 en lugar de 2.5)
-        if pd.notna(banos_actual) and banos_actual >= 10:
-            if banos_actual % 10 == 5:  # Caso: 25 -> 2.5
-                nuevo_banos = banos_actual / 10
-                df_corrected.loc[df_corrected.index == idx, 'Banos_totales'] = nuevo_banos
-                changes.append(f'banos_corregidos_{banos_actual}_a_{nuevo_banos}')
-                corrected_records += 1
-            elif banos_actual % 10 == 0:  # Caso: 20 -> 2.0
-                nuevo_banos = banos_actual / 10
-                df_corrected.loc[df_corrected.index == idx, 'Banos_totales'] = nuevo_banos
-                changes.append(f'banos_corregidos_{banos_actual}_a_{nuevo_banos}')
-                corrected_records += 1
-        
-        # Corrección de estacionamientos (posibles errores como 30 en lugar de 3)
-        if pd.notna(estacionamientos_actual) and estacionamientos_actual >= 10:
-            nuevo_estacionamientos = estacionamientos_actual / 10
-            if nuevo_estacionamientos <= 6:  # Máximo razonable
-                df_corrected.loc[df_corrected.index == idx, 'estacionamientos'] = nuevo_estacionamientos
-                changes.append(f'estacionamientos_corregidos_{estacionamientos_actual}_a_{nuevo_estacionamientos}')
-                corrected_records += 1
-        
-        if changes:
-            corrections_log.append(f"ID {row.get('id', 'unknown')}: {', '.join(changes)}")
+    cambios = pd.Series('', index=df.index, dtype=object)
+    
+    original_recamaras = _numeric_column(df, 'recamaras')
+    original_banos = _numeric_column(df, 'Banos_totales')
+    original_estacionamientos = _numeric_column(df, 'estacionamientos')
+    area = _numeric_column(df, 'area_m2')
+    
+    # IMPUTACIÓN DE RECÁMARAS basada en área
+    # Estimación: 1 recámara por cada 45 m², mínimo 1, máximo 4
+    mask_rec = (original_recamaras.isna() | (original_recamaras <= 0)) & (area > 0)
+    recamaras_estimadas = np.round(area / 45).clip(1, 4)
+    recamaras_actual = original_recamaras.mask(mask_rec, recamaras_estimadas)
+    cambios = _append_change(cambios, mask_rec,
+                             'recamaras_imputadas_' + recamaras_estimadas.fillna(0).astype(int).astype(str))
+    
+    # IMPUTACIÓN DE BAÑOS basada en recámaras
+    # Estimación: 1 baño por recámara como mínimo, máximo 1.5 * recámaras
+    mask_banos = (original_banos.isna() | (original_banos <= 0)) & (recamaras_actual > 0)
+    banos_estimados = np.minimum(recamaras_actual * 1.5, recamaras_actual + 1)
+    banos_actual = original_banos.mask(mask_banos, banos_estimados)
+    cambios = _append_change(cambios, mask_banos, 'banos_imputados_' + _fmt_num(banos_estimados))
+    
+    # IMPUTACIÓN DE ESTACIONAMIENTOS basada en recámaras
+    # Estimación: 1 estacionamiento por recámara, máximo recámaras + 1
+    mask_est = (original_estacionamientos.isna() | (original_estacionamientos < 0)) & (recamaras_actual > 0)
+    estacionamientos_actual = original_estacionamientos.mask(mask_est, recamaras_actual)
+    cambios = _append_change(cambios, mask_est, 'estacionamientos_imputados_' + _fmt_num(recamaras_actual))
+    
+    # CORRECCIÓN DE VALORES ATÍPICOS POR ERRORES DE DIGITACIÓN
+    # Baños: 25 -> 2.5, 20 -> 2.0
+    mask_banos_typo = (banos_actual >= 10) & (banos_actual % 10).isin([0, 5])
+    nuevo_banos = banos_actual / 10
+    cambios = _append_change(cambios, mask_banos_typo,
+                             'banos_corregidos_' + _fmt_num(banos_actual) + '_a_' + _fmt_num(nuevo_banos))
+    banos_actual = banos_actual.mask(mask_banos_typo, nuevo_banos)
+    
+    # Estacionamientos: 30 -> 3 (máximo razonable 6)
+    nuevo_estacionamientos = estacionamientos_actual / 10
+    mask_est_typo = (estacionamientos_actual >= 10) & (nuevo_estacionamientos <= 6)
+    cambios = _append_change(cambios, mask_est_typo,
+                             'estacionamientos_corregidos_' + _fmt_num(estacionamientos_actual)
+                             + '_a_' + _fmt_num(nuevo_estacionamientos))
+    estacionamientos_actual = estacionamientos_actual.mask(mask_est_typo, nuevo_estacionamientos)
+    
+    for col, valores, mask in (('recamaras', recamaras_actual, mask_rec),
+                               ('Banos_totales', banos_actual, mask_banos | mask_banos_typo),
+                               ('estacionamientos', estacionamientos_actual, mask_est | mask_est_typo)):
+        if mask.any():
+            if col in df_corrected.columns and pd.api.types.is_integer_dtype(df_corrected[col]):
+                df_corrected[col] = df_corrected[col].astype(float)
+            df_corrected.loc[mask, col] = valores[mask]
+    
+    imputed_records = int(mask_rec.sum() + mask_banos.sum() + mask_est.sum())
+    corrected_records = int(mask_banos_typo.sum() + mask_est_typo.sum())
     
     log.info(f"✅ Imputación completada:")
     log.info(f"   � Registros con imputaciones: {imputed_records}")
     log.info(f"   🔧 Registros con correcciones: {corrected_records}")
     
-    if corrections_log and len(corrections_log) <= 20:
+    con_cambios = cambios[cambios != '']
+    if 0 < len(con_cambios) <= 20:
+        ids = df.loc[con_cambios.index, 'id'] if 'id' in df.columns else pd.Series('unknown', index=con_cambios.index)
         log.info("📝 Ejemplos de correcciones aplicadas:")
-        for example in corrections_log[:10]:
-            log.info(f"   • {example}")
+        for id_, texto in list(zip(ids, con_cambios))[:10]:
+            log.info(f"   • ID {id_}: {texto}")
     
-    return df_corrected
+    return df_corrected, cambios
 
+@perfilar
 def _validate_room_coherence(df: pd.DataFrame):
     """
     2. VALIDACIÓN DE COHERENCIA ENTRE HABITACIONES
@@ -315,6 +365,7 @@ def _validate_room_coherence(df: pd.DataFrame):
     return valid_df, invalid_df
 
 
+@perfilar
 def _verify_surface_logic_departments(df: pd.DataFrame):
     """
     3. VERIFICACIÓN DE SUPERFICIE LÓGICA (Solo para Departamentos)
@@ -374,6 +425,7 @@ def _verify_surface_logic_departments(df: pd.DataFrame):
     return valid_df, invalid_departamentos
 
 
+@perfilar
 def _apply_optimal_property_filters(df: pd.DataFrame):
     """
     4. FILTRO FINAL POR RANGOS DE PROPIEDAD ÓPTIMA
@@ -382,12 +434,13 @@ def _apply_optimal_property_filters(df: pd.DataFrame):
     log.info("🎯 Aplicando filtros de propiedad óptima...")
     
     violations = []
+    df = _add_normalized_keys(df)
     
     for idx, row in df.iterrows():
         row_violations = []
         
-        tipo_propiedad = _normalize_property_type(row.get('tipo_propiedad'))
-        operacion = _normalize_operation(row.get('operacion'))
+        tipo_propiedad = row[TIPO_NORM_COL]
+        operacion = row[OPERACION_NORM_COL]
         
         area = row.get('area_m2')
         precio = row.get('precio')
@@ -479,21 +532,16 @@ def _repair_antiguedad(df: pd.DataFrame):
 
 def _get_property_conditions(tipo_propiedad, operacion):
     """Obtener condiciones para un tipo de propiedad y operación específicos"""
-    tipo_norm = _normalize_property_type(tipo_propiedad)
-    op_norm = _normalize_operation(operacion)
-    
-    key = (tipo_norm, op_norm)
-    if key in PROPERTY_CONDITIONS:
-        return PROPERTY_CONDITIONS[key]
-    else:
-        # Si no hay condiciones específicas, usar valores por defecto MÁS ESTRICTOS
-        # (Se reportará en el resumen final, no por cada caso individual)
-        return {
-            'area_min': 30, 'area_max': 500,
-            'precio_min': 100000, 'precio_max': 20000000,
-            'pxm2_min': 1000, 'pxm2_max': 80000
-        }
+    key = (_normalize_property_type(tipo_propiedad), _normalize_operation(operacion))
+    return _conditions_for_key(key)
 
+def _conditions_for_key(key):
+    """Condiciones para una llave (tipo, operación) ya normalizada"""
+    # Si no hay condiciones específicas, usar valores por defecto MÁS ESTRICTOS
+    # (Se reportará en el resumen final, no por cada caso individual)
+    return PROPERTY_CONDITIONS.get(key, DEFAULT_CONDITIONS)
+
+@perfilar
 def _logic_filter(df: pd.DataFrame):
     """Filtrar propiedades usando condiciones específicas por tipo y operación + reglas lógicas"""
     print(f"🔍 Iniciando filtrado de {len(df)} propiedades")
@@ -506,13 +554,12 @@ def _logic_filter(df: pd.DataFrame):
     tipo_counts = {}
     conditions_used = {}
     logical_violations = {'banos': 0, 'estacionamientos': 0, 'coherencia': 0, 'antiguedad': 0}
+    df = _add_normalized_keys(df)
     
     for idx, row in df.iterrows():
         row_motivos = []
         precio = row.get('precio')
         area = row.get('area_m2')
-        tipo = row.get('tipo_propiedad')
-        operacion = row.get('operacion')
         pxm2 = row.get('PxM2')
         recamaras = row.get('recamaras')
         banos = row.get('Banos_totales')
@@ -521,8 +568,8 @@ def _logic_filter(df: pd.DataFrame):
         coherencia = row.get('coherencia_fisica')
 
         # Debug: contar tipos
-        tipo_norm = _normalize_property_type(tipo)
-        op_norm = _normalize_operation(operacion)
+        tipo_norm = row[TIPO_NORM_COL]
+        op_norm = row[OPERACION_NORM_COL]
         key = (tipo_norm, op_norm)
         
         if tipo_norm not in tipo_counts:
@@ -569,7 +616,7 @@ def _logic_filter(df: pd.DataFrame):
         # Si faltan datos básicos, no podemos aplicar filtros específicos
         if not row_motivos:
             # Obtener condiciones específicas para esta propiedad
-            conditions = _get_property_conditions(tipo, operacion)
+            conditions = _conditions_for_key(key)
             
             if key not in conditions_used:
                 conditions_used[key] = 0
@@ -615,6 +662,7 @@ def _logic_filter(df: pd.DataFrame):
     
     return valid, invalid
 
+@perfilar_paso('step5')
 def run(periodo):
     log.info('=' * 80)
     log.info('🔍 INICIANDO STEP 5: ANÁLISIS LÓGICO Y CORROBORACIÓN')
@@ -649,6 +697,11 @@ def run(periodo):
     log.info('🧮 Calculando precio por metro cuadrado...')
     improved = _compute_pxm2(improved)
     
+    log.info('🏷️ Normalizando tipo de propiedad y operación...')
+    improved = _add_normalized_keys(improved)
+    log.info(f'   • Tipos: {improved[TIPO_NORM_COL].cat.categories.tolist()} | '
+             f'Operaciones: {improved[OPERACION_NORM_COL].cat.categories.tolist()}')
+    
     log.info('🔧 Aplicando validación comprehensiva...')
     improved, eliminated_records = _apply_comprehensive_validation(improved)
     
@@ -709,7 +762,7 @@ def run(periodo):
     if len(invalid) > 0:
         elim_dir = ensure_dir(path_base('Datos_Filtrados','Eliminados', periodo))
         invalid_path = os.path.join(elim_dir, f'paso5_invalidos_{periodo}.csv')
-        write_csv(invalid, invalid_path)
+        write_csv(invalid.drop(columns=NORM_COLS, errors='ignore'), invalid_path)
         log.info('💾 ARCHIVO DE PROPIEDADES INVÁLIDAS:')
         log.info(f'   • Ruta: {invalid_path}')
         log.info(f'   • Propiedades eliminadas: {len(invalid):,}')
@@ -739,25 +792,29 @@ def _correct_age_anomalies(df: pd.DataFrame):
     
     corrections_made = 0
     
+    # Vista numérica: textos del Paso 1 como 'en construcción' no se corrigen (quedan igual)
+    edad = pd.to_numeric(df['antiguedad_icon'], errors='coerce')
+    
     # Usar máscaras para corregir errores obvios de captura
-    mask_year_error = df['antiguedad_icon'] > 200
+    mask_year_error = edad > 200
     if mask_year_error.sum() > 0:
-        df.loc[mask_year_error, 'antiguedad_icon'] = 2025 - df.loc[mask_year_error, 'antiguedad_icon']
+        edad[mask_year_error] = 2025 - edad[mask_year_error]
         corrections_made += mask_year_error.sum()
     
     # Posible confusión meses/años (110-200 años)
-    mask_months = (df['antiguedad_icon'] > 110) & (df['antiguedad_icon'] <= 200)
+    mask_months = (edad > 110) & (edad <= 200)
     if mask_months.sum() > 0:
-        df.loc[mask_months, 'antiguedad_icon'] = df.loc[mask_months, 'antiguedad_icon'] / 12
+        edad[mask_months] = edad[mask_months] / 12
         corrections_made += mask_months.sum()
     
     # Posible error de entrada (25-110 años)
-    mask_decimal = (df['antiguedad_icon'] > 25) & (df['antiguedad_icon'] <= 110)
+    mask_decimal = (edad > 25) & (edad <= 110)
     if mask_decimal.sum() > 0:
-        df.loc[mask_decimal, 'antiguedad_icon'] = df.loc[mask_decimal, 'antiguedad_icon'] / 10
+        edad[mask_decimal] = edad[mask_decimal] / 10
         corrections_made += mask_decimal.sum()
     
     if corrections_made > 0:
+        df.loc[edad.notna(), 'antiguedad_icon'] = edad[edad.notna()]
         log.info(f"   🔧 Correcciones aplicadas: {corrections_made:,} registros")
     else:
         log.info("   ✅ No se encontraron anomalías obvias de antigüedad")
@@ -781,8 +838,9 @@ def _analyze_age_context_for_outliers(df: pd.DataFrame):
     # Inicializar columna
     df['outlier_justificado_por_antiguedad'] = False
     
-    # Identificar outliers justificados por antigüedad
-    mask_muy_antigua = df['antiguedad_icon'] > 50
+    # Identificar outliers justificados por antigüedad (textos como 'en construcción' no cuentan)
+    edad = pd.to_numeric(df['antiguedad_icon'], errors='coerce')
+    mask_muy_antigua = edad > 50
     mask_precio_bajo = df['PxM2'] < 8000
     mask_superficie_atipica = (df['area_m2'] > 500) | (df['area_m2'] < 25)
     
@@ -793,7 +851,7 @@ def _analyze_age_context_for_outliers(df: pd.DataFrame):
     mask_justificado_2 = mask_muy_antigua & mask_superficie_atipica
     
     # Propiedades antiguas (20-50 años) con descuento moderado
-    mask_antigua = (df['antiguedad_icon'] > 20) & (df['antiguedad_icon'] <= 50)
+    mask_antigua = (edad > 20) & (edad <= 50)
     mask_descuento = df['PxM2'] < 10000
     mask_justificado_3 = mask_antigua & mask_descuento
     
@@ -809,6 +867,7 @@ def _analyze_age_context_for_outliers(df: pd.DataFrame):
     return df
 
 
+@perfilar
 def _apply_comprehensive_validation(df: pd.DataFrame):
     """
     PIPELINE COMPLETO DE VALIDACIÓN
@@ -820,8 +879,8 @@ def _apply_comprehensive_validation(df: pd.DataFrame):
     all_eliminated = []
     
     # 1. Imputación y corrección inicial
-    df = _imputation_and_correction(df)
-    log.info(f"   Después de imputación: {len(df):,} registros")
+    df, cambios_imputacion = _imputation_and_correction(df)
+    log.info(f"   Después de imputación: {len(df):,} registros ({(cambios_imputacion != '').sum():,} con cambios)")
     
     # 2. Validación de coherencia entre habitaciones
     df, eliminated_coherence = _validate_room_coherence(df)
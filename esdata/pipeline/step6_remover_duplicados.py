@@ -1,17 +1,22 @@
 """Paso 6: Remover Duplicados
 Entradas: 5.Num_Corroborado, 4a, 4b
 Salidas: 0.Final_Num, 0.Final_MKT, 0.Final_Ame + duplicados en Datos_Filtrados/Duplicados
+Los archivos de texto (4a, 4b) no se cargan completos: se codifican sus IDs contra un índice
+categórico de los IDs finales y se semi-unen por bloques de columnas, uno a la vez.
 """
 from __future__ import annotations
 import os
+import numpy as np
 import pandas as pd
 from esdata.utils.io import read_csv, write_csv
 from esdata.utils.paths import path_consolidados, path_base, ensure_dir, path_results_level
 from esdata.utils.logging_setup import get_logger
+from esdata.utils.profiling import perfilar, perfilar_paso
 
 log = get_logger('step6')
 
 
+@perfilar
 def _detect_duplicates(df):
     """Jerarquía para buscar duplicados:
     1. Si misma area_m2 -> revisar Ciudad
@@ -101,6 +106,77 @@ def _ensure_columns(df: pd.DataFrame, required: list[str]):
             df[c] = None
     return df
 
+# Columnas por bloque al semi-unir los archivos de texto anchos (limita el pico de memoria)
+TEXT_COLUMN_CHUNK = 8
+
+def _build_id_index(num_ids: pd.Series) -> tuple[pd.Index, pd.CategoricalDtype]:
+    """Índice de IDs finales: orden de salida (primera aparición en NUM) y un dtype
+    categórico con las categorías ordenadas, usado para codificar los IDs de texto."""
+    final_ids = pd.Index(num_ids.drop_duplicates())
+    dtype = pd.CategoricalDtype(categories=final_ids.dropna().sort_values())
+    return final_ids, dtype
+
+def _semi_join_plan(path: str, final_ids: pd.Index, dtype: pd.CategoricalDtype) -> tuple[np.ndarray, dict]:
+    """Lee solo la columna id del archivo de texto y calcula, para cada ID final, la fila
+    fuente (primera aparición) o -1. Las verificaciones de consistencia salen de los códigos."""
+    text_ids = read_csv(path, usecols=['id'])['id']
+    codes = pd.Categorical(text_ids, dtype=dtype).codes.astype(np.int64)
+    matched = codes >= 0
+    uniq_codes, first_pos = np.unique(codes[matched], return_index=True)
+    lookup = np.full(len(dtype.categories), -1, dtype=np.int64)
+    lookup[uniq_codes] = np.flatnonzero(matched)[first_pos]
+    final_codes = pd.Categorical(final_ids, dtype=dtype).codes.astype(np.int64)
+    src = np.where(final_codes >= 0, lookup[final_codes], -1)
+    checks = {
+        'ids_texto': int(text_ids.nunique()),
+        'duplicados': int(matched.sum() - len(uniq_codes)),
+        'faltantes': int((src < 0).sum()),
+        'extra': int(text_ids[~matched].nunique()),
+    }
+    return src, checks
+
+@perfilar
+def _reconcile_text(path: str, final_ids: pd.Index, dtype: pd.CategoricalDtype, label: str) -> pd.DataFrame:
+    """Semi-join de un archivo de texto contra los IDs finales, bloque de columnas por bloque.
+    Equivale a LEFT JOIN desde los IDs finales + drop_duplicates(id, keep='first'),
+    sin cargar nunca el archivo de texto completo."""
+    columns = list(read_csv(path, nrows=0).columns)
+    if 'id' not in columns:
+        raise ValueError(f'Archivo {label} sin columna id: {path}')
+    src, checks = _semi_join_plan(path, final_ids, dtype)
+    log.info(f'   • IDs originales ({label}): {checks["ids_texto"]:,}')
+    if checks['duplicados']:
+        log.warning(f'Encontrados {checks["duplicados"]} IDs duplicados en archivo {label}; se conserva la primera aparición')
+    if checks['faltantes']:
+        log.warning(f'⚠️ IDs finales sin registro en {label}: {checks["faltantes"]:,} (se completan vacíos)')
+    if checks['extra']:
+        log.info(f'   • IDs de {label} descartados (duplicados/eliminados en NUM): {checks["extra"]:,}')
+
+    out = pd.DataFrame({'id': final_ids})
+    data_cols = [c for c in columns if c != 'id']
+    for i in range(0, len(data_cols), TEXT_COLUMN_CHUNK):
+        cols = data_cols[i:i + TEXT_COLUMN_CHUNK]
+        chunk = read_csv(path, usecols=cols)
+        # RangeIndex: las posiciones -1 no existen y quedan como NaN (left join)
+        taken = chunk.reindex(src).reset_index(drop=True)
+        for c in cols:
+            out[c] = taken[c]
+        del chunk, taken
+    return out
+
+def _finalize_text(df: pd.DataFrame, base_lookup: pd.DataFrame, required: list[str]) -> pd.DataFrame:
+    """Reinyecta columnas críticas desde NUM, asegura columnas mínimas y calcula PxM2."""
+    for col in ['operacion','mantenimiento','tipo_propiedad']:
+        if col not in df.columns:
+            df[col] = df['id'].map(base_lookup[col]) if col in base_lookup.columns else None
+    df = _ensure_columns(df, required)
+    if 'precio' in df.columns and 'area_m2' in df.columns:
+        mask2 = df['area_m2'].notna() & (df['area_m2']>0) & df['precio'].notna()
+        df['PxM2'] = None
+        df.loc[mask2,'PxM2'] = df.loc[mask2,'precio']/df.loc[mask2,'area_m2']
+    return df
+
+@perfilar_paso('step6')
 def run(periodo):
     log.info('=' * 80)
     log.info('🗑️ INICIANDO STEP 6: REMOCIÓN DE DUPLICADOS')
@@ -118,22 +194,19 @@ def run(periodo):
             raise FileNotFoundError(p)
         log.info(f'   ✅ {os.path.basename(p)}')
     
-    log.info('📥 Cargando datos...')
+    log.info('📥 Cargando datos numéricos (texto se concilia por índice de IDs)...')
     num_df = read_csv(num_in)
-    a_df = read_csv(tex_a)
-    b_df = read_csv(tex_b)
     
     initial_num_count = len(num_df)
     log.info(f'✅ Datos cargados:')
     log.info(f'   • Datos numéricos: {initial_num_count:,} propiedades')
-    log.info(f'   • Datos MKT: {len(a_df):,} registros')
-    log.info(f'   • Datos AME: {len(b_df):,} registros')
     
     # Detectar duplicados con jerarquía
     log.info('🔍 Detectando duplicados con criterios jerárquicos...')
     log.info('   📋 Jerarquía: Área → Ciudad → Colonia → Precio → Longitud → Latitud → Recámaras/Baños')
     
     dedup_num, dupes = _detect_duplicates(num_df)
+    del num_df
     duplicados_encontrados = len(dupes)
     tasa_duplicados = (duplicados_encontrados / initial_num_count * 100) if initial_num_count > 0 else 0
     
@@ -156,78 +229,6 @@ def run(periodo):
             for tipo, count in tipo_dups.head(5).items():
                 log.info(f'   • {tipo}: {count:,} duplicados')
     
-    # Procesar archivos de texto
-    log.info('🔗 Sincronizando archivos de texto con IDs únicos...')
-    ids_final = set(dedup_num['id'])
-    
-    # Verificar que los archivos de texto tengan los mismos IDs
-    a_ids = set(a_df['id']) if 'id' in a_df.columns else set()
-    b_ids = set(b_df['id']) if 'id' in b_df.columns else set()
-    
-    log.info('📊 VERIFICACIÓN DE IDs:')
-    log.info(f'   • IDs únicos (NUM): {len(ids_final):,}')
-    log.info(f'   • IDs originales (MKT): {len(a_ids):,}')
-    log.info(f'   • IDs originales (AME): {len(b_ids):,}')
-    
-    # Filtrar usando solo los IDs que quedaron después de eliminar duplicados
-    # CREAR DataFrames con TODOS los IDs de dedup_num, incluso si faltan en archivos de texto
-    ids_final_df = dedup_num[['id']].copy()  # Base con todos los IDs finales
-    
-    # LEFT JOIN para asegurar que todos los IDs estén presentes
-    a_final = ids_final_df.merge(a_df, on='id', how='left')
-    b_final = ids_final_df.merge(b_df, on='id', how='left')
-    
-    log.info(f'IDs en archivo MKT después de merge: {len(a_final)}')
-    log.info(f'IDs en archivo AME después de merge: {len(b_final)}')
-    
-    # Verificar si hay IDs duplicados en los archivos de texto después del merge
-    a_duplicates = a_final['id'].duplicated().sum()
-    b_duplicates = b_final['id'].duplicated().sum()
-    
-    if a_duplicates > 0:
-        log.warning(f'Encontrados {a_duplicates} IDs duplicados en archivo MKT después de merge')
-        a_final = a_final.drop_duplicates(subset=['id'], keep='first')
-        log.info(f'IDs en archivo MKT después de eliminar duplicados: {len(a_final)}')
-    
-    if b_duplicates > 0:
-        log.warning(f'Encontrados {b_duplicates} IDs duplicados en archivo AME después de merge')
-        b_final = b_final.drop_duplicates(subset=['id'], keep='first')
-        log.info(f'IDs en archivo AME después de eliminar duplicados: {len(b_final)}')
-    
-    # Verificación final: asegurar que todos los archivos tengan los mismos IDs
-    final_num_ids = set(dedup_num['id'])
-    final_a_ids = set(a_final['id'])
-    final_b_ids = set(b_final['id'])
-    
-    # Ahora TODOS deberían tener exactamente los mismos IDs
-    if len(final_num_ids) != len(final_a_ids) or len(final_num_ids) != len(final_b_ids):
-        log.error(f'❌ INCONSISTENCIA DESPUÉS DE MERGE: NUM={len(final_num_ids)}, MKT={len(final_a_ids)}, AME={len(final_b_ids)}')
-        
-        # Identificar IDs faltantes o extra (esto NO debería pasar después del merge)
-        missing_in_a = final_num_ids - final_a_ids
-        missing_in_b = final_num_ids - final_b_ids
-        extra_in_a = final_a_ids - final_num_ids
-        extra_in_b = final_b_ids - final_num_ids
-        
-        if missing_in_a:
-            log.error(f'❌ IDs faltantes en MKT: {len(missing_in_a)} IDs - ESTO NO DEBERÍA PASAR')
-        if missing_in_b:
-            log.error(f'❌ IDs faltantes en AME: {len(missing_in_b)} IDs - ESTO NO DEBERÍA PASAR')
-        if extra_in_a:
-            log.error(f'❌ IDs extra en MKT: {len(extra_in_a)} IDs - ESTO NO DEBERÍA PASAR')
-        if extra_in_b:
-            log.error(f'❌ IDs extra en AME: {len(extra_in_b)} IDs - ESTO NO DEBERÍA PASAR')
-            
-        # Última corrección de emergencia
-        a_final = a_final[a_final['id'].isin(final_num_ids)].copy()
-        b_final = b_final[b_final['id'].isin(final_num_ids)].copy()
-        
-        log.warning(f'⚠️ Corrección de emergencia aplicada: NUM={len(dedup_num)}, MKT={len(a_final)}, AME={len(b_final)}')
-    else:
-        log.info(f'✅ CONSISTENCIA PERFECTA: todos los archivos tienen exactamente {len(final_num_ids)} registros')
-    # Reinyectar columnas críticas
-    log.info('🔄 Reinyectando columnas críticas en archivos de texto...')
-    
     # Normalizar variantes de nombres antes de construir lookup
     variant_map = {
         'tiempo_publicacion dias': 'tiempo_publicacion',
@@ -235,33 +236,10 @@ def run(periodo):
         'Banos_totales': 'Banos_totales',
     }
     for old, new in variant_map.items():
-        if old in num_df.columns and new not in num_df.columns:
-            num_df.rename(columns={old: new}, inplace=True)
-            if old in dedup_num.columns:
-                dedup_num.rename(columns={old: new}, inplace=True)
-
-    reinject_cols = ['operacion','mantenimiento','tipo_propiedad']
-    base_lookup = dedup_num.set_index('id')
-    if not base_lookup.index.is_unique:
-        base_lookup = base_lookup[~base_lookup.index.duplicated(keep='first')]
+        if old in dedup_num.columns and new not in dedup_num.columns:
+            dedup_num.rename(columns={old: new}, inplace=True)
     
-    reinjected_count = 0
-    for col in reinject_cols:
-        if col not in a_final.columns:
-            a_final[col] = a_final['id'].map(base_lookup[col]) if col in base_lookup.columns else None
-            reinjected_count += 1
-        if col not in b_final.columns:
-            b_final[col] = b_final['id'].map(base_lookup[col]) if col in base_lookup.columns else None
-            reinjected_count += 1
-    
-    if reinjected_count > 0:
-        log.info(f'✅ Columnas reinyectadas: {reinjected_count}')
-    
-    # Asegurar columnas mínimas
-    a_final = _ensure_columns(a_final, ['id','PaginaWeb','Ciudad','Colonia','operacion','tipo_propiedad','area_m2','precio','mantenimiento'])
-    b_final = _ensure_columns(b_final, ['id','Ciudad','Colonia','operacion','tipo_propiedad','area_m2','precio','mantenimiento'])
-    
-    # Calcular PxM2 para todos los archivos
+    # Calcular PxM2 para el archivo numérico
     log.info('🧮 Calculando PxM2 para archivos finales...')
     pxm2_calculados = 0
     
@@ -271,12 +249,6 @@ def run(periodo):
         dedup_num.loc[mask,'PxM2'] = dedup_num.loc[mask,'precio']/dedup_num.loc[mask,'area_m2']
         pxm2_calculados += mask.sum()
     
-    for df, name in [(a_final,'MKT'),(b_final,'AME')]:
-        if 'precio' in df.columns and 'area_m2' in df.columns:
-            mask2 = df['area_m2'].notna() & (df['area_m2']>0) & df['precio'].notna()
-            df['PxM2'] = None
-            df.loc[mask2,'PxM2'] = df.loc[mask2,'precio']/df.loc[mask2,'area_m2']
-    
     log.info(f'✅ PxM2 calculado para {pxm2_calculados:,} propiedades')
     
     # Generar archivos finales
@@ -295,23 +267,43 @@ def run(periodo):
     paths['AME'] = os.path.join(out_dir, f'0.Final_Ame_{periodo}.csv')
     
     write_csv(dedup_num, paths['NUM'])
-    write_csv(a_final, paths['MKT'])
-    write_csv(b_final, paths['AME'])
+    
+    # Conciliar archivos de texto con el índice de IDs finales, uno a la vez
+    log.info('🔗 Sincronizando archivos de texto con IDs únicos...')
+    final_ids, id_dtype = _build_id_index(dedup_num['id'])
+    log.info('📊 VERIFICACIÓN DE IDs:')
+    log.info(f'   • IDs únicos (NUM): {len(final_ids):,}')
+    
+    base_lookup = dedup_num.set_index('id')
+    if not base_lookup.index.is_unique:
+        base_lookup = base_lookup[~base_lookup.index.duplicated(keep='first')]
+    
+    text_specs = [
+        ('MKT', tex_a, ['id','PaginaWeb','Ciudad','Colonia','operacion','tipo_propiedad','area_m2','precio','mantenimiento']),
+        ('AME', tex_b, ['id','Ciudad','Colonia','operacion','tipo_propiedad','area_m2','precio','mantenimiento']),
+    ]
+    counts = {'NUM': len(dedup_num)}
+    for name, path_in, required in text_specs:
+        text_final = _reconcile_text(path_in, final_ids, id_dtype, name)
+        text_final = _finalize_text(text_final, base_lookup, required)
+        write_csv(text_final, paths[name])
+        counts[name] = len(text_final)
+        del text_final
     
     log.info('📊 ARCHIVOS FINALES GENERADOS:')
     for name, path in paths.items():
         size_mb = os.path.getsize(path) / 1024 / 1024
         log.info(f'   • {name}: {path}')
-        log.info(f'     - Registros: {len(dedup_num) if name=="NUM" else len(a_final) if name=="MKT" else len(b_final):,}')
+        log.info(f'     - Registros: {counts[name]:,}')
         log.info(f'     - Tamaño: {size_mb:.2f} MB')
     
     # Verificación final de consistencia
     log.info('🔍 VERIFICACIÓN FINAL DE CONSISTENCIA:')
     log.info(f'   • Final_Num: {len(dedup_num):,} registros')
-    log.info(f'   • Final_MKT: {len(a_final):,} registros')
-    log.info(f'   • Final_AME: {len(b_final):,} registros')
+    log.info(f'   • Final_MKT: {counts["MKT"]:,} registros')
+    log.info(f'   • Final_AME: {counts["AME"]:,} registros')
     
-    if len(dedup_num) == len(a_final) == len(b_final):
+    if len(final_ids) == counts['MKT'] == counts['AME']:
         log.info('✅ CONSISTENCIA PERFECTA: Todos los archivos tienen el mismo número de registros')
     else:
         log.warning('⚠️ INCONSISTENCIA: Los archivos tienen diferentes números de registros')
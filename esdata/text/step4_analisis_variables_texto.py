@@ -7,6 +7,7 @@ import pandas as pd
 from esdata.utils.io import read_csv, write_csv
 from esdata.utils.paths import path_consolidados
 from esdata.utils.logging_setup import get_logger
+from esdata.utils.profiling import perfilar, perfilar_paso
 
 log = get_logger('step4')
 
@@ -186,6 +187,7 @@ def _parse_items(cells: dict[str,str]):
     return accum
 
 
+@perfilar
 def extract_block_titulo_desc(df, block_cols, outfile):
     rows=[]
     for _,r in df.iterrows():
@@ -213,6 +215,7 @@ def extract_block_titulo_desc(df, block_cols, outfile):
     write_csv(out, outfile)
 
 
+@perfilar
 def extract_block_amenidades(df, block_cols, outfile):
     rows=[]
     for _,r in df.iterrows():
@@ -229,6 +232,7 @@ def extract_block_amenidades(df, block_cols, outfile):
     log.info(f'4b generado con {len(out)} filas y {len(CANONICAL_FEATURES)} variables amenidades canónicas')
 
 
+@perfilar_paso('step4')
 def run(periodo):
     base_dir = os.path.join(path_consolidados(), periodo)
     inp = os.path.join(base_dir, f'3b.Consolidado_Tex_{periodo}.csv')
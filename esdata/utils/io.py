@@ -1,4 +1,10 @@
+from __future__ import annotations
 import os
+import shutil
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+import numpy as np
 import pandas as pd
 from .logging_setup import get_logger
 
@@ -8,25 +14,117 @@ log = get_logger('io')
 ENCODING = 'utf-8-sig'
 FALLBACK_ENCODINGS = ['latin-1', 'cp1252']
 
-def read_csv(path: str) -> pd.DataFrame:
+# Observadores de E/S: callback(tipo, path) con tipo 'lectura' (antes de leer) o 'escritura' (después de escribir).
+# Los usa esdata.utils.manifest para registrar entradas/salidas de cada paso.
+_observadores = []
+
+@contextmanager
+def observar_io(callback):
+    """Llama callback(tipo, path) por cada archivo leído/escrito con este módulo dentro del bloque."""
+    _observadores.append(callback)
+    try:
+        yield
+    finally:
+        _observadores.remove(callback)
+
+def _notificar(tipo: str, path: str):
+    for callback in list(_observadores):
+        callback(tipo, path)
+
+def read_csv(path: str, **kwargs) -> pd.DataFrame:
     """Lee un CSV intentando primero UTF-8 y aplicando codificaciones fallback si falla.
     Se limita a UnicodeDecodeError para no ocultar otros problemas.
+    kwargs se pasan a pandas.read_csv (ej. usecols, nrows, dtype).
     """
     log.info(f"Leyendo CSV: {path}")
+    _notificar('lectura', path)
     try:
-        return pd.read_csv(path, encoding=ENCODING)
+        return pd.read_csv(path, encoding=ENCODING, **kwargs)
     except UnicodeDecodeError as e:
         for fb in FALLBACK_ENCODINGS:
             try:
                 log.warning(f"Reintentando lectura con encoding fallback '{fb}' por error: {e}")
-                return pd.read_csv(path, encoding=fb)
+                return pd.read_csv(path, encoding=fb, **kwargs)
             except UnicodeDecodeError:
                 continue
         # Último recurso: intentar lectura con errores reemplazados para no detener pipeline
     log.error(f"Fallo lectura en todos los encodings ({[ENCODING]+FALLBACK_ENCODINGS}). Se intenta rescatar con 'latin-1' y on_bad_lines='skip'.")
-    return pd.read_csv(path, encoding='latin-1', on_bad_lines='skip')
+    return pd.read_csv(path, encoding='latin-1', on_bad_lines='skip', **kwargs)
 
 def write_csv(df: pd.DataFrame, path: str):
     os.makedirs(os.path.dirname(path), exist_ok=True)
     log.info(f"Escribiendo CSV: {path} ({len(df)} filas / {len(df.columns)} cols)")
     df.to_csv(path, index=False, encoding=ENCODING)
+    _notificar('escritura', path)
+
+def _reemplazar_dir(nuevo: str, destino: str):
+    """Sustituye el directorio destino por nuevo (el anterior se aparta con os.replace y luego se borra)."""
+    viejo = destino.rstrip('/\\') + '.old'
+    shutil.rmtree(viejo, ignore_errors=True)
+    if os.path.exists(destino):
+        os.replace(destino, viejo)
+    os.replace(nuevo, destino)
+    shutil.rmtree(viejo, ignore_errors=True)
+
+def write_partitioned(df: pd.DataFrame, base_dir: str, partition_cols: list[str], names: list[str] | None = None,
+                      fmt: str = 'parquet', max_workers: int = 8) -> pd.DataFrame:
+    """Escribe df como dataset particionado estilo Hive: <base_dir>/<nombre>=<valor>/.../part-0.<ext>.
+
+    Ordena una sola vez por las columnas de partición, localiza los cortes de cada grupo
+    y escribe todos los fragmentos en una pasada con un pool de hilos (la escritura es I/O).
+    `names` permite usar nombres de directorio distintos a las columnas (ej. 'Tipo' para
+    'tipo_propiedad'). Los valores se codifican como URI (lectura Hive los decodifica) y las
+    columnas de partición no se repiten dentro de los archivos.
+    El dataset se arma en <base_dir>.tmp y reemplaza por completo a base_dir al terminar, así no
+    quedan particiones de corridas anteriores (grupos que desaparecieron o el otro formato).
+    Devuelve un índice con los valores de partición, la ruta y las filas de cada fragmento.
+    """
+    if fmt not in ('parquet', 'csv'):
+        raise ValueError(f"Formato no soportado: {fmt}")
+    names = list(names) if names else list(partition_cols)
+    if len(names) != len(partition_cols):
+        raise ValueError('names y partition_cols deben tener la misma longitud')
+    ext = 'parquet' if fmt == 'parquet' else 'csv'
+    index_cols = list(partition_cols) + ['ruta', 'filas']
+    tmp_dir = base_dir.rstrip('/\\') + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    if df.empty:
+        _reemplazar_dir(tmp_dir, base_dir)
+        return pd.DataFrame(columns=index_cols)
+
+    ordered = df.sort_values(list(partition_cols), kind='stable').reset_index(drop=True)
+    codes = ordered.groupby(list(partition_cols), sort=False, dropna=False).ngroup().to_numpy()
+    cuts = np.flatnonzero(np.diff(codes)) + 1
+    starts = np.concatenate(([0], cuts))
+    ends = np.concatenate((cuts, [len(ordered)]))
+    keys = ordered.loc[starts, list(partition_cols)].reset_index(drop=True)
+    data = ordered.drop(columns=list(partition_cols))
+
+    rel_paths = []
+    for row in keys.itertuples(index=False):
+        parts = [f"{n}={quote(str(v), safe='')}" for n, v in zip(names, row)]
+        rel_paths.append(os.path.join(*parts, f'part-0.{ext}'))
+    for d in {os.path.dirname(p) for p in rel_paths}:
+        os.makedirs(os.path.join(tmp_dir, d), exist_ok=True)
+
+    def _write(k: int):
+        chunk = data.iloc[starts[k]:ends[k]]
+        target = os.path.join(tmp_dir, rel_paths[k])
+        if fmt == 'parquet':
+            chunk.to_parquet(target, index=False)
+        else:
+            chunk.to_csv(target, index=False, encoding=ENCODING)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(_write, range(len(rel_paths))))
+    _reemplazar_dir(tmp_dir, base_dir)
+    paths = [os.path.join(base_dir, p) for p in rel_paths]
+    for p in paths:
+        _notificar('escritura', p)
+
+    index = keys.copy()
+    index['ruta'] = rel_paths
+    index['filas'] = ends - starts
+    log.info(f"Escribiendo dataset particionado: {base_dir} ({len(paths)} particiones / {len(ordered)} filas / {fmt})")
+    return index
@@ -0,0 +1,228 @@
+"""Manifiesto de corrida por periodo (checkpoint para reanudar el pipeline).
+N5_Resultados/Manifiestos/manifiesto_<Periodo>.json guarda, por cada paso ejecutado con
+ejecutar_paso():
+  - estado ('ok' / 'error'), inicio, duración y error
+  - código: sha256 del módulo del paso, de cada módulo esdata.* que importa (directa o
+    indirectamente, p.ej. esdata.utils.io o esdata.geo.catalogo_colonias) y commit de git (informativo)
+  - parámetros con los que se llamó run()
+  - entradas: archivos leídos con esdata.utils.io (más las entradas extra declaradas) con sha256,
+    tamaño y mtime al momento de leerlos
+  - salidas: archivos escritos con esdata.utils.io, con su sha256 al terminar el paso
+Las rutas se guardan relativas a BASE_DIR. motivo_reejecucion() compara el registro con el estado
+actual: un paso está al día si terminó bien con el mismo código (módulo y dependencias) y
+parámetros, sus entradas no cambiaron y sus salidas siguen intactas. Los archivos que el mismo paso escribe no cuentan como
+entradas aunque los relea (p.ej. Paso 8 relee sus *_inicial.csv), y un archivo que reescribe un
+paso posterior deja de contar como salida de los anteriores.
+"""
+from __future__ import annotations
+import os
+import ast
+import glob
+import json
+import time
+import hashlib
+import subprocess
+import importlib.util
+from datetime import datetime
+from .paths import BASE_DIR, path_base, path_manifiestos, obtener_periodo_previo
+from .io import observar_io
+from .logging_setup import get_logger
+
+log = get_logger('manifiesto')
+
+VERSION_MANIFIESTO = 1
+_BLOQUE = 1024 * 1024
+
+
+def path_manifiesto(periodo: str) -> str:
+    return os.path.join(path_manifiestos(), f'manifiesto_{periodo}.json')
+
+
+def _rel(path: str) -> str:
+    return os.path.relpath(os.path.abspath(path), BASE_DIR).replace(os.sep, '/')
+
+
+def _abs(rel: str) -> str:
+    return path_base(*rel.split('/'))
+
+
+def hash_archivo(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloque in iter(lambda: f.read(_BLOQUE), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def huella(path: str) -> dict:
+    """sha256 + tamaño + mtime de un archivo."""
+    st = os.stat(path)
+    return {'sha256': hash_archivo(path), 'bytes': st.st_size, 'mtime': st.st_mtime}
+
+
+def _sin_cambios(path: str, registrada: dict) -> bool:
+    """True si el archivo coincide con su huella (si tamaño y mtime son iguales no se vuelve a hashear)."""
+    if not os.path.isfile(path):
+        return False
+    st = os.stat(path)
+    if st.st_size != registrada.get('bytes'):
+        return False
+    if st.st_mtime == registrada.get('mtime'):
+        return True
+    return hash_archivo(path) == registrada.get('sha256')
+
+
+def _origen(nombre: str) -> str | None:
+    """Archivo .py de un módulo esdata.* (None si el nombre no es un módulo, p.ej. una función importada)."""
+    try:
+        spec = importlib.util.find_spec(nombre)
+    except (ImportError, ValueError):
+        return None
+    return spec.origin if spec and spec.origin and spec.origin.endswith('.py') else None
+
+
+def dependencias(modulo) -> dict[str, str]:
+    """Módulos esdata.* que importa el módulo (recorriendo sus imports en el código fuente, también los
+    de dentro de funciones) y sus paquetes padre -> sha256. No depende de lo que ya esté en sys.modules."""
+    partes = modulo.__name__.split('.')
+    pendientes, hashes = ['.'.join(partes[:k]) for k in range(1, len(partes) + 1)], {}
+    while pendientes:
+        nombre = pendientes.pop()
+        archivo = None if nombre in hashes else _origen(nombre)
+        if archivo is None:
+            continue
+        hashes[nombre] = hash_archivo(archivo)
+        paquete = nombre if os.path.basename(archivo) == '__init__.py' else nombre.rpartition('.')[0]
+        with open(archivo, encoding='utf-8') as f:
+            arbol = ast.parse(f.read(), archivo)
+        importados = []
+        for nodo in ast.walk(arbol):
+            if isinstance(nodo, ast.Import):
+                importados.extend(a.name for a in nodo.names)
+            elif isinstance(nodo, ast.ImportFrom):
+                base = importlib.util.resolve_name('.' * nodo.level + (nodo.module or ''), paquete) if nodo.level \
+                    else nodo.module
+                importados.append(base)
+                importados.extend(f'{base}.{a.name}' for a in nodo.names)
+        for importado in importados:
+            partes = importado.split('.')
+            if partes[0] == 'esdata':
+                pendientes.extend('.'.join(partes[:k]) for k in range(1, len(partes) + 1))
+    hashes.pop(modulo.__name__, None)
+    return dict(sorted(hashes.items()))
+
+
+def version_codigo(modulo) -> dict:
+    """sha256 del archivo del módulo del paso y de sus dependencias esdata.*, y commit de git del repo
+    (None si no hay git)."""
+    archivo = getattr(modulo, '__file__', None)
+    try:
+        git = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, timeout=10,
+                             cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        git = None
+    return {'modulo': modulo.__name__, 'sha256': hash_archivo(archivo) if archivo else None,
+            'dependencias': dependencias(modulo), 'git': git}
+
+
+def expandir_entradas(patrones, periodo: str) -> list[str]:
+    """Expande patrones glob relativos a BASE_DIR ({periodo} y {previo} se sustituyen)."""
+    previo = obtener_periodo_previo(periodo)
+    rutas = []
+    for patron in patrones:
+        rutas.extend(glob.glob(path_base(patron.format(periodo=periodo, previo=previo))))
+    return sorted(p for p in set(rutas) if os.path.isfile(p))
+
+
+def cargar_manifiesto(periodo: str) -> dict:
+    path = path_manifiesto(periodo)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return {'version': VERSION_MANIFIESTO, 'periodo': periodo, 'pasos': {}}
+
+
+def guardar_manifiesto(manifiesto: dict) -> str:
+    """Escritura atómica (archivo temporal + replace) para no dejar un manifiesto a medias."""
+    path = path_manifiesto(manifiesto['periodo'])
+    manifiesto['actualizado'] = datetime.now().isoformat(timespec='seconds')
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def ejecutar_paso(paso, modulo, periodo: str, parametros: dict | None = None, entradas_extra=()) -> dict:
+    """Ejecuta modulo.run(periodo, **parametros) registrando entradas, salidas y código en el manifiesto.
+    Si run() falla, el paso queda con estado 'error' y la excepción se propaga."""
+    parametros = dict(parametros or {})
+    entradas: dict[str, dict] = {}
+    escritos: set[str] = set()
+
+    def observar(tipo: str, path: str):
+        rel = _rel(path)
+        if tipo == 'escritura':
+            escritos.add(rel)
+        elif rel not in entradas and rel not in escritos and os.path.isfile(path):
+            entradas[rel] = huella(path)
+
+    for path in expandir_entradas(entradas_extra, periodo):
+        entradas[_rel(path)] = huella(path)
+    registro = {'modulo': modulo.__name__, 'estado': 'en_curso', 'inicio': datetime.now().isoformat(timespec='seconds'),
+                'codigo': version_codigo(modulo), 'parametros': {'periodo': periodo, **parametros},
+                'entradas_extra': list(entradas_extra)}
+    manifiesto = cargar_manifiesto(periodo)
+    t0 = time.perf_counter()
+    try:
+        with observar_io(observar):
+            modulo.run(periodo, **parametros)
+    except Exception as e:
+        registro.update(estado='error', error=f'{type(e).__name__}: {e}', duracion_s=time.perf_counter() - t0)
+        manifiesto['pasos'][str(paso)] = registro
+        guardar_manifiesto(manifiesto)
+        raise
+    registro['duracion_s'] = time.perf_counter() - t0
+    registro['entradas'] = {rel: h for rel, h in sorted(entradas.items()) if rel not in escritos}
+    registro['salidas'] = {rel: huella(_abs(rel)) for rel in sorted(escritos) if os.path.isfile(_abs(rel))}
+    registro['estado'] = 'ok'
+    # Un archivo reescrito por un paso posterior (p.ej. Esperando en Pasos 8 y 9) pertenece al último que lo escribe
+    for otro, previo in manifiesto['pasos'].items():
+        if int(otro) < int(paso):
+            for rel in escritos.intersection(previo.get('salidas', {})):
+                del previo['salidas'][rel]
+    manifiesto['pasos'][str(paso)] = registro
+    guardar_manifiesto(manifiesto)
+    log.info(f"🧾 Manifiesto paso {paso}: {len(registro['entradas'])} entradas, {len(registro['salidas'])} salidas")
+    return registro
+
+
+def motivo_reejecucion(registro: dict | None, modulo, periodo: str, parametros: dict | None = None,
+                       entradas_extra=()) -> str | None:
+    """None si el paso está al día respecto al registro; si no, el motivo para reejecutarlo."""
+    if not registro:
+        return 'sin registro en el manifiesto'
+    if registro.get('estado') != 'ok':
+        return f"la corrida previa terminó en estado '{registro.get('estado')}'"
+    if registro.get('parametros') != {'periodo': periodo, **(parametros or {})}:
+        return 'cambiaron los parámetros'
+    codigo, actual = registro.get('codigo', {}), version_codigo(modulo)
+    if codigo.get('sha256') != actual['sha256']:
+        return f'cambió el código de {modulo.__name__}'
+    previas = codigo.get('dependencias', {})
+    for nombre in sorted(set(previas) | set(actual['dependencias'])):
+        if previas.get(nombre) != actual['dependencias'].get(nombre):
+            return f'cambió el código de {nombre}'
+    entradas = registro.get('entradas', {})
+    salidas = registro.get('salidas', {})
+    for path in expandir_entradas(entradas_extra, periodo):
+        rel = _rel(path)
+        if rel not in entradas and rel not in salidas:
+            return f'entrada nueva: {rel}'
+    for rel, h in entradas.items():
+        if not _sin_cambios(_abs(rel), h):
+            return f"entrada {'modificada' if os.path.exists(_abs(rel)) else 'faltante'}: {rel}"
+    for rel, h in salidas.items():
+        if not _sin_cambios(_abs(rel), h):
+            return f"salida {'modificada' if os.path.exists(_abs(rel)) else 'faltante'}: {rel}"
+    return None
@@ -5,7 +5,8 @@ from __future__ import annotations
 import os
 from datetime import datetime
 
-BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+# ESDATA_BASE_DIR apunta el pipeline a otra raíz (p.ej. el sandbox de esdata.benchmark)
+BASE_DIR = os.environ.get('ESDATA_BASE_DIR') or os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 def periodo_actual() -> str:
     return datetime.now().strftime('%b%y')
@@ -50,8 +51,14 @@ def path_estadistica_resultados(periodo: str) -> str:
 def path_estadistica_reportes(periodo: str) -> str:
     return ensure_dir(path_base('N2_Estadisticas','Reportes', periodo))
 
-def path_colonias_branch(periodo: str, ciudad: str, oper: str, tipo: str) -> str:
-    return ensure_dir(path_base('N1_Tratamiento','Consolidados','Colonias', ciudad, 'Venta' if oper=='Ven' else 'Renta', tipo, periodo))
+def path_perfiles(periodo: str) -> str:
+    return ensure_dir(path_base('N5_Resultados','Perfiles', periodo))
+
+def path_manifiestos() -> str:
+    return ensure_dir(path_base('N5_Resultados','Manifiestos'))
+
+def path_colonias_dataset(periodo: str) -> str:
+    return ensure_dir(path_base('N1_Tratamiento','Consolidados','Colonias', periodo))
 
 def obtener_periodo_previo(periodo: str) -> str:
     try:
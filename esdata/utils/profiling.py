@@ -0,0 +1,275 @@
+"""Perfilado de tiempo y memoria por paso y función del pipeline.
+
+- @perfilar_paso('step5') en run(): abre una sesión, mide el paso completo y al terminar escribe
+  N5_Resultados/Perfiles/<Periodo>/<paso>_<timestamp>.json/.csv y una comparación con la corrida
+  previa del mismo paso (<paso>_<timestamp>_comparacion.csv).
+- @perfilar en funciones internas y `with etapa('nombre')` para bloques: registran tiempo de pared,
+  CPU, RSS (inicio/fin), pico de RSS, pico de tracemalloc y filas de entrada/salida (primer
+  DataFrame recibido / devuelto). Fuera de una sesión no registran nada.
+  El pico de RSS (ru_maxrss) es del proceso completo: rss_pico_proceso_mb es el máximo desde que
+  arrancó el proceso y rss_pico_incremento_mb cuánto lo subió la etapa (0 si la etapa no superó el
+  pico de etapas anteriores); el incremento es el que identifica la etapa que más memoria pide.
+
+Variables de entorno:
+  ESDATA_PERFIL=0              desactiva el perfilado (los decoradores solo llaman a la función)
+  ESDATA_PERFIL_TRACEMALLOC=1  activa tracemalloc (preciso pero agrega overhead)
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import glob
+import time
+import platform
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+import pandas as pd
+from .paths import path_base, path_perfiles, periodo_actual
+from .logging_setup import get_logger
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+log = get_logger('perfil')
+
+# Regresión: la función tarda más de UMBRAL_REGRESION veces lo de la corrida previa
+# (solo si ahora tarda al menos MIN_SEGUNDOS_REGRESION, para ignorar ruido)
+UMBRAL_REGRESION = 1.25
+MIN_SEGUNDOS_REGRESION = 0.5
+
+COLUMNAS_REGISTRO = ['paso', 'funcion', 'nivel', 'padre', 'inicio', 'wall_s', 'cpu_s',
+                     'rss_inicio_mb', 'rss_fin_mb', 'rss_pico_proceso_mb', 'rss_pico_incremento_mb',
+                     'tracemalloc_pico_mb',
+                     'filas_entrada', 'filas_salida', 'error']
+
+_MB = 1024 * 1024
+_sesion = None
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def perfil_activo() -> bool:
+    return os.environ.get('ESDATA_PERFIL', '1') != '0'
+
+
+def _rss_mb():
+    """RSS actual del proceso en MB (psutil o /proc; None si no hay forma de medirlo)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / _MB
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / _MB
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _rss_pico_mb():
+    """Pico de RSS del proceso hasta ahora (ru_maxrss está en KB en Linux y en bytes en macOS)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / _MB if sys.platform == 'darwin' else pico / 1024
+
+
+def _filas(obj):
+    """Filas del primer DataFrame/Series en obj (o dentro de una tupla/lista)."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, (tuple, list)):
+        for item in obj:
+            if isinstance(item, (pd.DataFrame, pd.Series)):
+                return len(item)
+    return None
+
+
+def _pila():
+    if not hasattr(_local, 'pila'):
+        _local.pila = []
+    return _local.pila
+
+
+@contextmanager
+def etapa(nombre: str, filas_entrada=None):
+    """Mide un bloque dentro de la sesión activa. Devuelve un dict donde se puede fijar 'filas_salida'."""
+    info = {'filas_entrada': filas_entrada, 'filas_salida': None}
+    if _sesion is None:
+        yield info
+        return
+    pila = _pila()
+    traza = tracemalloc.is_tracing()
+    marco = {'funcion': nombre, 'pico_hijos': 0, 'rss_pico_inicio': _rss_pico_mb()}
+    if traza:
+        marco['traza_inicio'] = tracemalloc.get_traced_memory()[0]
+        marco['pico_previo'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+    padre = pila[-1]['funcion'] if pila else None
+    pila.append(marco)
+    registro = {'paso': _sesion['paso'], 'funcion': nombre, 'nivel': len(pila) - 1, 'padre': padre,
+                'inicio': datetime.now().isoformat(timespec='seconds'), 'rss_inicio_mb': _rss_mb(),
+                'error': False}
+    t0, c0 = time.perf_counter(), time.process_time()
+    try:
+        yield info
+    except BaseException:
+        registro['error'] = True
+        raise
+    finally:
+        registro['wall_s'] = time.perf_counter() - t0
+        registro['cpu_s'] = time.process_time() - c0
+        registro['rss_fin_mb'] = _rss_mb()
+        registro['rss_pico_proceso_mb'] = _rss_pico_mb()
+        registro['rss_pico_incremento_mb'] = (registro['rss_pico_proceso_mb'] - marco['rss_pico_inicio']
+                                              if marco['rss_pico_inicio'] is not None else None)
+        registro['tracemalloc_pico_mb'] = None
+        pila.pop()
+        if traza and tracemalloc.is_tracing():
+            # reset_peak() borra el pico del padre: se propaga el máximo absoluto hacia arriba
+            pico_abs = max(tracemalloc.get_traced_memory()[1], marco['pico_hijos'])
+            registro['tracemalloc_pico_mb'] = (pico_abs - marco['traza_inicio']) / _MB
+            if pila:
+                pila[-1]['pico_hijos'] = max(pila[-1]['pico_hijos'], pico_abs, marco['pico_previo'])
+        registro['filas_entrada'] = info['filas_entrada']
+        registro['filas_salida'] = info['filas_salida']
+        with _lock:
+            if _sesion is not None:
+                _sesion['registros'].append(registro)
+
+
+def perfilar(func=None, *, nombre: str | None = None):
+    """Decorador: registra la función como etapa de la sesión activa (filas del primer DataFrame in/out)."""
+    def decorador(f):
+        etiqueta = nombre or f.__name__
+
+        @wraps(f)
+        def envoltura(*args, **kwargs):
+            if _sesion is None:
+                return f(*args, **kwargs)
+            entrada = next((n for n in map(_filas, list(args) + list(kwargs.values())) if n is not None), None)
+            with etapa(etiqueta, entrada) as info:
+                resultado = f(*args, **kwargs)
+                info['filas_salida'] = _filas(resultado)
+            return resultado
+        return envoltura
+    return decorador(func) if func is not None else decorador
+
+
+@contextmanager
+def sesion(paso: str, periodo: str | None = None, guardar: bool = True):
+    """Sesión de perfilado de un paso; al salir escribe el perfil y la comparación con la corrida previa."""
+    global _sesion
+    if not perfil_activo() or _sesion is not None:
+        # Desactivado o anidado (p.ej. un paso que llama a otro): se registra en la sesión exterior
+        yield _sesion
+        return
+    periodo = periodo or periodo_actual()
+    iniciar_traza = os.environ.get('ESDATA_PERFIL_TRACEMALLOC') == '1' and not tracemalloc.is_tracing()
+    if iniciar_traza:
+        tracemalloc.start()
+    _sesion = {'paso': paso, 'periodo': periodo, 'inicio': datetime.now(), 'registros': []}
+    actual = _sesion
+    try:
+        with etapa(paso):
+            yield actual
+    finally:
+        _sesion = None
+        if iniciar_traza:
+            tracemalloc.stop()
+        if guardar:
+            try:
+                guardar_perfil(actual)
+            except Exception as e:
+                log.warning(f'⚠️ No se pudo guardar el perfil de {paso}: {e}')
+
+
+def perfilar_paso(paso: str):
+    """Decorador para run(): abre una sesión con el periodo del primer argumento (o 'periodo'/'output_period')."""
+    def decorador(f):
+        @wraps(f)
+        def envoltura(*args, **kwargs):
+            periodo = args[0] if args else kwargs.get('periodo', kwargs.get('output_period'))
+            with sesion(paso, periodo if isinstance(periodo, str) else None):
+                return f(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def resumen_registros(registros: pd.DataFrame) -> pd.DataFrame:
+    """Agrega los registros por función: llamadas, tiempos, memoria y filas/s."""
+    if registros.empty:
+        return pd.DataFrame(columns=['funcion', 'llamadas', 'wall_s', 'cpu_s', 'rss_pico_incremento_mb',
+                                     'rss_pico_proceso_mb', 'tracemalloc_pico_mb', 'filas_entrada',
+                                     'filas_salida', 'filas_por_s'])
+    resumen = registros.groupby('funcion', sort=False).agg(
+        llamadas=('wall_s', 'size'), wall_s=('wall_s', 'sum'), cpu_s=('cpu_s', 'sum'),
+        rss_pico_incremento_mb=('rss_pico_incremento_mb', 'max'), rss_pico_proceso_mb=('rss_pico_proceso_mb', 'max'),
+        tracemalloc_pico_mb=('tracemalloc_pico_mb', 'max'),
+    ).reset_index()
+    for col in ('filas_entrada', 'filas_salida'):
+        resumen[col] = registros.groupby('funcion', sort=False)[col].sum(min_count=1).values
+    resumen['filas_por_s'] = (resumen['filas_entrada'] / resumen['wall_s']).where(resumen['wall_s'] > 0)
+    return resumen.sort_values('wall_s', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def _perfil_previo(paso: str, actual: str):
+    """Ruta del JSON más reciente del mismo paso (cualquier periodo) anterior a `actual`."""
+    candidatos = [p for p in glob.glob(path_base('N5_Resultados', 'Perfiles', '*', f'{paso}_*.json'))
+                  if os.path.basename(p) < os.path.basename(actual)]
+    return max(candidatos, key=os.path.basename) if candidatos else None
+
+
+def comparar_perfiles(resumen: pd.DataFrame, previo: pd.DataFrame) -> pd.DataFrame:
+    """Une dos resúmenes por función y marca regresiones de tiempo."""
+    cols = ['funcion', 'llamadas', 'wall_s', 'cpu_s', 'tracemalloc_pico_mb', 'filas_entrada', 'filas_por_s']
+    comp = resumen[cols].merge(previo[cols], on='funcion', how='outer', suffixes=('', '_previo'))
+    comp['ratio_wall'] = comp['wall_s'] / comp['wall_s_previo'].where(comp['wall_s_previo'] > 0)
+    comp['regresion'] = (comp['ratio_wall'] > UMBRAL_REGRESION) & (comp['wall_s'] >= MIN_SEGUNDOS_REGRESION)
+    return comp
+
+
+def guardar_perfil(datos: dict) -> str:
+    """Escribe JSON/CSV del perfil de una sesión y la comparación con la corrida previa. Devuelve la ruta JSON."""
+    registros = pd.DataFrame(datos['registros'], columns=COLUMNAS_REGISTRO)
+    resumen = resumen_registros(registros)
+    sello = datos['inicio'].strftime('%Y%m%d_%H%M%S')
+    base = os.path.join(path_perfiles(datos['periodo']), f"{datos['paso']}_{sello}")
+    contenido = {
+        'paso': datos['paso'], 'periodo': datos['periodo'],
+        'inicio': datos['inicio'].isoformat(timespec='seconds'),
+        'fin': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(), 'plataforma': platform.platform(),
+        'tracemalloc': bool(registros['tracemalloc_pico_mb'].notna().any()),
+        'resumen': json.loads(resumen.to_json(orient='records')),
+        'registros': json.loads(registros.to_json(orient='records')),
+    }
+    with open(base + '.json', 'w', encoding='utf-8') as f:
+        json.dump(contenido, f, ensure_ascii=False, indent=2)
+    registros.to_csv(base + '.csv', index=False, encoding='utf-8-sig')
+
+    total = resumen.loc[resumen['funcion'] == datos['paso'], 'wall_s']
+    log.info(f"⏱️ Perfil {datos['paso']} ({float(total.iloc[0]) if len(total) else 0:.1f}s): {base}.json")
+    for fila in resumen.head(5).itertuples():
+        log.info(f'   • {fila.funcion}: {fila.wall_s:.2f}s pared / {fila.cpu_s:.2f}s CPU ({fila.llamadas} llamadas)')
+
+    previo = _perfil_previo(datos['paso'], base + '.json')
+    if previo:
+        with open(previo, encoding='utf-8') as f:
+            resumen_previo = pd.DataFrame(json.load(f)['resumen'])
+        if not resumen_previo.empty:
+            comp = comparar_perfiles(resumen, resumen_previo)
+            comp.to_csv(base + '_comparacion.csv', index=False, encoding='utf-8-sig')
+            regresiones = comp[comp['regresion']]
+            if regresiones.empty:
+                log.info(f'📊 Sin regresiones frente a {os.path.basename(previo)}')
+            for fila in regresiones.itertuples():
+                log.warning(f'⚠️ Regresión en {fila.funcion}: {fila.wall_s_previo:.2f}s → {fila.wall_s:.2f}s '
+                            f'(x{fila.ratio_wall:.2f}) frente a {os.path.basename(previo)}')
+    return base + '.json'
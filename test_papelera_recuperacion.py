@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Script de prueba: la recuperación de la papelera alinea las columnas de fragmentos con esquemas distintos
+"""
+
+import shutil
+import tempfile
+import pandas as pd
+from Sistema_Papelera_Reciclaje import PapeleraReciclaje
+
+
+def test_recuperacion_esquemas_distintos():
+    """Dos lotes con columnas distintas (y en otro orden) se recuperan en un CSV con un solo encabezado"""
+    directorio = tempfile.mkdtemp(prefix='papelera_prueba_')
+    try:
+        papelera = PapeleraReciclaje(directorio_papelera=directorio)
+        paso5 = pd.DataFrame({'id': ['a1', 'a2'], 'precio': [1500000.0, 2300000.0],
+                              'Colonia': ['Centro', 'Providencia'], 'tipo_propiedad': ['Cas', 'Dep']})
+        paso2 = pd.DataFrame({'Colonia': ['Chapalita'], 'id': ['b1'], 'extra': ['x'],
+                              'tipo_propiedad': ['Cas']})
+        papelera.registrar_eliminados(paso5, 'paso5_prueba', 'precio fuera de rango')
+        papelera.registrar_eliminados(paso2, 'paso2_prueba', 'sin coordenadas')
+
+        destino = f"{directorio}/recuperados.csv"
+        total = papelera.exportar_recuperacion({}, destino)
+        df = pd.read_csv(destino, dtype=str)
+
+        assert total == 3, total
+        assert len(df) == 3, len(df)
+        assert {'id', 'precio', 'Colonia', 'tipo_propiedad', 'extra'} <= set(df.columns), list(df.columns)
+        assert not any(c.startswith('id_eliminacion') for c in df.columns)
+        filas = df.set_index('id')
+        assert filas.loc['a2', 'Colonia'] == 'Providencia'
+        assert float(filas.loc['a2', 'precio']) == 2300000.0
+        assert filas.loc['b1', 'Colonia'] == 'Chapalita'
+        assert filas.loc['b1', 'extra'] == 'x'
+        assert pd.isna(filas.loc['b1', 'precio'])
+        print("✅ Recuperación con esquemas distintos alineada")
+        return True
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_recuperacion_esquemas_distintos()